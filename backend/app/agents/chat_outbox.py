@@ -0,0 +1,84 @@
+"""
+Per-request unit of work for chat persistence.
+
+A chat turn used to write the new chat session, the user message, the
+conversation state and the assistant reply with separate crud calls, each
+committing (and refreshing) on its own. AgentService now queues those writes
+in a ChatOutbox and flushes them in a single transaction when the turn ends.
+
+Messages get their `created_at` when they are queued, not when they are
+flushed, and each one is strictly later than the one before. History
+therefore keeps the order in which the turn produced the messages. Reads
+made during the turn (the pending confirmation) see queued state first.
+"""
+
+import copy
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import crud
+from ..models import ChatMessage, ChatSession
+
+
+class ChatOutbox:
+    """Buffers chat sessions, messages and conversation state until flush()."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self._chat_sessions: List[ChatSession] = []
+        self._messages: List[ChatMessage] = []
+        self._states: Dict[str, Dict[str, Any]] = {}
+        self._last_created_at: Optional[datetime] = None
+
+    @property
+    def pending(self) -> bool:
+        return bool(self._chat_sessions or self._messages or self._states)
+
+    def create_chat_session(self, user_id: str, title: str = "New Chat") -> ChatSession:
+        chat_session = ChatSession(id=str(uuid.uuid4()), user_id=user_id, title=title)
+        self._chat_sessions.append(chat_session)
+        return chat_session
+
+    def add_message(self, session_id: str, role: str, content: str) -> ChatMessage:
+        created_at = datetime.utcnow()
+        if self._last_created_at is not None and created_at <= self._last_created_at:
+            created_at = self._last_created_at + timedelta(microseconds=1)
+        self._last_created_at = created_at
+
+        message = ChatMessage(id=str(uuid.uuid4()), session_id=session_id, role=role, content=content, created_at=created_at)
+        self._messages.append(message)
+        return message
+
+    def set_state(self, session_id: str, state: Dict[str, Any]):
+        self._states[session_id] = copy.deepcopy(state)
+
+    def get_state(self, session_id: str) -> Optional[Dict[str, Any]]:
+        state = self._states.get(session_id)
+        return copy.deepcopy(state) if state is not None else None
+
+    async def flush(self):
+        """Write everything queued in one transaction."""
+        if not self.pending:
+            return
+
+        from .conversation_state import conversation_state
+
+        chat_sessions, messages, states = self._chat_sessions, self._messages, self._states
+        self._chat_sessions, self._messages, self._states = [], [], {}
+        try:
+            # Sessions first: messages and state reference them
+            self.session.add_all(chat_sessions)
+            self.session.add_all(messages)
+            await self.session.flush()
+            for session_id, state in states.items():
+                await crud.save_conversation_state(self.session, session_id, state, commit=False)
+            await self.session.commit()
+        except Exception:
+            await self.session.rollback()
+            # The store cached the queued state; it never reached the table
+            for session_id in states:
+                conversation_state.invalidate(session_id)
+            raise
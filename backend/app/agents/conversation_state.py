@@ -0,0 +1,90 @@
+"""
+Keyed store for per-chat-session orchestrator state.
+
+State (currently just the pending confirmation) used to be appended to the
+chat history as `SK_STATE:` system messages and found again by loading and
+scanning the whole transcript, so every turn got slower as a session grew.
+It now lives in the `conversation_state` table, one upserted row per chat
+session. An optional in-process LRU (conversation_state_cache_size, off by
+default) can sit in front of it for single-worker deployments.
+
+Sessions that predate the table still have their state in the history; the
+first load falls back to the newest SK_STATE message and copies it over.
+"""
+
+import copy
+import json
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import crud
+from ..config import get_settings
+
+if TYPE_CHECKING:
+    from .chat_outbox import ChatOutbox
+
+LEGACY_STATE_PREFIX = "SK_STATE:"
+
+
+class ConversationStateStore:
+    """Read-through, write-through LRU over crud's conversation_state helpers."""
+
+    def __init__(self, max_entries: int = 0):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    async def load(self, session: AsyncSession, chat_session_id: str, outbox: Optional["ChatOutbox"] = None) -> Dict[str, Any]:
+        if outbox is not None:
+            queued = outbox.get_state(chat_session_id)
+            if queued is not None:
+                return queued
+
+        cached = self._entries.get(chat_session_id)
+        if cached is not None:
+            self._entries.move_to_end(chat_session_id)
+            return copy.deepcopy(cached)
+
+        state = await crud.get_conversation_state(session, chat_session_id)
+        if state is None:
+            state = await self._load_legacy(session, chat_session_id)
+        self._remember(chat_session_id, state)
+        return copy.deepcopy(state)
+
+    async def save(self, session: AsyncSession, chat_session_id: str, state: Dict[str, Any], outbox: Optional["ChatOutbox"] = None):
+        """Write the state now, or queue it on `outbox` for the end of the turn."""
+        if outbox is not None:
+            outbox.set_state(chat_session_id, state)
+        else:
+            await crud.save_conversation_state(session, chat_session_id, state)
+        self._remember(chat_session_id, state)
+
+    def invalidate(self, chat_session_id: str):
+        self._entries.pop(chat_session_id, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    async def _load_legacy(self, session: AsyncSession, chat_session_id: str) -> Dict[str, Any]:
+        content = await crud.get_legacy_sk_state(session, chat_session_id)
+        if content is None:
+            return {}
+        try:
+            state = json.loads(content[len(LEGACY_STATE_PREFIX):].strip())
+        except json.JSONDecodeError as e:
+            print(f"SK: Failed to load legacy state: {e}")
+            return {}
+        await crud.save_conversation_state(session, chat_session_id, state)
+        return state
+
+    def _remember(self, chat_session_id: str, state: Dict[str, Any]):
+        if self.max_entries <= 0:
+            return
+        self._entries[chat_session_id] = copy.deepcopy(state)
+        self._entries.move_to_end(chat_session_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+conversation_state = ConversationStateStore(max_entries=get_settings().conversation_state_cache_size)
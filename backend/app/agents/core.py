@@ -1,23 +1,67 @@
+import asyncio
 import json
 import httpx
 import os
 import re
-from typing import List, Dict, Any, Optional
+from typing import AsyncIterator, List, Dict, Any, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from .. import crud
 from ..models import TaskCreate, TaskStatus
 from ..config import get_settings
+from ..llm_clients import get_llm_registry
 from .prompts import (
     SUPERVISOR_SYSTEM_PROMPT,
     TASK_AGENT_SYSTEM_PROMPT,
     QA_AGENT_SYSTEM_PROMPT,
     TRACKING_AGENT_SYSTEM_PROMPT
 )
+from .chat_outbox import ChatOutbox
+from .fast_path import FastPathRouter
 from .tools import ToolCall, CreateTaskArgs, DeleteTaskArgs, SearchTasksArgs, UpdateTaskArgs, CompleteTaskArgs
-from ..websockets import manager
+from ..task_events import TASK_CREATED, TASK_DELETED, TASK_UPDATED, publish_task_event, snapshot
+from ..user_cache import user_cache
 
 DEBUG_AGENT = os.getenv("DEBUG_AGENT", "").lower() in ("1", "true", "yes")
 USE_SK_ORCHESTRATOR = os.getenv("USE_SK_ORCHESTRATOR", "true").lower() in ("1", "true", "yes")
+USE_CHAT_FAST_PATH = os.getenv("USE_CHAT_FAST_PATH", "true").lower() in ("1", "true", "yes")
+
+CONFIRMATION_MARKER = "pending_confirmation:"
+
+class ConfirmationTailFilter:
+    """
+    Streaming counterpart of splitting a reply on CONFIRMATION_MARKER.
+
+    Passes text through until the marker appears and drops everything from
+    the marker on. Text that could be the start of a marker split across
+    chunks is held back until the next chunk decides it.
+    """
+
+    def __init__(self):
+        self._pending = ""
+        self._stopped = False
+
+    def feed(self, text: str) -> str:
+        if self._stopped:
+            return ""
+        buffer = self._pending + text
+        index = buffer.find(CONFIRMATION_MARKER)
+        if index != -1:
+            self._stopped = True
+            self._pending = ""
+            return buffer[:index]
+
+        # Hold back the longest suffix that is a prefix of the marker
+        keep = 0
+        for size in range(min(len(buffer), len(CONFIRMATION_MARKER) - 1), 0, -1):
+            if CONFIRMATION_MARKER.startswith(buffer[-size:]):
+                keep = size
+                break
+        self._pending = buffer[len(buffer) - keep:] if keep else ""
+        return buffer[:len(buffer) - keep]
+
+    def flush(self) -> str:
+        pending, self._pending = ("" if self._stopped else self._pending), ""
+        return pending
 
 class AgentService:
     def __init__(self, session: AsyncSession, user_id: str):
@@ -26,19 +70,34 @@ class AgentService:
         self.settings = get_settings()
         self.user_context = None
         self._sk_orchestrator = None
+        # Chat writes for a turn are committed together when the turn ends
+        self.outbox = ChatOutbox(session)
 
     async def _fetch_user_context(self):
-        from sqlmodel import select
-        from ..models import User
-        stmt = select(User).where(User.id == self.user_id)
-        result = await self.session.execute(stmt)
-        user = result.scalar_one_or_none()
+        # Usually already resolved by get_current_user in this request
+        user = await user_cache.get_user(self.session, self.user_id)
         if user:
             self.user_context = {
                 "name": user.name or "User",
             }
 
     async def process_request(self, messages: List[Dict[str, str]], session_id: Optional[str] = None) -> Dict[str, Any]:
+        try:
+            result = await self._process_request(messages, session_id)
+        except Exception:
+            await self._flush_after_error()
+            raise
+        await self.outbox.flush()
+        return result
+
+    async def _flush_after_error(self):
+        """Keep what the failed turn queued (e.g. the user message), as when each write committed at once."""
+        try:
+            await self.outbox.flush()
+        except Exception as e:
+            print(f"Agent: Failed to save chat messages after error: {e}")
+
+    async def _process_request(self, messages: List[Dict[str, str]], session_id: Optional[str] = None) -> Dict[str, Any]:
         await self._fetch_user_context()
 
         user_msg_content = messages[-1]["content"] if messages else ""
@@ -48,15 +107,7 @@ class AgentService:
             return await self._process_with_sk_orchestrator(user_msg_content, session_id)
 
         # Legacy implementation
-        chat_session = None
-        if session_id:
-            chat_session = await crud.get_chat_session(self.session, session_id, self.user_id)
-
-        if not chat_session:
-            chat_session = await crud.create_chat_session(self.session, self.user_id, title=user_msg_content[:30])
-
-        if user_msg_content:
-            await crud.add_chat_message(self.session, chat_session.id, "user", user_msg_content)
+        chat_session = await self._open_chat_session(user_msg_content, session_id)
 
         intent = await self._classify_intent(messages)
         if DEBUG_AGENT:
@@ -73,7 +124,7 @@ class AgentService:
             response = await self._call_llm(messages)
             
         if response:
-            await crud.add_chat_message(self.session, chat_session.id, "assistant", response)
+            self.outbox.add_message(chat_session.id, "assistant", response)
 
         return {
             "content": response, 
@@ -92,27 +143,118 @@ class AgentService:
         Returns:
             Dict with content and session_id
         """
-        from .sk_orchestrator import SKOrchestrator
-        from .sk_agents import create_task_agent, create_qa_agent, create_tracking_agent, create_general_agent
+        chat_session = await self._open_chat_session(message, session_id)
+
+        # Confirmations and exact commands skip Kernel and agent setup entirely
+        response = await self._route_fast_path(message, chat_session)
+        if response is None:
+            await self._ensure_sk_orchestrator(chat_session)
+            response = await self._sk_orchestrator.process_request(message)
+
+        return await self._finish_sk_turn(chat_session, response)
+
+    async def process_request_stream(self, messages: List[Dict[str, str]], session_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of process_request.
 
+        Yields events: `session` first, then `delta` text chunks (with the
+        pending_confirmation JSON tail already stripped) and `reset` when a new
+        agent turn replaces the text streamed so far, and finally `done` with
+        the same payload process_request returns. The turn's chat writes are
+        committed once, before `done`, or when the stream ends early.
+        """
+        try:
+            async for event in self._process_request_stream(messages, session_id):
+                if event["type"] == "done":
+                    await self.outbox.flush()
+                yield event
+        except BaseException:
+            # Errors, client disconnects (GeneratorExit) and cancellation all end
+            # the turn early; shielded so a second cancel can't drop the writes
+            await asyncio.shield(self._flush_after_error())
+            raise
+
+    async def _process_request_stream(self, messages: List[Dict[str, str]], session_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        await self._fetch_user_context()
+
+        user_msg_content = messages[-1]["content"] if messages else ""
+
+        if not USE_SK_ORCHESTRATOR:
+            # The legacy pipeline has no token stream; send the whole reply at once
+            result = await self.process_request(messages, session_id=session_id)
+            yield {"type": "session", "session_id": result["session_id"]}
+            yield {"type": "delta", "content": result["content"]}
+            yield {"type": "done", **result}
+            return
+
+        chat_session = await self._open_chat_session(user_msg_content, session_id)
+        yield {"type": "session", "session_id": chat_session.id}
+
+        response = await self._route_fast_path(user_msg_content, chat_session)
+        if response is not None:
+            result = await self._finish_sk_turn(chat_session, response)
+            yield {"type": "delta", "content": result["content"]}
+            yield {"type": "done", **result}
+            return
+
+        await self._ensure_sk_orchestrator(chat_session)
+        current_turn = None
+        tail_filter = ConfirmationTailFilter()
+        async for turn, text in self._sk_orchestrator.process_request_stream(user_msg_content):
+            if turn != current_turn:
+                if current_turn is not None:
+                    yield {"type": "reset"}
+                current_turn = turn
+                tail_filter = ConfirmationTailFilter()
+            visible = tail_filter.feed(text)
+            if visible:
+                yield {"type": "delta", "content": visible}
+
+        visible = tail_filter.flush()
+        if visible:
+            yield {"type": "delta", "content": visible}
+
+        result = await self._finish_sk_turn(chat_session, self._sk_orchestrator.last_response)
+        yield {"type": "done", **result}
+
+    async def _open_chat_session(self, message: str, session_id: Optional[str]):
+        """Resolve (or create) the chat session and save the user message."""
         # Get or create chat session
         chat_session = None
         if session_id:
             chat_session = await crud.get_chat_session(self.session, session_id, self.user_id)
 
         if not chat_session:
-            chat_session = await crud.create_chat_session(self.session, self.user_id, title=message[:30])
+            chat_session = self.outbox.create_chat_session(self.user_id, title=message[:30])
 
         # Save user message
         if message:
-            await crud.add_chat_message(self.session, chat_session.id, "user", message)
+            self.outbox.add_message(chat_session.id, "user", message)
+
+        return chat_session
+
+    async def _route_fast_path(self, message: str, chat_session) -> Optional[str]:
+        """Reply for deterministic turns, or None when the agents are needed."""
+        if not USE_CHAT_FAST_PATH or not message:
+            return None
+        response = await FastPathRouter(self.session, self.user_id, self.outbox).route(message, chat_session.id)
+        if DEBUG_AGENT and response is not None:
+            print("SK: Handled turn on the fast path")
+        return response
+
+    async def _ensure_sk_orchestrator(self, chat_session):
+        """Build the orchestrator, its agents and the group chat once per service."""
+        from .sk_orchestrator import SKOrchestrator
+        from .sk_agents import create_task_agent, create_qa_agent, create_tracking_agent, create_general_agent
 
         # Initialize SK orchestrator (lazy initialization)
         if not self._sk_orchestrator:
             if DEBUG_AGENT:
                 print("SK: Initializing orchestrator and agents")
 
-            self._sk_orchestrator = SKOrchestrator(self.session, self.user_id, chat_session.id if chat_session else None)
+            self._sk_orchestrator = SKOrchestrator(
+                self.session, self.user_id, chat_session.id if chat_session else None, outbox=self.outbox
+            )
 
             # Get context for agents
             user_context = await self._sk_orchestrator.get_active_tasks_context()
@@ -132,9 +274,8 @@ class AgentService:
             # Create group chat
             self._sk_orchestrator.create_group_chat()
 
-        # Process message
-        response = await self._sk_orchestrator.process_request(message)
-        
+    async def _finish_sk_turn(self, chat_session, response: Optional[str]) -> Dict[str, Any]:
+        """Strip the confirmation marker, persist the assistant reply and build the result."""
         # Ensure response is valid
         if not response or not response.strip():
             response = "I'm not sure how to help with that."
@@ -143,15 +284,15 @@ class AgentService:
 
         # Save assistant response
         if response:
-            if "pending_confirmation:" in response:
+            if CONFIRMATION_MARKER in response:
                 # Remove the JSON part
-                clean_response = response.split("pending_confirmation:")[0].strip()
+                clean_response = response.split(CONFIRMATION_MARKER)[0].strip()
                 
                 # If the model output NOTHING but the confirmation marker, add a default message
                 if not clean_response:
                     clean_response = "I've prepared that task. Does it look correct? (Reply 'yes' to confirm)"
 
-            await crud.add_chat_message(self.session, chat_session.id, "assistant", clean_response)
+            self.outbox.add_message(chat_session.id, "assistant", clean_response)
 
         return {
             "content": clean_response, 
@@ -198,15 +339,16 @@ class AgentService:
             "tool_choice": "none" 
         }
 
-        async with httpx.AsyncClient(timeout=30.0) as client: 
-            try:
-                resp = await client.post(full_url, json=body, headers=headers, params=params)
-                resp.raise_for_status()
-                data = resp.json()
-                return data.get("choices", [{}])[0].get("message", {}).get("content", "")
-            except httpx.HTTPError as e:
-                print(f"LLM Provider Error: {e}")
-                raise
+        # Shared keep-alive pool instead of a new client (and TLS handshake) per call
+        client = get_llm_registry().http_client
+        try:
+            resp = await client.post(full_url, json=body, headers=headers, params=params, timeout=30.0)
+            resp.raise_for_status()
+            data = resp.json()
+            return data.get("choices", [{}])[0].get("message", {}).get("content", "")
+        except httpx.HTTPError as e:
+            print(f"LLM Provider Error: {e}")
+            raise
 
     def _extract_json(self, text: str) -> Optional[Dict[str, Any]]:
         try:
@@ -279,9 +421,8 @@ class AgentService:
 
     async def _handle_task_management(self, messages: List[Dict[str, str]]) -> str:
         # Fetch recent tasks to provide context
-        recent_tasks = await crud.get_tasks(self.session, self.user_id)
-        # Limit to most recent 10 non-completed tasks for context
-        active_tasks = [t for t in recent_tasks if t.status != TaskStatus.done][:10]
+        # Limit to the top 10 non-completed tasks for context
+        active_tasks = await crud.get_tasks(self.session, self.user_id, active_only=True, limit=10)
 
         task_context = ""
         if active_tasks:
@@ -341,7 +482,7 @@ class AgentService:
 
                     # Create task
                     task = await crud.create_task(self.session, TaskCreate(**args.dict()), self.user_id)
-                    await manager.broadcast("refresh", self.user_id)
+                    await publish_task_event(self.session, task, TASK_CREATED)
 
                     # Build confirmation with date info
                     parts = [f"Successfully created task: '{task.title}'"]
@@ -379,7 +520,7 @@ class AgentService:
                     task = await crud.get_task_by_id(self.session, args.id, self.user_id)
                     if task:
                         await crud.delete_task(self.session, task)
-                        await manager.broadcast("refresh", self.user_id)
+                        await publish_task_event(self.session, task, TASK_DELETED)
                         result_text = f"Deleted task '{task.title}'."
                         refresh_needed = True
                     else:
@@ -389,8 +530,9 @@ class AgentService:
                     args = CompleteTaskArgs(**tool_call.args)
                     task = await crud.get_task_by_id(self.session, args.id, self.user_id)
                     if task:
+                        before = snapshot(task)
                         await crud.update_task(self.session, task, {"status": "done"})
-                        await manager.broadcast("refresh", self.user_id)
+                        await publish_task_event(self.session, task, TASK_UPDATED, before)
                         result_text = f"Marked task '{task.title}' as complete."
                         refresh_needed = True
                     else:
@@ -413,8 +555,9 @@ class AgentService:
                             update_dict["notes"] = args.notes
 
                         if update_dict:
+                            before = snapshot(task)
                             await crud.update_task(self.session, task, update_dict)
-                            await manager.broadcast("refresh", self.user_id)
+                            await publish_task_event(self.session, task, TASK_UPDATED, before)
                             result_text = f"Updated task '{task.title}'."
                             refresh_needed = True
                         else:
@@ -0,0 +1,195 @@
+"""
+Deterministic pre-router for chat turns.
+
+Some turns never need a model: answering a pending confirmation ("yes",
+"no", "cancel"), "complete <exact task title>" and "delete <task id>". The
+SK path builds a Kernel, four agents, the active-task context and a group
+chat before it even looks at them. FastPathRouter recognises these turns up
+front and handles them with plain CRUD calls; anything else returns None and
+goes to the orchestrator as before.
+
+The pending-confirmation helpers and the confirmed-action executor live
+here so the orchestrator and the fast path share one implementation.
+"""
+
+import os
+import re
+from typing import Any, Dict, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import crud
+from ..models import TaskCreate, TaskStatus
+from .chat_outbox import ChatOutbox
+from .conversation_state import conversation_state
+
+DEBUG_AGENT = os.getenv("DEBUG_AGENT", "").lower() in ("1", "true", "yes")
+
+CONFIRM_REPLIES = {"yes", "y", "confirm", "create it", "do it"}
+CANCEL_REPLIES = {"no", "n", "cancel", "nevermind"}
+
+CANCELLED_REPLY = "Okay, cancelled. What else can I help with?"
+
+COMPLETE_PATTERN = re.compile(r"^(?:complete|finish)\s+(?:task\s+)?(?P<title>.+?)[.!]?$", re.IGNORECASE)
+DELETE_PATTERN = re.compile(r"^(?:delete|remove)\s+(?:task\s+)?#?(?P<id>[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})[.!]?$", re.IGNORECASE)
+
+
+def normalize_reply(message: str) -> str:
+    """Lowercase and strip surrounding whitespace and trailing punctuation."""
+    return message.strip().lower().rstrip(".!")
+
+
+async def load_pending_confirmation(
+    session: AsyncSession,
+    chat_session_id: Optional[str],
+    outbox: Optional[ChatOutbox] = None,
+) -> Optional[Dict[str, Any]]:
+    """The chat session's pending confirmation, if any."""
+    if not chat_session_id:
+        return None
+
+    state = await conversation_state.load(session, chat_session_id, outbox)
+    return state.get("pending_confirmation")
+
+
+async def save_pending_confirmation(
+    session: AsyncSession,
+    chat_session_id: Optional[str],
+    pending: Optional[Dict[str, Any]],
+    outbox: Optional[ChatOutbox] = None,
+):
+    """Persist (or, with an outbox, queue) the pending confirmation in the session's conversation state."""
+    if not chat_session_id:
+        return
+
+    await conversation_state.save(session, chat_session_id, {"pending_confirmation": pending}, outbox)
+    if DEBUG_AGENT:
+        print(f"SK: Saved pending confirmation: {pending}")
+
+
+async def execute_action(session: AsyncSession, user_id: str, action: str, details: Dict[str, Any]) -> str:
+    """
+    Execute a confirmed action.
+
+    Args:
+        session: Database session
+        user_id: Owner of the tasks
+        action: Action type (e.g., "create_task")
+        details: Action details
+
+    Returns:
+        Success message
+    """
+    from ..task_events import TASK_CREATED, TASK_UPDATED, publish_task_event, snapshot
+
+    if action == "create_task":
+        task_data = TaskCreate(**details)
+        task = await crud.create_task(session, task_data, user_id)
+        await publish_task_event(session, task, TASK_CREATED)
+
+        return f"✓ Created task: '{task.title}' (Priority: {task.priority_score}, Due: {task.due_date or 'Not set'})"
+
+    elif action == "complete_task":
+        task = await crud.get_task_by_id(session, details.get("id"), user_id)
+
+        if task:
+            before = snapshot(task)
+            await crud.update_task(session, task, {"status": "done"})
+            await publish_task_event(session, task, TASK_UPDATED, before)
+            return f"✓ Marked '{task.title}' as complete!"
+        else:
+            return "Error: Task not found."
+
+    elif action == "update_task":
+        task_id = details.pop("id")
+        task = await crud.get_task_by_id(session, task_id, user_id)
+
+        if task:
+            before = snapshot(task)
+            await crud.update_task(session, task, details)
+            await publish_task_event(session, task, TASK_UPDATED, before)
+            return f"✓ Updated '{task.title}'"
+        else:
+            return "Error: Task not found."
+
+    else:
+        return f"Error: Unknown action '{action}'"
+
+
+class FastPathRouter:
+    """Answers deterministic chat turns without building a Kernel or agents."""
+
+    def __init__(self, session: AsyncSession, user_id: str, outbox: Optional[ChatOutbox] = None):
+        self.session = session
+        self.user_id = user_id
+        self.outbox = outbox
+
+    async def route(self, message: str, chat_session_id: Optional[str]) -> Optional[str]:
+        """
+        Handle the turn if it is deterministic.
+
+        Returns:
+            The assistant reply, or None when the orchestrator should handle it
+        """
+        pending = await load_pending_confirmation(self.session, chat_session_id, self.outbox)
+        if pending:
+            # Anything but a plain yes/no is an edit and needs the Task Agent
+            return await self._answer_confirmation(message, pending, chat_session_id)
+
+        text = message.strip()
+
+        match = COMPLETE_PATTERN.match(text)
+        if match:
+            return await self._complete_by_title(match.group("title").strip().strip("'\""))
+
+        match = DELETE_PATTERN.match(text)
+        if match:
+            return await self._delete_by_id(match.group("id").lower())
+
+        return None
+
+    async def _answer_confirmation(self, message: str, pending: Dict[str, Any], chat_session_id: str) -> Optional[str]:
+        reply = normalize_reply(message)
+
+        if reply in CONFIRM_REPLIES:
+            if DEBUG_AGENT:
+                print(f"Fast path: executing pending action: {pending.get('action')}")
+            result = await execute_action(self.session, self.user_id, pending.get("action"), pending.get("details", {}))
+            await save_pending_confirmation(self.session, chat_session_id, None, self.outbox)
+            return result
+
+        if reply in CANCEL_REPLIES:
+            await save_pending_confirmation(self.session, chat_session_id, None, self.outbox)
+            return CANCELLED_REPLY
+
+        return None
+
+    async def _complete_by_title(self, title: str) -> Optional[str]:
+        """Complete the one active task whose title matches exactly (case-insensitive)."""
+        from ..task_events import TASK_UPDATED, publish_task_event, snapshot
+
+        results = await crud.search_tasks(self.session, self.user_id, title)
+        exact = [
+            task for task, _ in results
+            if task.title.strip().lower() == title.lower() and task.status != TaskStatus.done
+        ]
+        if len(exact) != 1:
+            # Fuzzy or ambiguous: let the Task Agent ask which one
+            return None
+
+        task = exact[0]
+        before = snapshot(task)
+        await crud.update_task(self.session, task, {"status": "done"})
+        await publish_task_event(self.session, task, TASK_UPDATED, before)
+        return f"✓ Marked '{task.title}' as complete!"
+
+    async def _delete_by_id(self, task_id: str) -> Optional[str]:
+        from ..task_events import TASK_DELETED, publish_task_event
+
+        task = await crud.get_task_by_id(self.session, task_id, self.user_id)
+        if not task:
+            return None
+
+        await crud.delete_task(self.session, task)
+        await publish_task_event(self.session, task, TASK_DELETED)
+        return f"✓ Deleted task '{task.title}'."
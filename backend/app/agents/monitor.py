@@ -1,6 +1,7 @@
 import asyncio
+import json
 from datetime import datetime, timedelta
-from typing import List
+from typing import List, Optional
 from sqlmodel import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from ..models import Task, TaskStatus, ChatSession, User
@@ -87,4 +88,90 @@ class TaskMonitor:
         # For MVP, we'll just alert. In prod, check last alert timestamp.
 
         await crud.add_chat_message(session, chat_session.id, "assistant", message_content)
-        await manager.broadcast("refresh", user_id) # Notify frontend to refresh chat/tasks
+        await manager.broadcast(json.dumps({"type": "chat.message", "session_id": chat_session.id}), user_id)
+
+
+class TaskReranker:
+    """
+    Keeps the materialized Task.hybrid_score fresh as due dates approach.
+
+    Writes already refresh the score; this only re-ranks tasks whose urgency
+    bucket can have moved since the previous pass. The first pass after a boot
+    refreshes tasks inside their urgency window and backfills rows still at
+    the default score (see crud.rerank_tasks).
+    """
+
+    def __init__(self, session_factory, interval_seconds: int = 900):
+        self.session_factory = session_factory
+        self.interval_seconds = interval_seconds
+        self.last_run: Optional[datetime] = None
+
+    async def start(self):
+        print("Task Reranker: Started")
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"Task Reranker Error: {e}")
+
+            await asyncio.sleep(self.interval_seconds)
+
+    async def run_once(self) -> int:
+        now = datetime.utcnow()
+        async with self.session_factory() as session:
+            updated = await crud.rerank_tasks(session, self.last_run, now)
+        self.last_run = now
+        return updated
+
+
+class TaskPurger:
+    """
+    Hard-deletes soft-deleted tasks once their restore window has passed,
+    and task change events older than `event_retention_seconds`.
+
+    Works in batches of `batch_size`, each its own transaction, pausing
+    briefly between batches so a large backlog never holds long locks.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        interval_seconds: int = 3600,
+        batch_size: int = 500,
+        batch_pause_seconds: float = 0.1,
+        event_retention_seconds: int = 86400,
+    ):
+        self.session_factory = session_factory
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.batch_pause_seconds = batch_pause_seconds
+        self.event_retention_seconds = event_retention_seconds
+
+    async def start(self):
+        print("Task Purger: Started")
+        while True:
+            try:
+                purged = await self.run_once()
+                if purged:
+                    print(f"Task Purger: Removed {purged} deleted tasks")
+                await self.prune_events()
+            except Exception as e:
+                print(f"Task Purger Error: {e}")
+
+            await asyncio.sleep(self.interval_seconds)
+
+    async def run_once(self) -> int:
+        cutoff = datetime.utcnow() - crud.DELETED_TASK_RESTORE_WINDOW
+        total = 0
+        while True:
+            async with self.session_factory() as session:
+                purged = await crud.purge_deleted_tasks(session, cutoff, self.batch_size)
+            total += purged
+            if purged < self.batch_size:
+                return total
+            await asyncio.sleep(self.batch_pause_seconds)
+
+    async def prune_events(self) -> int:
+        cutoff = datetime.utcnow() - timedelta(seconds=self.event_retention_seconds)
+        async with self.session_factory() as session:
+            return await crud.purge_task_events(session, cutoff)
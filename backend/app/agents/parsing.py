@@ -1,59 +1,16 @@
 import json
 from typing import Optional, Dict, Any
 from sqlalchemy.ext.asyncio import AsyncSession
-from semantic_kernel import Kernel
 from semantic_kernel.contents import ChatMessageContent, AuthorRole, ChatHistory
-from semantic_kernel.connectors.ai.open_ai import AzureChatCompletion, OpenAIChatCompletion
-from openai import AsyncOpenAI
 
 from ..config import get_settings
+from ..llm_clients import get_llm_registry
 from ..models import TaskParseResponse, Priority
 
 class TaskParsingService:
     def __init__(self):
         self.settings = get_settings()
-        self.kernel = Kernel()
-        self._setup_ai_service()
-
-    def _setup_ai_service(self):
-        provider = self.settings.llm_provider.lower()
-        if not self.settings.llm_model:
-            raise ValueError("LLM_MODEL environment variable is required")
-
-        if provider == "azure":
-            service = AzureChatCompletion(
-                deployment_name=self.settings.llm_model,
-                endpoint=self.settings.llm_base_url,
-                api_key=self.settings.llm_api_key,
-                api_version=self.settings.azure_openai_api_version or "2024-02-01",
-                service_id="chat"
-            )
-        elif provider == "openai":
-            service = OpenAIChatCompletion(
-                service_id="chat",
-                ai_model_id=self.settings.llm_model,
-                api_key=self.settings.llm_api_key
-            )
-        elif provider in ["groq", "local"]:
-            base_url = self.settings.llm_base_url
-            if base_url.endswith("/chat/completions"):
-                base_url = base_url.replace("/chat/completions", "")
-            if provider == "groq" and "openai/v1" not in base_url:
-                base_url = base_url.rstrip("/") + "/openai/v1"
-
-            custom_client = AsyncOpenAI(
-                base_url=base_url,
-                api_key=self.settings.groq_api_key or self.settings.llm_api_key or "not-needed"
-            )
-            service = OpenAIChatCompletion(
-                service_id="chat",
-                ai_model_id=self.settings.llm_model,
-                async_client=custom_client
-            )
-        else:
-            raise ValueError(f"Unsupported LLM provider: {provider}")
-
-        self.kernel.add_service(service)
+        self.kernel = get_llm_registry().create_kernel()
 
     async def parse_task(self, input_text: str) -> TaskParseResponse:
         prompt = f"""Extract task details from this natural language input: "{input_text}"
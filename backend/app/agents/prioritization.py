@@ -1,15 +1,17 @@
-from typing import List, Dict, Any, Optional
+import asyncio
+from typing import List, Dict, Any, Optional, Sequence, Tuple
 from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import bindparam, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlmodel import select
 
-from semantic_kernel import Kernel
-from semantic_kernel.connectors.ai.open_ai import AzureChatCompletion, OpenAIChatCompletion
-from openai import AsyncOpenAI
-
 from ..config import get_settings
+from ..llm_clients import get_llm_registry
 from ..models import Task, TaskStatus
 from .. import crud
+from .score_cache import score_cache
 
 def _extract_json_from_response(response_str: str) -> Optional[Dict[str, Any]]:
     import json
@@ -22,7 +24,180 @@ def _extract_json_from_response(response_str: str) -> Optional[Dict[str, Any]]:
     except json.JSONDecodeError:
         return None
 
-def calculate_urgency_score(due_date: Optional[datetime]) -> int:
+def _format_task_block(task: Task) -> str:
+    """Prompt entry for one task."""
+    due_date_str = task.due_date.strftime("%Y-%m-%d %H:%M") if task.due_date else "No due date"
+    return (
+        f"- ID: {task.id}\n"
+        f"  Title: {task.title}\n"
+        f"  Status: {task.status.value}\n"
+        f"  Priority: {task.priority.value} ({task.priority_score})\n"
+        f"  Due: {due_date_str}\n"
+        f"  Estimated Duration: {task.estimated_duration or 'N/A'} minutes\n"
+        f"  Value Score: {task.value_score}\n"
+        f"  Effort Score: {task.effort_score}\n"
+        f"  Feedback: {task.ai_suggestion_status.value}\n\n"
+    )
+
+# Rough token estimate (~4 characters per token); good enough for budgeting
+# prompts without pulling in a model-specific tokenizer.
+def _estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+# Expected completion size per task in a scoring response
+_SCORE_RESPONSE_TOKENS = 40
+
+def chunk_tasks_by_tokens(tasks: Sequence[Task], token_budget: int) -> List[List[Task]]:
+    """
+    Split tasks into consecutive chunks whose prompt entries plus expected
+    response fit in `token_budget`. A task larger than the budget gets a
+    chunk of its own, so a budget of zero or less means one task per chunk.
+    """
+    chunks: List[List[Task]] = []
+    current: List[Task] = []
+    used = 0
+    for task in tasks:
+        cost = _estimate_tokens(_format_task_block(task)) + _SCORE_RESPONSE_TOKENS
+        if current and used + cost > token_budget:
+            chunks.append(current)
+            current, used = [], 0
+        current.append(task)
+        used += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+def _parse_chunk_scores(chunk: Sequence[Task], data: Dict[str, Any], anchor_ids=()) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """
+    task_id -> (raw score clamped to 0-100, reasoning) for the chunk's own
+    tasks, and task_id -> raw score for the anchors scored alongside them.
+    """
+    chunk_ids = {t.id for t in chunk}
+    entries: Dict[str, Any] = {}
+    anchor_scores: Dict[str, float] = {}
+    for entry in data["scores"]:
+        task_id = entry.get("task_id")
+        if task_id in entries or task_id in anchor_scores:
+            continue
+        if task_id not in chunk_ids and task_id not in anchor_ids:
+            continue
+        try:
+            raw = float(entry.get("score"))
+        except (TypeError, ValueError):
+            continue
+        if np.isnan(raw):
+            continue
+        raw = max(0.0, min(100.0, raw))
+        if task_id in chunk_ids:
+            entries[task_id] = (raw, entry.get("reasoning"))
+        else:
+            anchor_scores[task_id] = raw
+    return entries, anchor_scores
+
+def _anchor_calibration(scored: Dict[str, float], reference: Dict[str, float]):
+    """
+    Linear map taking this run's anchor scores onto their reference scores
+    (least squares), or a plain offset when the anchors can't fix a slope.
+    None when no anchor was scored.
+    """
+    pairs = [(scored[task_id], reference[task_id]) for task_id in scored if task_id in reference]
+    if not pairs:
+        return None
+    xs = np.array([x for x, _ in pairs])
+    ys = np.array([y for _, y in pairs])
+    if len(pairs) > 1 and xs.max() > xs.min():
+        slope, intercept = np.polyfit(xs, ys, 1)
+        if slope > 0:
+            return lambda raw: slope * raw + intercept
+    offset = float(ys.mean() - xs.mean())
+    return lambda raw: raw + offset
+
+def merge_chunk_scores(
+    chunks: Sequence[Sequence[Task]],
+    results: Sequence[Any],
+    anchors: Optional[Dict[str, float]] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Merge per-chunk scoring responses into one `scores` list.
+
+    Failed chunks (exceptions or unparseable output) are skipped, and entries
+    for IDs that were not part of the chunk, or already scored, are dropped.
+    Scores are clamped to 0-100 and then calibrated across chunks: each chunk
+    is scored without seeing the others, and the rubric pulls every chunk
+    toward its own near-100 task. So when more than one chunk produced scores,
+    each chunk's scores are min-max rescaled onto the overall range of scores
+    (a chunk whose scores are all equal is left as-is).
+
+    `anchors` (task_id -> reference score) are already-scored tasks sent
+    along with every chunk. When given, each chunk is instead mapped so its
+    anchors' scores land on their reference scores, which puts the chunks on
+    the same scale as the earlier run the references came from. Anchor
+    entries are not part of the result. The strategy summary of the chunk
+    holding the highest-scored task is kept. Returns None if no chunk
+    produced a usable score.
+    """
+    parsed = []
+    failed = 0
+    for chunk, data in zip(chunks, results):
+        if isinstance(data, BaseException) or not data or "scores" not in data:
+            failed += 1
+            continue
+        entries, anchor_scores = _parse_chunk_scores(chunk, data, anchors or ())
+        if entries:
+            calibrate = _anchor_calibration(anchor_scores, anchors) if anchors else None
+            parsed.append((entries, calibrate, data.get("strategy_summary")))
+
+    if not parsed:
+        return None
+
+    raw_scores = [raw for entries, _, _ in parsed for raw, _ in entries.values()]
+    low, high = min(raw_scores), max(raw_scores)
+
+    scores = []
+    seen = set()
+    summary = None
+    summary_score = -1
+    for entries, calibrate, chunk_summary in parsed:
+        chunk_low = min(raw for raw, _ in entries.values())
+        chunk_high = max(raw for raw, _ in entries.values())
+        rescale = calibrate is None and len(parsed) > 1 and chunk_high > chunk_low
+        best = -1
+        for task_id, (raw, reasoning) in entries.items():
+            if task_id in seen:
+                continue
+            if calibrate is not None:
+                raw = calibrate(raw)
+            elif rescale:
+                raw = low + (raw - chunk_low) * (high - low) / (chunk_high - chunk_low)
+            score = max(0, min(100, int(round(raw))))
+            seen.add(task_id)
+            scores.append({"task_id": task_id, "score": score, "reasoning": reasoning})
+            best = max(best, score)
+        if chunk_summary and best > summary_score:
+            summary, summary_score = chunk_summary, best
+
+    return {
+        "scores": scores,
+        "strategy_summary": summary or "",
+        "chunks": len(chunks),
+        "failed_chunks": failed,
+    }
+
+# Cached tasks re-scored along with cache misses, so the fresh scores can be
+# put on the cached scores' scale
+SCORE_ANCHOR_TASKS = 4
+
+def pick_anchor_tasks(tasks: Sequence[Task], scores: Dict[str, float], count: int = SCORE_ANCHOR_TASKS) -> List[Task]:
+    """Up to `count` of `tasks` spread evenly over the range of their scores."""
+    ranked = sorted(tasks, key=lambda t: scores[t.id])
+    if len(ranked) <= count:
+        return ranked
+    if count <= 1:
+        return ranked[-count:] if count > 0 else []
+    indexes = sorted({round(i * (len(ranked) - 1) / (count - 1)) for i in range(count)})
+    return [ranked[i] for i in indexes]
+
+def calculate_urgency_score(due_date: Optional[datetime], now: Optional[datetime] = None) -> int:
     """
     Calculates an urgency score (0-100) based on the due date.
     - Overdue or due now: 100
@@ -32,7 +207,7 @@ def calculate_urgency_score(due_date: Optional[datetime]) -> int:
     if not due_date:
         return 0
     
-    now = datetime.utcnow()
+    now = now or datetime.utcnow()
     if due_date <= now:
         return 100
     
@@ -46,88 +221,120 @@ def calculate_urgency_score(due_date: Optional[datetime]) -> int:
     score = 100 * (1 - days_left / 7)
     return int(round(score))
 
-def calculate_hybrid_score(ai_score: int, due_date: Optional[datetime], priority_score: int) -> int:
+def calculate_hybrid_score(ai_score: int, due_date: Optional[datetime], priority_score: int, now: Optional[datetime] = None) -> int:
     """
     Calculates a balanced hybrid score (0-100).
     Weights: 50% AI, 30% Urgency, 20% Priority.
     """
-    urgency_score = calculate_urgency_score(due_date)
+    urgency_score = calculate_urgency_score(due_date, now)
     
     hybrid = (0.5 * ai_score) + (0.3 * urgency_score) + (0.2 * priority_score)
     return int(round(hybrid))
 
+def _seconds_until(due_dates, now: datetime) -> np.ndarray:
+    """Seconds from `now` to each due date as float64, NaN where there is no due date."""
+    if isinstance(due_dates, np.ndarray) and due_dates.dtype.kind == "M":
+        # Already datetime64: integer microseconds -> seconds, no Python objects involved
+        dues = due_dates.astype("datetime64[us]")
+        seconds = (dues - np.datetime64(now, "us")).astype(np.int64) / 1e6
+        return np.where(np.isnat(dues), np.nan, seconds)
+
+    # Converting datetime objects to datetime64 is slower than timedelta arithmetic
+    return np.fromiter(
+        ((d - now).total_seconds() if d is not None else np.nan for d in due_dates),
+        dtype=np.float64,
+        count=len(due_dates),
+    )
+
+def calculate_urgency_scores(due_dates: Sequence[Optional[datetime]], now: Optional[datetime] = None) -> np.ndarray:
+    """
+    Vectorized calculate_urgency_score: one urgency score per due date.
+
+    Accepts a sequence of datetimes (None for no due date) or a datetime64
+    array (NaT for no due date). Reads `now` once and returns an int64 array
+    whose values exactly match the scalar function (same float operations,
+    same half-to-even rounding).
+    """
+    now = now or datetime.utcnow()
+    seconds_left = _seconds_until(due_dates, now)
+    days_left = seconds_left / (24 * 3600)
+
+    with np.errstate(invalid="ignore"):
+        scores = np.rint(100 * (1 - days_left / 7))
+        scores = np.where(days_left >= 7, 0, scores)
+        scores = np.where(days_left <= 0, 100, scores)
+    scores = np.where(np.isnan(days_left), 0, scores)
+    return scores.astype(np.int64)
+
+def _combine_hybrid(ai_scores: Sequence[int], urgency: np.ndarray, priority_scores: Sequence[int]) -> np.ndarray:
+    ai = np.asarray(ai_scores, dtype=np.float64)
+    priority = np.asarray(priority_scores, dtype=np.float64)
+    hybrid = (0.5 * ai) + (0.3 * urgency) + (0.2 * priority)
+    return np.rint(hybrid).astype(np.int64)
+
+def calculate_hybrid_scores(
+    ai_scores: Sequence[int],
+    due_dates: Sequence[Optional[datetime]],
+    priority_scores: Sequence[int],
+    now: Optional[datetime] = None,
+) -> np.ndarray:
+    """
+    Vectorized calculate_hybrid_score over parallel arrays.
+
+    Returns an int64 array that exactly matches the scalar version.
+    """
+    urgency = calculate_urgency_scores(due_dates, now)
+    return _combine_hybrid(ai_scores, urgency, priority_scores)
+
+def refresh_hybrid_scores(tasks: Sequence[Task], now: Optional[datetime] = None) -> int:
+    """
+    Batch version of refresh_hybrid_score.
+
+    Returns the number of tasks whose stored values changed.
+    """
+    if not tasks:
+        return 0
+
+    buckets = calculate_urgency_scores([t.due_date for t in tasks], now)
+    hybrids = _combine_hybrid(
+        [t.ai_relevance_score or 0 for t in tasks],
+        buckets,
+        [t.priority_score for t in tasks],
+    )
+
+    changed = 0
+    for task, bucket, hybrid in zip(tasks, buckets.tolist(), hybrids.tolist()):
+        if task.urgency_bucket != bucket or task.hybrid_score != hybrid:
+            task.urgency_bucket = bucket
+            task.hybrid_score = hybrid
+            changed += 1
+    return changed
+
+def refresh_hybrid_score(task: Task, now: Optional[datetime] = None) -> bool:
+    """
+    Recompute the materialized urgency_bucket and hybrid_score of a task.
+
+    Returns True if either stored value changed.
+    """
+    bucket = calculate_urgency_score(task.due_date, now)
+    hybrid = calculate_hybrid_score(task.ai_relevance_score or 0, task.due_date, task.priority_score, now)
+    changed = task.urgency_bucket != bucket or task.hybrid_score != hybrid
+    task.urgency_bucket = bucket
+    task.hybrid_score = hybrid
+    return changed
+
 class AIPrioritizationService:
     def __init__(self, session: AsyncSession, user_id: str):
         self.session = session
         self.user_id = user_id
         self.settings = get_settings()
-        self.kernel = Kernel()
-        self._setup_ai_service()
-
-    def _setup_ai_service(self):
-        """Configure the AI service based on settings."""
-        provider = self.settings.llm_provider.lower()
-
-        if not self.settings.llm_model:
-            raise ValueError("LLM_MODEL environment variable is required")
-
-        if provider == "azure":
-            service = AzureChatCompletion(
-                deployment_name=self.settings.llm_model,
-                endpoint=self.settings.llm_base_url,
-                api_key=self.settings.llm_api_key,
-                api_version=self.settings.azure_openai_api_version or "2024-02-01",
-                service_id="chat"
-            )
-        elif provider == "openai":
-            service = OpenAIChatCompletion(
-                service_id="chat",
-                ai_model_id=self.settings.llm_model,
-                api_key=self.settings.llm_api_key
-            )
-        elif provider in ["groq", "local"]:
-            base_url = self.settings.llm_base_url
-            if base_url and base_url.endswith("/chat/completions"):
-                base_url = base_url.replace("/chat/completions", "")
-            
-            if provider == "groq" and base_url and "openai/v1" not in base_url:
-                if base_url.endswith("/"):
-                    base_url += "openai/v1"
-                else:
-                    base_url += "/openai/v1"
-
-            custom_client = AsyncOpenAI(
-                base_url=base_url,
-                api_key=self.settings.groq_api_key or self.settings.llm_api_key or "not-needed"
-            )
-            service = OpenAIChatCompletion(
-                service_id="chat",
-                ai_model_id=self.settings.llm_model,
-                async_client=custom_client
-            )
-        else:
-            raise ValueError(f"Unsupported LLM provider: {provider}. Must be one of: azure, openai, groq, local")
-
-        self.kernel.add_service(service)
+        self.kernel = get_llm_registry().create_kernel()
 
     async def get_prioritization_prompt(self, tasks: List[Task], current_capacity: str) -> str:
         """
         Generates a prompt for the LLM to get a prioritization suggestion.
         """
-        task_list_str = ""
-        for task in tasks:
-            due_date_str = task.due_date.strftime("%Y-%m-%d %H:%M") if task.due_date else "No due date"
-            task_list_str += (
-                f"- ID: {task.id}\n"
-                f"  Title: {task.title}\n"
-                f"  Status: {task.status.value}\n"
-                f"  Priority: {task.priority.value} ({task.priority_score})\n"
-                f"  Due: {due_date_str}\n"
-                f"  Estimated Duration: {task.estimated_duration or 'N/A'} minutes\n"
-                f"  Value Score: {task.value_score}\n"
-                f"  Effort Score: {task.effort_score}\n"
-                f"  Feedback: {task.ai_suggestion_status.value}\n\n"
-            )
+        task_list_str = "".join(_format_task_block(task) for task in tasks)
         
         prompt = f"""You are an AI assistant designed to help a user with ADHD prioritize tasks.
 Your goal is to suggest ONE single 'Do This Now' task from their current active tasks.
@@ -161,20 +368,7 @@ Explain your reasoning briefly, focusing on urgency and momentum.
         """
         Generates a prompt for the LLM to score all active tasks.
         """
-        task_list_str = ""
-        for task in tasks:
-            due_date_str = task.due_date.strftime("%Y-%m-%d %H:%M") if task.due_date else "No due date"
-            task_list_str += (
-                f"- ID: {task.id}\n"
-                f"  Title: {task.title}\n"
-                f"  Status: {task.status.value}\n"
-                f"  Priority: {task.priority.value} ({task.priority_score})\n"
-                f"  Due: {due_date_str}\n"
-                f"  Estimated Duration: {task.estimated_duration or 'N/A'} minutes\n"
-                f"  Value Score: {task.value_score}\n"
-                f"  Effort Score: {task.effort_score}\n"
-                f"  Feedback: {task.ai_suggestion_status.value}\n\n"
-            )
+        task_list_str = "".join(_format_task_block(task) for task in tasks)
 
         history_str = f"\n**User's Historical Context:**\n{history_context}\n" if history_context else ""
         current_time = datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC")
@@ -212,6 +406,73 @@ Assign a score and one-sentence reasoning to EVERY task listed above. Explain th
 """
         return prompt
 
+    async def _write_back_scores(self, task_map: Dict[str, Task], score_entries: List[Dict[str, Any]]) -> int:
+        """
+        Persist LLM scores for already-loaded tasks in a single executemany UPDATE.
+
+        Entries are validated against `task_map` (the user's active tasks)
+        instead of re-querying each ID; unknown IDs and non-numeric scores are
+        skipped. The in-memory tasks are updated as committed state so the
+        session doesn't flush them a second time. Tasks whose stored values
+        already match are skipped. Returns the number of rows updated.
+        """
+        scored_tasks = []
+        reasoning_by_id = {}
+        stored = {}
+        for score_entry in score_entries:
+            task = task_map.get(score_entry.get("task_id"))
+            try:
+                score = int(score_entry.get("score"))
+            except (TypeError, ValueError):
+                continue
+            if task is None:
+                continue
+            stored[task.id] = (task.ai_relevance_score, task.ai_reasoning, task.urgency_bucket, task.hybrid_score)
+            task.ai_relevance_score = max(0, min(100, score))
+            reasoning_by_id[task.id] = score_entry.get("reasoning")
+            scored_tasks.append(task)
+
+        refresh_hybrid_scores(scored_tasks)
+
+        # Cached scores usually match what is already stored; only write real changes
+        scored_tasks = [
+            task for task in scored_tasks
+            if (task.ai_relevance_score, reasoning_by_id[task.id], task.urgency_bucket, task.hybrid_score) != stored[task.id]
+        ]
+        if not scored_tasks:
+            return 0
+
+        table = Task.__table__
+        statement = (
+            update(table)
+            .where(table.c.id == bindparam("b_id"), table.c.user_id == self.user_id)
+            .values(
+                ai_relevance_score=bindparam("b_ai_relevance_score"),
+                ai_reasoning=bindparam("b_ai_reasoning"),
+                urgency_bucket=bindparam("b_urgency_bucket"),
+                hybrid_score=bindparam("b_hybrid_score"),
+            )
+        )
+        params = []
+        for task in scored_tasks:
+            params.append({
+                "b_id": task.id,
+                "b_ai_relevance_score": task.ai_relevance_score,
+                "b_ai_reasoning": reasoning_by_id[task.id],
+                "b_urgency_bucket": task.urgency_bucket,
+                "b_hybrid_score": task.hybrid_score,
+            })
+            for key in ("ai_relevance_score", "urgency_bucket", "hybrid_score"):
+                set_committed_value(task, key, getattr(task, key))
+            set_committed_value(task, "ai_reasoning", reasoning_by_id[task.id])
+
+        result = await self.session.execute(statement, params)
+        await self.session.commit()
+
+        # asyncpg can't report per-statement counts for executemany
+        rowcount = getattr(result, "rowcount", -1)
+        return rowcount if isinstance(rowcount, int) and rowcount >= 0 else len(params)
+
     async def update_task_scores(self) -> Optional[Dict[str, Any]]:
         """
         Calculates and updates AI relevance scores for all active tasks.
@@ -239,37 +500,108 @@ Assign a score and one-sentence reasoning to EVERY task listed above. Explain th
         recent_completed = completed_tasks[:10]
         history_context = "Recent completions:\n" + "\n".join([f"- {t.title}" for t in recent_completed]) if recent_completed else "No recent completions."
 
-        # Generate prompt
-        prompt = await self.get_list_prioritization_prompt(active_tasks, current_capacity, history_context)
+        # Reuse cached scores for tasks whose prompt entry hasn't changed
+        context = "\n".join([
+            self.settings.llm_provider,
+            self.settings.llm_model,
+            current_capacity,
+            history_context,
+            datetime.utcnow().strftime("%Y-%m-%d %H"),
+        ])
+        keys = {t.id: score_cache.make_key(self.user_id, context, [_format_task_block(t)]) for t in active_tasks}
+        cached: Dict[str, Dict[str, Any]] = {}
+        for task in active_tasks:
+            entry = score_cache.get(keys[task.id])
+            if entry is not None:
+                cached[task.id] = entry
+        pending = [t for t in active_tasks if t.id not in cached]
+
+        # Cache misses are scored with a few cached tasks for context, and
+        # calibrated against those tasks' cached scores
+        anchor_tasks = pick_anchor_tasks([t for t in active_tasks if t.id in cached], {
+            task_id: entry["score"] for task_id, entry in cached.items()
+        }) if pending else []
+        anchors = {t.id: cached[t.id]["score"] for t in anchor_tasks}
+
+        # Split the rest into token-budgeted chunks so small local models aren't overflowed
+        header = await self.get_list_prioritization_prompt([], current_capacity, history_context)
+        header_tokens = _estimate_tokens(header)
+        anchor_tokens = sum(_estimate_tokens(_format_task_block(t)) + _SCORE_RESPONSE_TOKENS for t in anchor_tasks)
+        budget = self.settings.ai_scoring_chunk_tokens - header_tokens - anchor_tokens
+        if budget <= 0 and pending:
+            print(f"Warning: scoring prompt header (~{header_tokens} tokens) exceeds "
+                  f"ai_scoring_chunk_tokens={self.settings.ai_scoring_chunk_tokens}; scoring one task per chunk")
+        chunks = chunk_tasks_by_tokens(pending, budget)
+
+        semaphore = asyncio.Semaphore(max(1, self.settings.ai_scoring_max_concurrency))
+        results = await asyncio.gather(
+            *[self._score_chunk(chunk + anchor_tasks, current_capacity, history_context, semaphore) for chunk in chunks],
+            return_exceptions=True,
+        )
+        for index, outcome in enumerate(results):
+            if isinstance(outcome, BaseException):
+                print(f"Error scoring task chunk {index + 1}/{len(chunks)}: {outcome!r}")
+
+        fresh = merge_chunk_scores(chunks, results, anchors=anchors or None)
+        if fresh:
+            for entry in fresh["scores"]:
+                task_id = entry["task_id"]
+                cached_entry = {**entry, "strategy_summary": fresh["strategy_summary"]}
+                score_cache.put(keys[task_id], self.user_id, [task_id], cached_entry)
+        if not fresh and not cached:
+            return None
 
-        # Call LLM
+        scores_by_id = dict(cached)
+        scores_by_id.update((entry["task_id"], entry) for entry in (fresh["scores"] if fresh else []))
+        scores = [
+            {"task_id": t.id, "score": scores_by_id[t.id]["score"], "reasoning": scores_by_id[t.id]["reasoning"]}
+            for t in active_tasks if t.id in scores_by_id
+        ]
+        # A fresh summary may describe only the few re-scored tasks; use it when
+        # the fresh run covered the whole list or holds the top task
+        top_id = max(scores, key=lambda entry: entry["score"])["task_id"]
+        if fresh and fresh["strategy_summary"] and (not cached or top_id not in cached):
+            summary = fresh["strategy_summary"]
+        else:
+            best = max(cached.values(), key=lambda entry: entry["score"], default=None)
+            summary = best["strategy_summary"] if best else ""
+        data = {
+            "scores": scores,
+            "strategy_summary": summary,
+            "chunks": len(chunks),
+            "failed_chunks": fresh["failed_chunks"] if fresh else len(chunks),
+            "cached_tasks": len(cached),
+        }
+
+        # Partial results are still written if some chunks failed
         try:
-            result = await self.kernel.invoke_prompt(prompt, service_id="chat")
-            data = _extract_json_from_response(str(result))
-            
-            if data and "scores" in data:
-                # Update tasks in DB
-                for score_entry in data["scores"]:
-                    task_id = score_entry.get("task_id")
-                    score = score_entry.get("score")
-                    reasoning = score_entry.get("reasoning")
-                    if task_id and score is not None:
-                        # Direct update to avoid overhead
-                        from sqlmodel import select
-                        statement = select(Task).where(Task.id == task_id, Task.user_id == self.user_id)
-                        res = await self.session.execute(statement)
-                        task = res.scalar_one_or_none()
-                        if task:
-                            task.ai_relevance_score = score
-                            task.ai_reasoning = reasoning
-                
-                await self.session.commit()
-                return data
-            return None
+            task_map = {t.id: t for t in active_tasks}
+            updated = await self._write_back_scores(task_map, data["scores"])
         except Exception as e:
             print(f"Error updating task scores: {e}")
             return None
 
+        print(f"Updated AI scores for {updated} of {len(active_tasks)} active tasks "
+              f"({len(cached)} cached, {data['failed_chunks']} of {len(chunks)} chunks failed)")
+        data["updated_count"] = updated
+        return data
+
+    async def _score_chunk(
+        self,
+        tasks: List[Task],
+        current_capacity: str,
+        history_context: Optional[str],
+        semaphore: asyncio.Semaphore,
+    ) -> Optional[Dict[str, Any]]:
+        """Score one chunk of tasks, bounded by the shared semaphore and the per-chunk timeout."""
+        prompt = await self.get_list_prioritization_prompt(tasks, current_capacity, history_context)
+        async with semaphore:
+            result = await asyncio.wait_for(
+                self.kernel.invoke_prompt(prompt, service_id="chat"),
+                timeout=self.settings.ai_scoring_chunk_timeout_seconds,
+            )
+        return _extract_json_from_response(str(result))
+
     async def get_ai_suggestion(self) -> Optional[Dict[str, Any]]:
         """
         Fetches an AI-powered prioritization suggestion by first updating all scores.
@@ -0,0 +1,115 @@
+"""
+Content-addressed cache for LLM task scoring results.
+
+Each task's score is keyed by a hash of exactly what its prompt depends on:
+the model, the capacity/history context, an hour time bucket and the task's
+own prompt entry. Keys are per task rather than per chunk so that adding or
+removing one task, which shifts every chunk boundary after it, only sends
+the tasks without a cached score to the LLM. Any change to a task's
+prompt-relevant fields produces a new key, and entries holding a task are
+also dropped explicitly when that task is edited so stale results don't
+linger until the TTL.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Sequence, Set, Tuple
+
+from ..config import get_settings
+
+# Task fields that feed the scoring prompt; editing any of them invalidates
+# cached scores for the task.
+SCORE_PROMPT_FIELDS = {
+    "title",
+    "status",
+    "priority",
+    "priority_score",
+    "due_date",
+    "estimated_duration",
+    "value_score",
+    "effort_score",
+    "ai_suggestion_status",
+}
+
+
+@dataclass
+class CachedScores:
+    user_id: str
+    task_ids: Tuple[str, ...]
+    data: Dict[str, Any]
+    expires_at: float
+
+
+class ScoreCache:
+    """LRU of scoring results with a TTL and per-task invalidation."""
+
+    def __init__(self, max_entries: int = 20000, ttl_seconds: int = 600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, CachedScores]" = OrderedDict()
+        self._by_task: Dict[Tuple[str, str], Set[str]] = {}
+
+    @staticmethod
+    def make_key(user_id: str, context: str, task_blocks: Sequence[str]) -> str:
+        digest = hashlib.sha256()
+        for part in (user_id, context, *task_blocks):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() >= entry.expires_at:
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry.data
+
+    def put(self, key: str, user_id: str, task_ids: Iterable[str], data: Dict[str, Any]):
+        if self.ttl_seconds <= 0:
+            return
+        self._drop(key)
+        entry = CachedScores(
+            user_id=user_id,
+            task_ids=tuple(task_ids),
+            data=data,
+            expires_at=time.monotonic() + self.ttl_seconds,
+        )
+        self._entries[key] = entry
+        for task_id in entry.task_ids:
+            self._by_task.setdefault((user_id, task_id), set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    def invalidate_task(self, user_id: str, task_id: str) -> int:
+        """Drop every cached result that includes the task. Returns the number dropped."""
+        keys = self._by_task.pop((user_id, task_id), set())
+        for key in keys:
+            self._drop(key)
+        return len(keys)
+
+    def clear(self):
+        self._entries.clear()
+        self._by_task.clear()
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for task_id in entry.task_ids:
+            keys = self._by_task.get((entry.user_id, task_id))
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_task[(entry.user_id, task_id)]
+
+
+_settings = get_settings()
+score_cache = ScoreCache(
+    max_entries=_settings.ai_score_cache_max_entries,
+    ttl_seconds=_settings.ai_score_cache_ttl_seconds,
+)
@@ -6,10 +6,9 @@ with handoff capabilities.
 """
 
 import os
-from typing import List, Dict, Any, Optional
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from semantic_kernel import Kernel
 from semantic_kernel.agents import ChatCompletionAgent, AgentGroupChat
 from semantic_kernel.agents.strategies.selection.kernel_function_selection_strategy import (
     KernelFunctionSelectionStrategy
@@ -18,11 +17,20 @@ from semantic_kernel.agents.strategies.termination.kernel_function_termination_s
     KernelFunctionTerminationStrategy
 )
 from semantic_kernel.contents import ChatMessageContent, AuthorRole
-from semantic_kernel.connectors.ai.open_ai import AzureChatCompletion, OpenAIChatCompletion
-from openai import AsyncOpenAI
 
 from ..config import get_settings
+from ..llm_clients import get_llm_registry
 from .. import crud
+from .chat_outbox import ChatOutbox
+from .fast_path import (
+    CANCEL_REPLIES,
+    CANCELLED_REPLY,
+    CONFIRM_REPLIES,
+    execute_action,
+    load_pending_confirmation,
+    normalize_reply,
+    save_pending_confirmation,
+)
 
 DEBUG_AGENT = os.getenv("DEBUG_AGENT", "").lower() in ("1", "true", "yes")
 
@@ -34,7 +42,13 @@ class SKOrchestrator:
     Uses AgentGroupChat to manage handoffs between specialized agents.
     """
 
-    def __init__(self, session: AsyncSession, user_id: str, chat_session_id: Optional[str] = None):
+    def __init__(
+        self,
+        session: AsyncSession,
+        user_id: str,
+        chat_session_id: Optional[str] = None,
+        outbox: Optional[ChatOutbox] = None,
+    ):
         """
         Initialize SK orchestrator with database session and user context.
 
@@ -42,15 +56,18 @@ class SKOrchestrator:
             session: AsyncSession for database operations
             user_id: Current user's ID
             chat_session_id: Optional ID of the persistent chat session
+            outbox: Optional per-request outbox that state writes are queued on
         """
         self.session = session
         self.user_id = user_id
         self.chat_session_id = chat_session_id
+        self.outbox = outbox
         self.settings = get_settings()
 
-        # Initialize Semantic Kernel
-        self.kernel = Kernel()
-        self._setup_ai_service()
+        # Per-request Kernel around the shared, pooled chat service
+        self.kernel = get_llm_registry().create_kernel()
+        if DEBUG_AGENT:
+            print(f"SK: Using shared {self.settings.llm_provider} service with model {self.settings.llm_model}")
 
         # Initialize agents
         self.agents: List[ChatCompletionAgent] = []
@@ -58,52 +75,21 @@ class SKOrchestrator:
 
         # Conversation state
         self.pending_confirmation: Optional[Dict[str, Any]] = None
+        self.last_response: Optional[str] = None
         self.conversation_context: Dict[str, Any] = {}
 
     async def save_state(self):
-        """Persist current state (pending_confirmation) to the chat history."""
-        if not self.chat_session_id:
-            return
-
-        import json
-        from .. import crud
-        
-        state = {
-            "pending_confirmation": self.pending_confirmation
-        }
-        content = f"SK_STATE: {json.dumps(state)}"
-        
-        # Save as a system message
-        await crud.add_chat_message(self.session, self.chat_session_id, "system", content)
-        if DEBUG_AGENT:
-            print(f"SK: Saved state to DB: {content}")
+        """Persist current state (pending_confirmation) to the conversation_state store."""
+        await save_pending_confirmation(self.session, self.chat_session_id, self.pending_confirmation, self.outbox)
 
     async def load_state(self):
-        """Load state from the chat history."""
+        """Load state from the conversation_state store."""
         if not self.chat_session_id:
             return
 
-        import json
-        from .. import crud
-        
-        # Get history (simple fetch, filter in memory for now)
-        history = await crud.get_chat_history(self.session, self.chat_session_id)
-        
-        # Find last SK_STATE message
-        for msg in reversed(history):
-            if msg.role == "system" and msg.content.startswith("SK_STATE:"):
-                try:
-                    json_str = msg.content.replace("SK_STATE:", "").strip()
-                    state = json.loads(json_str)
-                    self.pending_confirmation = state.get("pending_confirmation")
-                    if DEBUG_AGENT:
-                        print(f"SK: Loaded state from DB: {state}")
-                    return
-                except Exception as e:
-                    print(f"SK: Failed to load state: {e}")
-        
+        self.pending_confirmation = await load_pending_confirmation(self.session, self.chat_session_id, self.outbox)
         if DEBUG_AGENT:
-            print("SK: No state found in DB")
+            print(f"SK: Loaded pending confirmation from DB: {self.pending_confirmation}")
 
     def _create_selection_strategy(self) -> KernelFunctionSelectionStrategy:
         """Create the selection strategy for agent orchestration."""
@@ -165,77 +151,6 @@ class SKOrchestrator:
             maximum_iterations=10
         )
 
-    def _setup_ai_service(self):
-        """Configure the AI service based on settings."""
-        provider = self.settings.llm_provider.lower()
-
-        if DEBUG_AGENT:
-            print(f"SK: Setting up AI service with provider={provider}")
-
-        # Validate required settings
-        if not self.settings.llm_model:
-            raise ValueError("LLM_MODEL environment variable is required")
-
-        if provider == "azure":
-            if not self.settings.llm_api_key:
-                raise ValueError("AZURE_OPENAI_API_KEY environment variable is required for Azure provider")
-            if not self.settings.llm_base_url:
-                raise ValueError("AZURE_OPENAI_ENDPOINT environment variable is required for Azure provider")
-
-            service = AzureChatCompletion(
-                deployment_name=self.settings.llm_model,
-                endpoint=self.settings.llm_base_url,
-                api_key=self.settings.llm_api_key,
-                api_version=self.settings.azure_openai_api_version or "2024-02-01",
-                service_id="chat"
-            )
-        elif provider == "openai":
-            if not self.settings.llm_api_key:
-                raise ValueError("OPENAI_API_KEY environment variable is required for OpenAI provider")
-
-            # Standard OpenAI
-            service = OpenAIChatCompletion(
-                service_id="chat",
-                ai_model_id=self.settings.llm_model,
-                api_key=self.settings.llm_api_key
-            )
-        elif provider in ["groq", "local"]:
-            if not self.settings.llm_base_url:
-                raise ValueError(f"LLM_BASE_URL environment variable is required for {provider} provider")
-
-            # Groq and local providers need custom base URL
-            # Some users might provide the full completion URL (legacy style)
-            # but AsyncOpenAI expects a base URL.
-            base_url = self.settings.llm_base_url
-            if base_url.endswith("/chat/completions"):
-                base_url = base_url.replace("/chat/completions", "")
-            
-            # Special handling for Groq: if the URL is just the domain, append the path
-            # the legacy implementation used: {base_url}/openai/v1/chat/completions
-            if provider == "groq" and "openai/v1" not in base_url:
-                if base_url.endswith("/"):
-                    base_url += "openai/v1"
-                else:
-                    base_url += "/openai/v1"
-
-            # Use AsyncOpenAI client with custom base_url
-            custom_client = AsyncOpenAI(
-                base_url=base_url,
-                api_key=self.settings.groq_api_key or self.settings.llm_api_key or "not-needed"
-            )
-            service = OpenAIChatCompletion(
-                service_id="chat",
-                ai_model_id=self.settings.llm_model,
-                async_client=custom_client
-            )
-        else:
-            raise ValueError(f"Unsupported LLM provider: {provider}. Must be one of: azure, openai, groq, local")
-
-        self.kernel.add_service(service)
-
-        if DEBUG_AGENT:
-            print(f"SK: Initialized {provider} service with model {self.settings.llm_model}")
-
     def register_agent(self, agent: ChatCompletionAgent):
         """
         Register an agent with the orchestrator.
@@ -286,7 +201,8 @@ class SKOrchestrator:
 
         Args:
             message: User's message
-            chat_history: Previous chat messages (None for new conversation)
+            chat_history: Previous chat messages (None loads the recent turns
+                of the persisted session)
 
         Returns:
             Agent's response as a string
@@ -301,6 +217,8 @@ class SKOrchestrator:
         if self.pending_confirmation:
             return await self._handle_pending_confirmation(message)
 
+        await self._seed_history(message, chat_history)
+
         # Create user message
         user_message = ChatMessageContent(
             role=AuthorRole.USER,
@@ -337,6 +255,58 @@ class SKOrchestrator:
         # Return the last response
         return responses[-1] if responses else "I'm not sure how to help with that."
 
+    async def process_request_stream(self, message: str) -> AsyncIterator[Tuple[int, str]]:
+        """
+        Streaming variant of process_request.
+
+        Yields (turn, text) chunks as the agents generate them. `turn` changes
+        whenever a new agent response starts, so callers can drop the partial
+        text of an earlier turn. The complete text of the final turn (what
+        process_request would return) is left in `self.last_response`.
+        """
+        await self.load_state()
+
+        if not self.group_chat:
+            self.create_group_chat()
+
+        if self.pending_confirmation:
+            self.last_response = await self._handle_pending_confirmation(message)
+            yield 0, self.last_response
+            return
+
+        await self._seed_history(message, None)
+        await self.group_chat.add_chat_message(ChatMessageContent(role=AuthorRole.USER, content=message))
+
+        # History grows by one message per completed agent turn
+        turn = len(self.group_chat.history.messages)
+        parts: List[str] = []
+        finished: Optional[str] = None
+        try:
+            async for chunk in self.group_chat.invoke_stream():
+                history_length = len(self.group_chat.history.messages)
+                if history_length != turn:
+                    text = "".join(parts)
+                    if text.strip():
+                        finished = text
+                    if "pending_confirmation:" in text:
+                        break
+                    turn, parts = history_length, []
+
+                if chunk.content:
+                    parts.append(chunk.content)
+                    yield turn, chunk.content
+        finally:
+            if self.group_chat:
+                self.group_chat.clear_activity_signal()
+
+        text = "".join(parts)
+        if text.strip():
+            finished = text
+        if finished and "pending_confirmation:" in finished:
+            await self._extract_pending_confirmation(finished)
+
+        self.last_response = finished or "I'm not sure how to help with that."
+
     async def _handle_pending_confirmation(self, message: str) -> str:
         """
         Handle user response to a pending confirmation.
@@ -351,9 +321,9 @@ class SKOrchestrator:
         if not self.pending_confirmation:
             return "I'm not waiting for any confirmation right now. How can I help you?"
 
-        message_lower = message.lower().strip()
+        message_lower = normalize_reply(message)
 
-        if message_lower in ["yes", "y", "confirm", "create it", "do it"]:
+        if message_lower in CONFIRM_REPLIES:
             # User confirmed - execute the pending action
             action = self.pending_confirmation.get("action")
             details = self.pending_confirmation.get("details", {})
@@ -371,11 +341,11 @@ class SKOrchestrator:
 
             return result
 
-        elif message_lower in ["no", "n", "cancel", "nevermind"]:
+        elif message_lower in CANCEL_REPLIES:
             # User cancelled
             self.pending_confirmation = None
             await self.save_state()
-            return "Okay, cancelled. What else can I help with?"
+            return CANCELLED_REPLY
 
         else:
             # User wants to modify - route back to agent
@@ -395,43 +365,7 @@ class SKOrchestrator:
         Returns:
             Success message
         """
-        from ..models import TaskCreate
-        from ..websockets import manager
-
-        if action == "create_task":
-            # Create task
-            task_data = TaskCreate(**details)
-            task = await crud.create_task(self.session, task_data, self.user_id)
-            await manager.broadcast("refresh", self.user_id)
-
-            return f"✓ Created task: '{task.title}' (Priority: {task.priority_score}, Due: {task.due_date or 'Not set'})"
-
-        elif action == "complete_task":
-            # Complete task
-            task_id = details.get("id")
-            task = await crud.get_task_by_id(self.session, task_id, self.user_id)
-
-            if task:
-                await crud.update_task(self.session, task, {"status": "done"})
-                await manager.broadcast("refresh", self.user_id)
-                return f"✓ Marked '{task.title}' as complete!"
-            else:
-                return "Error: Task not found."
-
-        elif action == "update_task":
-            # Update task
-            task_id = details.pop("id")
-            task = await crud.get_task_by_id(self.session, task_id, self.user_id)
-
-            if task:
-                await crud.update_task(self.session, task, details)
-                await manager.broadcast("refresh", self.user_id)
-                return f"✓ Updated '{task.title}'"
-            else:
-                return "Error: Task not found."
-
-        else:
-            return f"Error: Unknown action '{action}'"
+        return await execute_action(self.session, self.user_id, action, details)
 
     async def _extract_pending_confirmation(self, content: str):
         """
@@ -477,6 +411,44 @@ class SKOrchestrator:
                 if DEBUG_AGENT:
                     print(f"SK: Failed to extract pending confirmation: {e}")
 
+    async def get_recent_history(self, exclude_latest: Optional[str] = None) -> List[ChatMessageContent]:
+        """
+        Recent turns of the persisted conversation, within the context budget.
+
+        Args:
+            exclude_latest: The current user message, already saved to the
+                session; dropped from the end so it isn't sent twice
+
+        Returns:
+            User/assistant messages, oldest first
+        """
+        if not self.chat_session_id:
+            return []
+
+        messages = await crud.get_recent_chat_messages(
+            self.session,
+            self.chat_session_id,
+            max_messages=self.settings.chat_context_max_messages,
+            token_budget=self.settings.chat_context_token_budget,
+        )
+        if messages and exclude_latest is not None and messages[-1].role == "user" and messages[-1].content == exclude_latest:
+            messages = messages[:-1]
+
+        return [
+            ChatMessageContent(role=AuthorRole.USER if m.role == "user" else AuthorRole.ASSISTANT, content=m.content)
+            for m in messages
+            if m.role in ("user", "assistant")
+        ]
+
+    async def _seed_history(self, message: str, chat_history: Optional[List[ChatMessageContent]]):
+        """Give a fresh group chat the earlier turns of the conversation."""
+        if self.group_chat.history.messages:
+            return
+        if chat_history is None:
+            chat_history = await self.get_recent_history(exclude_latest=message)
+        if chat_history:
+            await self.group_chat.add_chat_messages(chat_history)
+
     async def get_active_tasks_context(self) -> str:
         """
         Get current active tasks for agent context.
@@ -484,10 +456,7 @@ class SKOrchestrator:
         Returns:
             Formatted string of active tasks
         """
-        from ..models import TaskStatus
-
-        tasks = await crud.get_tasks(self.session, self.user_id)
-        active_tasks = [t for t in tasks if t.status != TaskStatus.done][:10]
+        active_tasks = await crud.get_tasks(self.session, self.user_id, active_only=True, limit=10)
 
         if not active_tasks:
             return "No active tasks."
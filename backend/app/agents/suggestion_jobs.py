@@ -0,0 +1,119 @@
+"""
+Background AI suggestion jobs.
+
+GET /tasks/ai-suggestion used to hold the request open for the whole LLM
+scoring run. Scoring now runs as a background job per user: concurrent
+requests join the job already in flight instead of starting another one, the
+endpoint answers immediately with the last known suggestion, and the fresh
+result is pushed to the user's websockets when the job finishes.
+
+The last known suggestion is always read from the scores jobs write back,
+not kept in memory, so every worker gives the same answer and a task that
+was completed, deleted or dismissed stops being suggested right away.
+"""
+
+import asyncio
+import json
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Optional, Set
+
+from .. import crud
+from ..database import async_session
+from ..websockets import manager
+from .prioritization import AIPrioritizationService
+
+
+@dataclass
+class SuggestionJob:
+    id: str
+    user_id: str
+    status: str = "pending"  # pending | done | failed
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+    suggestion: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    finished: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    async def wait(self):
+        await self.finished.wait()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "suggestion": self.suggestion,
+            "error": self.error,
+        }
+
+
+class SuggestionJobManager:
+    """Runs at most one suggestion job per user and remembers recent results."""
+
+    def __init__(self, session_factory, max_jobs: int = 512):
+        self.session_factory = session_factory
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, SuggestionJob]" = OrderedDict()
+        self._running: Dict[str, SuggestionJob] = {}
+        # Keep references so running tasks aren't garbage collected
+        self._tasks: Set[asyncio.Task] = set()
+
+    def submit(self, user_id: str) -> SuggestionJob:
+        """Start a job for the user, or return the one already running."""
+        job = self._running.get(user_id)
+        if job is not None:
+            return job
+
+        job = SuggestionJob(id=str(uuid.uuid4()), user_id=user_id)
+        self._running[user_id] = job
+        self._jobs[job.id] = job
+        while len(self._jobs) > self.max_jobs:
+            self._jobs.popitem(last=False)
+
+        task = asyncio.create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def get(self, job_id: str, user_id: str) -> Optional[SuggestionJob]:
+        job = self._jobs.get(job_id)
+        if job is None or job.user_id != user_id:
+            return None
+        return job
+
+    async def last_known(self, session, user_id: str) -> Optional[Dict[str, Any]]:
+        """The best suggestion from the stored AI scores."""
+        task = await crud.get_top_ai_scored_task(session, user_id)
+        if not task:
+            return None
+        return {
+            "suggested_task_id": task.id,
+            "reasoning": task.ai_reasoning or "High impact task for right now.",
+        }
+
+    async def _run(self, job: SuggestionJob):
+        try:
+            async with self.session_factory() as session:
+                service = AIPrioritizationService(session, job.user_id)
+                job.suggestion = await service.get_ai_suggestion()
+            job.status = "done"
+        except Exception as e:
+            print(f"AI suggestion job {job.id} failed: {e}")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.utcnow()
+            self._running.pop(job.user_id, None)
+
+        try:
+            message = {"type": "ai_suggestion", **job.to_dict()}
+            await manager.broadcast(json.dumps(message), job.user_id)
+        finally:
+            job.finished.set()
+
+
+suggestion_jobs = SuggestionJobManager(async_session)
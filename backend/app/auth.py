@@ -1,22 +1,22 @@
 from datetime import datetime, timedelta
 import json
 import os
-import time
 from typing import Optional, Any, Dict
 import uuid
 
-import httpx
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, HTTPBasic, HTTPBasicCredentials
 from jose import JWTError, jwt, jwk
-from jose.utils import base64url_decode
 from passlib.context import CryptContext
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 
 from .config import get_settings
-from .database import get_session
+from .database import async_session, get_session
+from .jwks import jwks_manager
 from .models import User, TokenData, Settings as UserSettings
+from .token_cache import VerifiedToken, public_keys, token_cache
+from .user_cache import user_cache
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
@@ -24,10 +24,6 @@ basic_scheme = HTTPBasic()
 
 pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
 
-_JWKS_CACHE: Dict[str, Any] = {"ts": 0.0, "jwks": None, "jwks_url": None}
-_JWKS_TTL_SECONDS = 3600
-
-
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
@@ -67,44 +63,6 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
-async def _get_oidc_jwks(settings) -> dict:
-    if not settings.oidc_issuer and not settings.oidc_jwks_url:
-        raise JWTError("OIDC not configured")
-
-    now = time.time()
-    if _JWKS_CACHE["jwks"] and now - _JWKS_CACHE["ts"] < _JWKS_TTL_SECONDS:
-        return _JWKS_CACHE["jwks"]
-
-    jwks_url = settings.oidc_jwks_url
-    if not jwks_url:
-        well_known = settings.oidc_issuer.rstrip("/") + "/.well-known/openid-configuration"
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            r = await client.get(well_known)
-            r.raise_for_status()
-            jwks_url = r.json().get("jwks_uri")
-
-    if not jwks_url:
-        raise JWTError("OIDC JWKS URL not available")
-
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        r = await client.get(jwks_url)
-        r.raise_for_status()
-        jwks = r.json()
-
-    _JWKS_CACHE.update({"ts": now, "jwks": jwks, "jwks_url": jwks_url})
-    return jwks
-
-
-def _select_jwk(jwks: dict, kid: Optional[str]) -> Optional[dict]:
-    keys = jwks.get("keys", [])
-    if not kid:
-        return keys[0] if keys else None
-    for k in keys:
-        if k.get("kid") == kid:
-            return k
-    return None
-
-
 def _audience_matches(aud_claim: Any, expected: str) -> bool:
     if not expected:
         return True
@@ -119,59 +77,38 @@ def _audience_matches(aud_claim: Any, expected: str) -> bool:
 
 async def _decode_oidc_token(token: str) -> dict:
     settings = get_settings()
-    jwks = await _get_oidc_jwks(settings)
 
     header = jwt.get_unverified_header(token)
     kid = header.get("kid")
     alg = header.get("alg") or "RS256"
 
-    key_dict = _select_jwk(jwks, kid)
-    if not key_dict:
-        # refresh once
-        _JWKS_CACHE.update({"ts": 0.0, "jwks": None})
-        jwks = await _get_oidc_jwks(settings)
-        key_dict = _select_jwk(jwks, kid)
-
+    key_dict = await jwks_manager.get_key(kid)
     if not key_dict:
         raise JWTError("No matching JWK")
 
-    key = jwk.construct(key_dict)
-    message, encoded_sig = token.rsplit(".", 1)
-    decoded_sig = base64url_decode(encoded_sig.encode())
-    if not key.verify(message.encode(), decoded_sig):
-        raise JWTError("Signature verification failed")
-
-    pem = key.to_pem().decode()
+    # One signature check, with a key constructed once per JWK
+    alg = key_dict.get("alg") or alg
+    key = public_keys.get(kid, alg, lambda: jwk.construct(key_dict, alg))
     audience = settings.oidc_audience or None
     issuer = settings.oidc_issuer or None
 
-    try:
-        return jwt.decode(token, pem, algorithms=[alg], audience=audience, issuer=issuer)
-    except JWTError:
-        # Keycloak often places the client_id in `azp` and uses other values in `aud`.
-        # If an explicit audience is configured, accept tokens where aud OR azp matches.
-        if not audience:
-            raise
-
-        payload = jwt.decode(
-            token,
-            pem,
-            algorithms=[alg],
-            issuer=issuer,
-            options={"verify_aud": False},
-        )
-
-        azp = payload.get("azp")
-        if not _audience_matches(payload.get("aud"), audience) and azp != audience:
-            raise
+    # Keycloak often places the client_id in `azp` and uses other values in `aud`.
+    # If an explicit audience is configured, accept tokens where aud OR azp matches.
+    payload = jwt.decode(
+        token,
+        key,
+        algorithms=[alg],
+        issuer=issuer,
+        options={"verify_aud": False},
+    )
+    if audience and not _audience_matches(payload.get("aud"), audience) and payload.get("azp") != audience:
+        raise JWTError("Invalid audience")
 
-        return payload
+    return payload
 
 
 async def _get_local_user(user_id: str, session: AsyncSession) -> Optional[User]:
-    statement = select(User).where(User.id == user_id)
-    result = await session.execute(statement)
-    return result.scalar_one_or_none()
+    return await user_cache.get_user(session, user_id)
 
 
 async def _get_oidc_user(
@@ -196,6 +133,7 @@ async def _get_oidc_user(
     user = result.scalar_one_or_none()
 
     if user:
+        user_cache.remember(session, user)
         return user
 
     # 2. Link by email on first login if allowed
@@ -210,6 +148,7 @@ async def _get_oidc_user(
             session.add(user)
             await session.commit()
             await session.refresh(user)
+            user_cache.remember(session, user)
             return user
 
     # 3. Create new user (JIT Provisioning) - DISABLED
@@ -220,6 +159,56 @@ async def _get_oidc_user(
     )
 
 
+def _is_local_token(claims: dict, settings: Any) -> bool:
+    # Local tokens either have no 'iss' (legacy) or iss='liminal-local' (future)
+    iss = claims.get("iss")
+    return settings.enable_local_auth and (iss is None or iss == "liminal-local" or iss == "local")
+
+
+async def verify_token(token: str) -> VerifiedToken:
+    """
+    Verify a bearer token, local or OIDC.
+
+    Served from token_cache when the token was verified before, so repeat
+    requests skip signature checks. Raises JWTError (or an httpx error while
+    fetching the JWKS) when the token is invalid.
+    """
+    verified = token_cache.get(token)
+    if verified is not None:
+        return verified
+
+    settings = get_settings()
+    # Peek at claims to determine token type (Local vs OIDC)
+    unverified_claims = jwt.get_unverified_claims(token)
+
+    if _is_local_token(unverified_claims, settings):
+        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+        if payload.get("sub") is None:
+            raise JWTError("Token missing sub")
+        return token_cache.put(token, payload, local=True)
+
+    payload = await _decode_oidc_token(token)
+    return token_cache.put(token, payload, local=False)
+
+
+async def _resolve_user(verified: VerifiedToken, session: AsyncSession, settings: Any) -> Optional[User]:
+    """The user a verified token belongs to, remembered on the cache entry."""
+    if verified.user_id:
+        user = await _get_local_user(verified.user_id, session)
+        if user is not None:
+            return user
+
+    if verified.local:
+        user = await _get_local_user(verified.claims["sub"], session)
+        if user is None:
+            return None
+    else:
+        user = await _get_oidc_user(verified.claims, session, settings)
+
+    verified.user_id = user.id
+    return user
+
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     session: AsyncSession = Depends(get_session),
@@ -234,45 +223,44 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    # 1. Peek at claims to determine token type (Local vs OIDC)
     try:
-        unverified_claims = jwt.get_unverified_claims(token)
+        verified = await verify_token(token)
     except JWTError:
         raise credentials_exception
-
-    iss = unverified_claims.get("iss")
-    
-    # 2. Local Auth Path
-    # Local tokens either have no 'iss' (legacy) or iss='liminal-local' (future)
-    is_local = (
-        settings.enable_local_auth 
-        and (iss is None or iss == "liminal-local" or iss == "local")
-    )
-
-    if is_local:
-        try:
-            payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-            user_id: str = payload.get("sub")
-            if user_id is None:
-                raise credentials_exception
-        except JWTError:
-            raise credentials_exception
-            
-        user = await _get_local_user(user_id, session)
-        if user is None:
-            raise credentials_exception
-        return user
-
-    # 3. OIDC Path
-    try:
-        payload = await _decode_oidc_token(token)
     except Exception as e:
         print(f"OIDC Token Validation Failed: {str(e)}")
         import traceback
         traceback.print_exc()
         raise credentials_exception
 
-    return await _get_oidc_user(payload, session, settings)
+    user = await _resolve_user(verified, session, settings)
+    if user is None:
+        raise credentials_exception
+    return user
+
+
+async def resolve_user_id(token: str) -> Optional[str]:
+    """
+    User.id for a bearer token outside a request (the websocket handshake).
+
+    Shares token_cache with get_current_user, so a token already used over
+    HTTP costs no verification and no query here. Returns None when invalid.
+    """
+    try:
+        verified = await verify_token(token)
+    except Exception as e:
+        print(f"WS_AUTH_FAILURE: {str(e)}")
+        return None
+
+    if verified.user_id:
+        return verified.user_id
+
+    async with async_session() as session:
+        try:
+            user = await _resolve_user(verified, session, get_settings())
+        except HTTPException:
+            return None
+    return user.id if user else None
 
 
 async def authenticate_basic_user(
@@ -17,6 +17,16 @@ class Settings(BaseSettings):
     oidc_jwks_url: Optional[str] = None
     oidc_email_claim: str = "email"
     oidc_name_claim: str = "name"
+    # Verified tokens cached until their exp (0 disables)
+    token_cache_size: int = 4096
+    # User and settings rows cached per process (see user_cache.py; 0 disables)
+    user_cache_size: int = 4096
+    user_cache_ttl_seconds: int = 60
+    # OIDC signing keys (see jwks.py)
+    oidc_jwks_ttl_seconds: int = 3600
+    oidc_jwks_refresh_ahead_seconds: int = 300
+    oidc_jwks_max_stale_seconds: int = 86400
+    oidc_jwks_unknown_kid_cooldown_seconds: int = 30
 
     # Spotify OAuth
     spotify_client_id: Optional[str] = None
@@ -34,6 +44,74 @@ class Settings(BaseSettings):
     llm_provider: str = "local"
     azure_openai_api_version: str = "2023-09-01-preview"
 
+    # Shared LLM HTTP pool (see llm_clients.py)
+    llm_http2: bool = True
+    llm_max_connections: int = 20
+    llm_max_keepalive_connections: int = 10
+    llm_keepalive_expiry_seconds: float = 30.0
+    llm_request_timeout_seconds: float = 120.0
+
+    # AI list scoring: tasks are split into prompts of at most this many
+    # (estimated) tokens, scored concurrently with a per-chunk timeout
+    ai_scoring_chunk_tokens: int = 2500
+    ai_scoring_max_concurrency: int = 3
+    ai_scoring_chunk_timeout_seconds: float = 45.0
+    # Cached per-task scores are reused for unchanged tasks until they expire (0 disables)
+    ai_score_cache_ttl_seconds: int = 600
+    ai_score_cache_max_entries: int = 20000
+
+    # Prior chat turns given to the agents as context: at most this many
+    # messages, trimmed further to fit the (estimated) token budget
+    chat_context_max_messages: int = 10
+    chat_context_token_budget: int = 1500
+
+    # Per-process LRU in front of the conversation_state table (0 disables).
+    # Off by default: workers don't invalidate each other's copies, and a stale
+    # pending_confirmation replayed on another worker can create a task twice.
+    # Only enable it when a single worker serves every chat session.
+    conversation_state_cache_size: int = 0
+
+    # Soft-deleted tasks past the 24h restore window are hard-deleted in batches
+    task_purge_interval_seconds: int = 3600
+    task_purge_batch_size: int = 500
+
+    # Task change events are kept this long for websocket clients resuming from a version
+    task_event_retention_seconds: int = 86400
+
+    # Database connection pool, per worker process (PostgreSQL only; see database.py).
+    # Background jobs and chat share it, so pool_size + max_overflow times the
+    # worker count must stay under the server's connection cap. The Postgres
+    # broadcast backend adds one more connection per worker, outside the pool.
+    db_pool_size: int = 5
+    db_max_overflow: int = 5
+    db_pool_timeout_seconds: float = 30.0
+    db_pool_pre_ping: bool = True
+    db_pool_recycle_seconds: int = 1800
+    # asyncpg prepared statements cached per connection
+    db_statement_cache_size: int = 100
+    # Server-side statement_timeout in milliseconds (0 leaves the server default)
+    db_statement_timeout_ms: int = 0
+    # Behind PgBouncer in transaction mode: no prepared-statement caching,
+    # statement_timeout applied per transaction, no LISTEN for broadcasts
+    db_pgbouncer: bool = False
+
+    # Websocket fan-out: "auto" uses LISTEN/NOTIFY on PostgreSQL and in-process delivery elsewhere
+    broadcast_backend: str = "auto"
+    broadcast_channel: str = "liminal_broadcast"
+    # Per-connection outbound queue; a full queue closes the socket ("close") or drops its oldest message ("drop")
+    ws_send_queue_size: int = 256
+    ws_queue_overflow: str = "close"
+    ws_send_timeout_seconds: float = 5.0
+    # Server heartbeat: "ping" every interval, close sockets silent for longer than the idle timeout
+    ws_ping_interval_seconds: float = 25.0
+    ws_idle_timeout_seconds: float = 60.0
+    ws_max_connections_per_user: int = 5
+
+    # Task search: "auto" uses pg_trgm on PostgreSQL and the in-memory index elsewhere
+    search_backend: str = "auto"
+    search_index_max_users: int = 256
+    search_index_ttl_seconds: int = 300
+
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8", 
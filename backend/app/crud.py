@@ -1,10 +1,15 @@
 from typing import List, Optional, Tuple
 from datetime import datetime, timedelta
+from sqlalchemy import case, delete, func, literal, text, update
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlmodel import select, col, or_
+from sqlmodel import select, col, or_, and_
+import base64
+import json
 import uuid
-from rapidfuzz import fuzz, process
-from .models import Task, TaskCreate, TaskStatus, Priority, ChatSession, ChatMessage
+from .config import get_settings
+from .models import AISuggestionStatus, Task, TaskCreate, TaskStatus, Priority, ChatSession, ChatMessage, ConversationState, TaskEvent, UserEventVersion
+from .search_index import search_index
 
 # ... existing imports ...
 
@@ -34,16 +39,139 @@ async def get_chat_history(session: AsyncSession, session_id: str) -> List[ChatM
     result = await session.execute(statement)
     return result.scalars().all()
 
-async def clear_chat_history(session: AsyncSession, session_id: str) -> None:
-    statement = select(ChatMessage).where(ChatMessage.session_id == session_id)
+# Legacy SK_STATE rows are orchestrator bookkeeping, not conversation
+_visible_chat_message = or_(
+    ChatMessage.role != "system",
+    col(ChatMessage.content).notlike("SK_STATE:%"),
+)
+
+def _encode_chat_cursor(created_at: datetime, message_id: str) -> str:
+    payload = json.dumps({"at": created_at.isoformat(), "id": message_id})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+def _decode_chat_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        return datetime.fromisoformat(payload["at"]), str(payload["id"])
+    except (ValueError, KeyError, TypeError) as exc:
+        raise ValueError("Invalid history cursor") from exc
+
+async def get_chat_history_page(
+    session: AsyncSession,
+    session_id: str,
+    limit: int = 50,
+    before: Optional[str] = None,
+) -> Tuple[List[ChatMessage], Optional[str]]:
+    """
+    One page of a session's messages, newest first.
+
+    Pass the returned cursor as `before` to get the next (older) page; it is
+    None on the last page. Served from the (session_id, created_at) index.
+    """
+    statement = select(ChatMessage).where(ChatMessage.session_id == session_id, _visible_chat_message)
+
+    if before:
+        before_at, before_id = _decode_chat_cursor(before)
+        statement = statement.where(or_(
+            ChatMessage.created_at < before_at,
+            and_(ChatMessage.created_at == before_at, ChatMessage.id < before_id),
+        ))
+
+    # Fetch one extra row to know whether another page exists
+    statement = statement.order_by(col(ChatMessage.created_at).desc(), col(ChatMessage.id).desc()).limit(limit + 1)
     result = await session.execute(statement)
-    for msg in result.scalars().all():
-        await session.delete(msg)
+    messages = result.scalars().all()
+
+    next_cursor = None
+    if len(messages) > limit:
+        messages = messages[:limit]
+        next_cursor = _encode_chat_cursor(messages[-1].created_at, messages[-1].id)
+
+    return messages, next_cursor
+
+async def get_recent_chat_messages(
+    session: AsyncSession,
+    session_id: str,
+    max_messages: int = 10,
+    token_budget: int = 1500,
+) -> List[ChatMessage]:
+    """
+    The latest messages of a session that fit in `token_budget`, oldest first.
+
+    Reads at most `max_messages` rows, so building LLM context costs the same
+    however long the transcript is. Tokens are estimated at ~4 characters each.
+    """
+    messages, _ = await get_chat_history_page(session, session_id, limit=max_messages)
+
+    window = []
+    used = 0
+    for message in messages:
+        used += len(message.content) // 4 + 1
+        if used > token_budget:
+            break
+        window.append(message)
+
+    window.reverse()
+    return window
+
+async def clear_chat_history(session: AsyncSession, session_id: str) -> None:
+    from .agents.conversation_state import conversation_state
+
+    await session.execute(delete(ChatMessage).where(ChatMessage.session_id == session_id))
+    await session.execute(delete(ConversationState).where(ConversationState.session_id == session_id))
     await session.commit()
+    conversation_state.invalidate(session_id)
+
+async def get_conversation_state(session: AsyncSession, session_id: str) -> Optional[dict]:
+    result = await session.execute(select(ConversationState.state).where(ConversationState.session_id == session_id))
+    return result.scalar_one_or_none()
+
+async def save_conversation_state(session: AsyncSession, session_id: str, state: dict, commit: bool = True) -> None:
+    """Upsert the single state row for a chat session (commit=False leaves it to the caller)."""
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        dialect_insert = None
+
+    now = datetime.utcnow()
+    if dialect_insert is not None:
+        statement = dialect_insert(ConversationState).values(session_id=session_id, state=state, updated_at=now)
+        statement = statement.on_conflict_do_update(
+            index_elements=[ConversationState.session_id],
+            set_={"state": statement.excluded.state, "updated_at": statement.excluded.updated_at},
+        )
+        await session.execute(statement)
+    else:
+        row = await session.get(ConversationState, session_id)
+        if row:
+            row.state, row.updated_at = state, now
+        else:
+            session.add(ConversationState(session_id=session_id, state=state, updated_at=now))
+    if commit:
+        await session.commit()
+
+async def get_legacy_sk_state(session: AsyncSession, session_id: str) -> Optional[str]:
+    """Content of the newest SK_STATE system message (sessions from before conversation_state)."""
+    statement = (
+        select(ChatMessage.content)
+        .where(
+            ChatMessage.session_id == session_id,
+            ChatMessage.role == "system",
+            col(ChatMessage.content).startswith("SK_STATE:"),
+        )
+        .order_by(col(ChatMessage.created_at).desc())
+        .limit(1)
+    )
+    result = await session.execute(statement)
+    return result.scalar_one_or_none()
 
 
 async def create_task(session: AsyncSession, task_data: TaskCreate, user_id: str) -> Task:
     from .utils.date_parser import parse_natural_date, validate_date_not_past
+    from .agents.prioritization import refresh_hybrid_score
 
     def score_to_priority_label(score: int) -> Priority:
         if score >= 67:
@@ -109,35 +237,116 @@ async def create_task(session: AsyncSession, task_data: TaskCreate, user_id: str
         theme_id=task_data.theme_id,
         user_id=user_id,
     )
+    refresh_hybrid_score(new_task)
     session.add(new_task)
     await session.commit()
     await session.refresh(new_task)
+    search_index.upsert(new_task)
     return new_task
 
-async def get_tasks(session: AsyncSession, user_id: str) -> List[Task]:
-    from .agents.prioritization import calculate_hybrid_score
+def _encode_task_cursor(rank: int, task_id: str) -> str:
+    payload = json.dumps({"rank": rank, "id": task_id})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+def _decode_task_cursor(cursor: str) -> Tuple[int, str]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        return int(payload["rank"]), str(payload["id"])
+    except (ValueError, KeyError, TypeError) as exc:
+        raise ValueError("Invalid task cursor") from exc
+
+async def get_task_page(
+    session: AsyncSession,
+    user_id: str,
+    active_only: bool = False,
+    status: Optional[TaskStatus] = None,
+    theme_id: Optional[str] = None,
+    initiative_id: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Task], Optional[str]]:
+    """
+    Fetch tasks ranked by their stored hybrid score, with keyset pagination.
+
+    The active view orders directly by Task.hybrid_score so it is served by
+    the (user_id, hybrid_score) index; views that include completed tasks
+    rank them at -1 so they sink to the bottom.
 
+    Args:
+        session: Database session
+        user_id: User ID to filter tasks
+        active_only: Exclude completed tasks (ignored when `status` is given)
+        status: Only return tasks with this status
+        theme_id: Only return tasks in this theme
+        initiative_id: Only return tasks in this initiative
+        limit: Page size (None returns everything)
+        cursor: Opaque cursor returned with the previous page
+
+    Returns:
+        (tasks, next_cursor) - next_cursor is None on the last page
+
+    Raises:
+        ValueError: If the cursor cannot be decoded
+    """
+    statement = select(Task).where(Task.user_id == user_id, Task.is_deleted == False)
+
+    if status is not None:
+        statement = statement.where(Task.status == status)
+    elif active_only:
+        statement = statement.where(Task.status != TaskStatus.done)
+    if theme_id:
+        statement = statement.where(Task.theme_id == theme_id)
+    if initiative_id:
+        statement = statement.where(Task.initiative_id == initiative_id)
+
+    if active_only or (status is not None and status != TaskStatus.done):
+        rank = Task.hybrid_score
+    else:
+        rank = case((Task.status == TaskStatus.done, -1), else_=Task.hybrid_score)
+
+    if cursor:
+        last_rank, last_id = _decode_task_cursor(cursor)
+        statement = statement.where(or_(rank < last_rank, and_(rank == last_rank, Task.id > last_id)))
+
+    statement = statement.order_by(rank.desc(), Task.id)
+    if limit:
+        # Fetch one extra row to know whether another page exists
+        statement = statement.limit(limit + 1)
+
+    result = await session.execute(statement)
+    tasks = result.scalars().all()
+
+    next_cursor = None
+    if limit and len(tasks) > limit:
+        tasks = tasks[:limit]
+        last = tasks[-1]
+        next_cursor = _encode_task_cursor(-1 if last.status == TaskStatus.done else last.hybrid_score, last.id)
+
+    return tasks, next_cursor
+
+async def get_tasks(session: AsyncSession, user_id: str, active_only: bool = False, limit: Optional[int] = None) -> List[Task]:
+    tasks, _ = await get_task_page(session, user_id, active_only=active_only, limit=limit)
+    return tasks
+
+async def get_top_ai_scored_task(session: AsyncSession, user_id: str) -> Optional[Task]:
+    """Active, not dismissed task with the highest stored AI relevance score, if any task has been scored."""
     statement = (
         select(Task)
         .where(Task.user_id == user_id, Task.is_deleted == False)
+        .where(col(Task.status).notin_([TaskStatus.done, TaskStatus.paused, TaskStatus.blocked]))
+        .where(Task.ai_suggestion_status != AISuggestionStatus.dismissed)
+        .where(Task.ai_relevance_score > 0)
+        .order_by(Task.ai_relevance_score.desc(), Task.hybrid_score.desc())
+        .limit(1)
     )
     result = await session.execute(statement)
-    tasks = result.scalars().all()
-    
-    # Sort by hybrid score in memory since it's a dynamic calculation 
-    # (unless we want to store it in DB, but ai_relevance_score is already stored)
-    def get_sort_key(t: Task):
-        # We use a high score for completed tasks to push them to bottom if needed,
-        # but this function is for active tasks usually.
-        if t.status == TaskStatus.done:
-            return -1
-        return calculate_hybrid_score(t.ai_relevance_score or 0, t.due_date, t.priority_score)
-
-    tasks.sort(key=get_sort_key, reverse=True)
-    return tasks
+    return result.scalar_one_or_none()
+
+# Soft-deleted tasks can be restored for this long, then they are purged
+DELETED_TASK_RESTORE_WINDOW = timedelta(hours=24)
 
 async def get_deleted_tasks(session: AsyncSession, user_id: str) -> List[Task]:
-    threshold = datetime.utcnow() - timedelta(hours=24)
+    threshold = datetime.utcnow() - DELETED_TASK_RESTORE_WINDOW
     statement = (
         select(Task)
         .where(Task.user_id == user_id, Task.is_deleted == True, Task.updated_at >= threshold)
@@ -146,6 +355,31 @@ async def get_deleted_tasks(session: AsyncSession, user_id: str) -> List[Task]:
     result = await session.execute(statement)
     return result.scalars().all()
 
+async def purge_deleted_tasks(session: AsyncSession, deleted_before: datetime, batch_size: int = 500) -> int:
+    """
+    Hard-delete one batch of soft-deleted tasks last touched before `deleted_before`.
+
+    Each call is its own short transaction; callers loop until it returns
+    less than `batch_size`. Subtasks of purged tasks are detached first.
+    Returns the number of tasks deleted.
+    """
+    statement = (
+        select(Task.id)
+        .where(Task.is_deleted == True, Task.updated_at < deleted_before)
+        .order_by(Task.updated_at)
+        .limit(batch_size)
+    )
+    ids = (await session.execute(statement)).scalars().all()
+    if not ids:
+        return 0
+
+    await session.execute(
+        update(Task).where(col(Task.parent_id).in_(ids)).values(parent_id=None).execution_options(synchronize_session=False)
+    )
+    await session.execute(delete(Task).where(col(Task.id).in_(ids)).execution_options(synchronize_session=False))
+    await session.commit()
+    return len(ids)
+
 async def get_stale_tasks(session: AsyncSession, user_id: str, days: int = 7) -> List[Task]:
     threshold_date = datetime.utcnow() - timedelta(days=days)
     statement = (
@@ -157,6 +391,53 @@ async def get_stale_tasks(session: AsyncSession, user_id: str, days: int = 7) ->
     )
     result = await session.execute(statement)
     return result.scalars().all()
+
+async def rerank_tasks(session: AsyncSession, since: Optional[datetime], now: datetime, batch_size: int = 500) -> int:
+    """
+    Refresh stored hybrid scores whose urgency bucket moved between `since` and `now`.
+
+    Urgency only changes while a task is inside its 7-day window, so only
+    active tasks due in (since, now + 7d) are candidates. With `since=None`
+    (the first pass after a boot, when the previous pass is unknown) the
+    candidates are every active task due before now + 7d, plus rows still at
+    the default hybrid_score of 0, which backfills rows written before the
+    column existed without rewriting every task on every worker's boot.
+
+    Returns:
+        Number of tasks whose stored score changed
+    """
+    from .agents.prioritization import refresh_hybrid_scores
+
+    statement = select(Task).where(Task.is_deleted == False, Task.status != TaskStatus.done)
+    if since is not None:
+        statement = statement.where(
+            Task.due_date != None,
+            Task.due_date > since,
+            Task.due_date < now + timedelta(days=7),
+        )
+    else:
+        statement = statement.where(or_(
+            Task.hybrid_score == 0,
+            and_(Task.due_date != None, Task.due_date < now + timedelta(days=7)),
+        ))
+
+    updated = 0
+    last_id = None
+    while True:
+        batch_stmt = statement.order_by(Task.id).limit(batch_size)
+        if last_id is not None:
+            batch_stmt = batch_stmt.where(Task.id > last_id)
+        result = await session.execute(batch_stmt)
+        batch = result.scalars().all()
+        if not batch:
+            break
+
+        updated += refresh_hybrid_scores(batch, now)
+        await session.commit()
+        last_id = batch[-1].id
+
+    return updated
+
 async def get_task_by_id(session: AsyncSession, task_id: str, user_id: str) -> Optional[Task]:
     statement = select(Task).where(
         Task.id == task_id,
@@ -167,6 +448,9 @@ async def get_task_by_id(session: AsyncSession, task_id: str, user_id: str) -> O
     return result.scalar_one_or_none()
 
 async def update_task(session: AsyncSession, task: Task, task_update: dict) -> Task:
+    from .agents.prioritization import refresh_hybrid_score
+    from .agents.score_cache import SCORE_PROMPT_FIELDS, score_cache
+
     allowed_fields = {
         "title",
         "description",
@@ -209,42 +493,127 @@ async def update_task(session: AsyncSession, task: Task, task_update: dict) -> T
             if key == "estimated_duration" and not task_update.get("effort_score"):
                 task.effort_score = value
 
+    refresh_hybrid_score(task)
     session.add(task)
     await session.commit()
     await session.refresh(task)
+    search_index.upsert(task)
+    if SCORE_PROMPT_FIELDS.intersection(task_update):
+        score_cache.invalidate_task(task.user_id, task.id)
     return task
 
 async def delete_task(session: AsyncSession, task: Task) -> None:
+    from .agents.score_cache import score_cache
+
     task.is_deleted = True
     session.add(task)
     await session.commit()
+    search_index.remove(task.user_id, task.id)
+    score_cache.invalidate_task(task.user_id, task.id)
 
 async def restore_task(session: AsyncSession, task: Task) -> Task:
+    from .agents.prioritization import refresh_hybrid_score
+
     task.is_deleted = False
+    refresh_hybrid_score(task)
     session.add(task)
     await session.commit()
     await session.refresh(task)
+    search_index.upsert(task)
     return task
 
-async def search_tasks(session: AsyncSession, user_id: str, query: str, similarity_threshold: int = 60) -> List[Tuple[Task, float]]:
+async def record_task_event(session: AsyncSession, user_id: str, event_type: str, task_id: str, data: dict) -> TaskEvent:
     """
-    Search for tasks using both SQL substring matching and fuzzy matching.
-    Returns a list of (Task, similarity_score) tuples sorted by relevance.
-
-    Args:
-        session: Database session
-        user_id: User ID to filter tasks
-        query: Search query string
-        similarity_threshold: Minimum fuzzy match score (0-100, default 60)
+    Append a task change event under the user's next version and commit.
 
-    Returns:
-        List of (Task, similarity_score) tuples sorted by score descending
+    The user's version row is updated in the same transaction and stays
+    locked until commit, so a user's events become visible in version order
+    with no gaps.
     """
-    # First try exact substring matching (fast path for exact matches)
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        dialect_insert = None
+
+    if dialect_insert is not None:
+        statement = dialect_insert(UserEventVersion).values(user_id=user_id, version=1)
+        statement = statement.on_conflict_do_update(
+            index_elements=[UserEventVersion.user_id],
+            set_={"version": UserEventVersion.version + 1},
+        ).returning(UserEventVersion.version)
+        version = (await session.execute(statement)).scalar_one()
+    else:
+        statement = select(UserEventVersion).where(UserEventVersion.user_id == user_id).with_for_update()
+        row = (await session.execute(statement)).scalar_one_or_none()
+        if row is None:
+            row = UserEventVersion(user_id=user_id, version=0)
+        row.version += 1
+        session.add(row)
+        version = row.version
+
+    event = TaskEvent(user_id=user_id, version=version, type=event_type, task_id=task_id, data=data)
+    session.add(event)
+    await session.commit()
+    return event
+
+async def get_task_event_version(session: AsyncSession, user_id: str) -> int:
+    statement = select(UserEventVersion.version).where(UserEventVersion.user_id == user_id)
+    return (await session.execute(statement)).scalar_one_or_none() or 0
+
+async def get_task_events_since(session: AsyncSession, user_id: str, version: int, limit: int = 500) -> List[TaskEvent]:
+    """The user's events after `version`, oldest first."""
+    statement = (
+        select(TaskEvent)
+        .where(TaskEvent.user_id == user_id, TaskEvent.version > version)
+        .order_by(TaskEvent.version)
+        .limit(limit)
+    )
+    result = await session.execute(statement)
+    return result.scalars().all()
+
+async def purge_task_events(session: AsyncSession, created_before: datetime) -> int:
+    """Drop events too old to resume from; clients further behind refetch instead."""
+    result = await session.execute(
+        delete(TaskEvent).where(TaskEvent.created_at < created_before).execution_options(synchronize_session=False)
+    )
+    await session.commit()
+    return result.rowcount
+
+_pg_search_available = True
+# undefined_function / undefined_object: pg_trgm (or one of its operators) is missing
+_PG_SEARCH_MISSING_SQLSTATES = {"42883", "42704"}
+
+def _pg_search_missing(error: DBAPIError) -> bool:
+    """True when the error means pg_trgm isn't installed, as opposed to a transient failure."""
+    orig = error.orig
+    for candidate in (orig, getattr(orig, "__cause__", None)):
+        code = getattr(candidate, "sqlstate", None) or getattr(candidate, "pgcode", None)
+        if code:
+            return code in _PG_SEARCH_MISSING_SQLSTATES
+    message = str(orig).lower()
+    return "does not exist" in message and ("function" in message or "operator" in message)
+
+def _use_postgres_search(session: AsyncSession) -> bool:
+    backend = get_settings().search_backend.lower()
+    if backend == "postgres":
+        return True
+    if backend != "auto":
+        return False
+    try:
+        return session.get_bind().dialect.name == "postgresql"
+    except Exception:
+        return False
+
+async def _search_tasks_postgres(session: AsyncSession, user_id: str, query: str, similarity_threshold: int, limit: int) -> List[Tuple[Task, float]]:
+    """pg_trgm search: ILIKE and word_similarity are both served by the trigram GIN indexes."""
+    active = and_(Task.user_id == user_id, Task.is_deleted == False, Task.status != TaskStatus.done)
+
     statement = (
         select(Task)
-        .where(Task.user_id == user_id, Task.is_deleted == False)
-        .where(Task.status != TaskStatus.done)  # Only search active tasks
+        .where(active)
         .where(
             or_(
                 col(Task.title).ilike(f"%{query}%"),
@@ -252,45 +621,87 @@ async def search_tasks(session: AsyncSession, user_id: str, query: str, similari
             )
         )
         .order_by(Task.created_at.desc())
+        .limit(limit)
     )
     result = await session.execute(statement)
     exact_matches = result.scalars().all()
-
-    # If we have exact matches, return them with high scores
     if exact_matches:
-        return [(task, 100.0) for task in exact_matches[:5]]
+        return [(task, 100.0) for task in exact_matches]
+
+    # `<%` only uses the index with a constant threshold, so set it for this transaction
+    await session.execute(
+        text("SELECT set_config('pg_trgm.word_similarity_threshold', :threshold, true)"),
+        {"threshold": str(similarity_threshold / 100)},
+    )
+    similarity = func.word_similarity(query, Task.title)
+    statement = (
+        select(Task, similarity)
+        .where(active)
+        .where(literal(query).op("<%")(Task.title))
+        .order_by(similarity.desc(), Task.created_at.desc())
+        .limit(limit)
+    )
+    result = await session.execute(statement)
+    return [(task, round(float(score) * 100, 1)) for task, score in result.all()]
+
+async def _search_tasks_memory(session: AsyncSession, user_id: str, query: str, similarity_threshold: int, limit: int) -> List[Tuple[Task, float]]:
+    """Match against the per-user in-memory index, then load only the matched rows."""
+    index = await search_index.get(session, user_id)
 
-    # No exact matches - do fuzzy matching across all active tasks
-    all_tasks_stmt = (
+    # Substring matches first (fast path for exact matches), scored 100
+    matches = [(entry.id, 100.0) for entry in index.substring_matches(query)[:limit]]
+
+    # No substring matches - fall back to fuzzy matching on titles
+    # token_set_ratio is best for partial matches (e.g., "Review code" matches "Review cloud code for Yury")
+    if not matches:
+        matches = index.fuzzy_matches(query, score_cutoff=similarity_threshold, limit=limit)
+
+    if not matches:
+        return []
+
+    statement = (
         select(Task)
+        .where(col(Task.id).in_([task_id for task_id, _ in matches]))
         .where(Task.user_id == user_id, Task.is_deleted == False)
         .where(Task.status != TaskStatus.done)
-        .order_by(Task.created_at.desc())
     )
-    all_result = await session.execute(all_tasks_stmt)
-    all_tasks = all_result.scalars().all()
+    result = await session.execute(statement)
+    task_map = {task.id: task for task in result.scalars().all()}
 
-    if not all_tasks:
-        return []
+    # Entries written by another worker may be stale until the index expires
+    return [(task_map[task_id], score) for task_id, score in matches if task_id in task_map]
 
-    # Use rapidfuzz to find similar task titles
-    task_titles = {task.id: task.title for task in all_tasks}
-    task_map = {task.id: task for task in all_tasks}
+async def search_tasks(session: AsyncSession, user_id: str, query: str, similarity_threshold: int = 60) -> List[Tuple[Task, float]]:
+    """
+    Search for tasks using both substring matching and fuzzy matching.
+    Returns a list of (Task, similarity_score) tuples sorted by relevance.
 
-    # Extract top matches using fuzzy matching
-    # token_set_ratio is best for partial matches (e.g., "Review code" matches "Review cloud code for Yury")
-    matches = process.extract(
-        query,
-        task_titles,
-        scorer=fuzz.token_set_ratio,
-        score_cutoff=similarity_threshold,
-        limit=5
-    )
+    On PostgreSQL (SEARCH_BACKEND=auto|postgres) matching runs in SQL against
+    the pg_trgm indexes; otherwise it runs against the per-user in-memory
+    search index with rapidfuzz.
 
-    # Convert to (Task, score) tuples
-    fuzzy_results = []
-    for title, score, task_id in matches:
-        task = task_map[task_id]
-        fuzzy_results.append((task, float(score)))
+    Args:
+        session: Database session
+        user_id: User ID to filter tasks
+        query: Search query string
+        similarity_threshold: Minimum fuzzy match score (0-100, default 60)
 
-    return fuzzy_results
+    Returns:
+        List of (Task, similarity_score) tuples sorted by score descending
+    """
+    global _pg_search_available
+
+    if _pg_search_available and _use_postgres_search(session):
+        try:
+            # Savepoint so a failure doesn't abort the caller's transaction
+            async with session.begin_nested():
+                return await _search_tasks_postgres(session, user_id, query, similarity_threshold, limit=5)
+        except DBAPIError as e:
+            if _pg_search_missing(e):
+                # pg_trgm is not installed; stop trying until restart
+                print(f"Warning: Postgres task search unavailable, using in-memory index: {e}")
+                _pg_search_available = False
+            else:
+                # Timeouts, dropped connections: answer this call from memory, retry next time
+                print(f"Warning: Postgres task search failed, using in-memory index for this query: {e}")
+    return await _search_tasks_memory(session, user_id, query, similarity_threshold, limit=5)
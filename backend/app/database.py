@@ -1,10 +1,12 @@
-from typing import AsyncGenerator
-from sqlmodel import SQLModel, create_engine
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from typing import Any, AsyncGenerator, Dict
+from uuid import uuid4
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import text
+from sqlalchemy import event
 import os
 
+from .config import Settings, get_settings
+
 # Database URL from environment variable
 # Normalize the URL so SQLAlchemy always uses the asyncpg driver even if the
 # incoming env var uses the shorter `postgres://` or `postgresql://` syntax.
@@ -24,12 +26,77 @@ def ensure_async_driver(url: str) -> str:
 
 DATABASE_URL = ensure_async_driver(raw_database_url)
 
+def engine_options(url: str, settings: Settings) -> Dict[str, Any]:
+    """Pool and driver options for create_async_engine from Settings (PostgreSQL only)."""
+    if not url.startswith("postgresql"):
+        # SQLite (tests, local dev) keeps SQLAlchemy's default pool
+        return {}
+
+    if settings.db_pgbouncer:
+        # In transaction mode PgBouncer runs each transaction on whichever server
+        # connection is free, so prepared statements can't be cached, and their
+        # names must not collide across clients. PgBouncer also rejects
+        # statement_timeout as a startup parameter (see apply_statement_timeout).
+        connect_args: Dict[str, Any] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+    else:
+        connect_args = {"statement_cache_size": settings.db_statement_cache_size}
+        if settings.db_statement_timeout_ms > 0:
+            connect_args["server_settings"] = {"statement_timeout": str(settings.db_statement_timeout_ms)}
+
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout_seconds,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "pool_recycle": settings.db_pool_recycle_seconds,
+        "connect_args": connect_args,
+    }
+
+
+def apply_statement_timeout(engine: AsyncEngine, timeout_ms: int):
+    """Set statement_timeout at the start of every transaction (for PgBouncer)."""
+
+    @event.listens_for(engine.sync_engine, "begin")
+    def set_statement_timeout(conn):
+        conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+
+
+def pool_stats(engine: AsyncEngine) -> Dict[str, Any]:
+    """Connection pool gauges for /health/pool, read from the engine's own pool."""
+    pool = engine.sync_engine.pool
+    stats: Dict[str, Any] = {"class": type(pool).__name__}
+    if not hasattr(pool, "checkedout"):
+        return stats
+
+    # QueuePool keeps max_overflow private; -1 means no overflow limit
+    max_overflow = getattr(pool, "_max_overflow", 0)
+    capacity = pool.size() + max_overflow if max_overflow >= 0 else None
+    checked_out = pool.checkedout()
+    stats.update({
+        "size": pool.size(),
+        "checked_out": checked_out,
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "capacity": capacity,
+        "utilization": round(checked_out / capacity, 3) if capacity else None,
+    })
+    return stats
+
+
 # Create Async Engine
+_settings = get_settings()
 engine = create_async_engine(
     DATABASE_URL,
     echo=os.getenv("SQL_ECHO", "").lower() in ("1", "true", "yes"),
     future=True,
+    **engine_options(DATABASE_URL, _settings),
 )
+if _settings.db_pgbouncer and _settings.db_statement_timeout_ms > 0 and engine.dialect.name == "postgresql":
+    apply_statement_timeout(engine, _settings.db_statement_timeout_ms)
 
 # Create Async Session
 async_session = sessionmaker(
@@ -41,59 +108,13 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
         yield session
 
 async def init_db():
-    print(f"Initializing database at {engine.url.render_as_string(hide_password=True)}")
+    """Check that migrations are applied; the schema itself is managed by `python -m app.migrate`."""
+    from .migrate import check_schema
+
+    print(f"Checking database schema at {engine.url.render_as_string(hide_password=True)}")
     try:
-        async with engine.begin() as conn:
-            # In production, use Alembic for migrations. 
-            # For scaffolding/dev, this creates tables automatically if they don't exist.
-            print("Creating tables if they don't exist...")
-            await conn.run_sync(SQLModel.metadata.create_all)
-            
-            # --- SAFEGUARD MIGRATIONS ---
-            print("Running safeguard migrations...")
-            # Ensure 'user' table has 'oidc_issuer', 'google_sub' and 'updated_at'
-            await conn.execute(text('ALTER TABLE "user" ADD COLUMN IF NOT EXISTS oidc_issuer TEXT'))
-            await conn.execute(text('ALTER TABLE "user" ADD COLUMN IF NOT EXISTS google_sub TEXT'))
-            await conn.execute(text('ALTER TABLE "user" ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now()'))
-            await conn.execute(text('ALTER TABLE "user" ADD COLUMN IF NOT EXISTS spotify_access_token TEXT'))
-            await conn.execute(text('ALTER TABLE "user" ADD COLUMN IF NOT EXISTS spotify_refresh_token TEXT'))
-            await conn.execute(text('ALTER TABLE "user" ADD COLUMN IF NOT EXISTS spotify_token_expiry TIMESTAMP WITHOUT TIME ZONE'))
-            await conn.execute(text('ALTER TABLE "user" ADD COLUMN IF NOT EXISTS spotify_display_name TEXT'))
-
-            # Ensure 'theme' table has 'order', 'created_at', 'updated_at'
-            await conn.execute(text('ALTER TABLE theme ADD COLUMN IF NOT EXISTS "order" INTEGER DEFAULT 0'))
-            await conn.execute(text('ALTER TABLE theme ADD COLUMN IF NOT EXISTS created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now()'))
-            await conn.execute(text('ALTER TABLE theme ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now()'))
-
-            # Ensure 'initiative' table has 'created_at', 'updated_at'
-            await conn.execute(text('ALTER TABLE initiative ADD COLUMN IF NOT EXISTS created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now()'))
-            await conn.execute(text('ALTER TABLE initiative ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now()'))
-            
-            # Ensure 'task' table has score columns and other new fields
-            await conn.execute(text("ALTER TABLE task ADD COLUMN IF NOT EXISTS notes TEXT"))
-            await conn.execute(text("ALTER TABLE task ADD COLUMN IF NOT EXISTS priority_score INTEGER DEFAULT 50"))
-            await conn.execute(text("ALTER TABLE task ADD COLUMN IF NOT EXISTS effort_score INTEGER DEFAULT 50"))
-            await conn.execute(text("ALTER TABLE task ADD COLUMN IF NOT EXISTS value_score INTEGER DEFAULT 50"))
-            await conn.execute(text("ALTER TABLE task ADD COLUMN IF NOT EXISTS start_date TIMESTAMP WITHOUT TIME ZONE"))
-            await conn.execute(text("ALTER TABLE task ADD COLUMN IF NOT EXISTS is_deleted BOOLEAN DEFAULT FALSE"))
-            await conn.execute(text("ALTER TABLE task ADD COLUMN IF NOT EXISTS ai_relevance_score INTEGER DEFAULT 0"))
-            await conn.execute(text("ALTER TABLE task ADD COLUMN IF NOT EXISTS ai_reasoning TEXT"))
-            await conn.execute(text("ALTER TABLE task ADD COLUMN IF NOT EXISTS ai_suggestion_status TEXT DEFAULT 'none'"))
-            await conn.execute(text("ALTER TABLE task ADD COLUMN IF NOT EXISTS parent_id TEXT"))
-            await conn.execute(text("ALTER TABLE task ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now()"))
-            
-            # Backfill defaults if needed
-            await conn.execute(text("UPDATE task SET priority_score = 50 WHERE priority_score IS NULL"))
-            await conn.execute(text("UPDATE task SET effort_score = COALESCE(effort_score, estimated_duration, 50) WHERE effort_score IS NULL"))
-            await conn.execute(text("UPDATE task SET value_score = 50 WHERE value_score IS NULL"))
-            await conn.execute(text("UPDATE task SET is_deleted = FALSE WHERE is_deleted IS NULL"))
-            await conn.execute(text("UPDATE task SET ai_relevance_score = 0 WHERE ai_relevance_score IS NULL"))
-            await conn.execute(text("UPDATE task SET ai_suggestion_status = 'none' WHERE ai_suggestion_status IS NULL"))
-            print("Database initialization complete.")
+        await check_schema(engine)
     except Exception as e:
         print(f"CRITICAL: Database initialization failed: {e}")
-        import traceback
-        traceback.print_exc()
         # Re-raise to prevent app from starting in broken state
         raise
-
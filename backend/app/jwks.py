@@ -0,0 +1,205 @@
+"""
+OIDC signing keys (JWKS), fetched once per process and shared by every request.
+
+Keys used to live in a module dict with a one-hour TTL. Every request that found
+it expired, or saw an unknown `kid`, fetched the discovery document and the JWKS
+itself with a fresh HTTP client, so under load a TTL expiry meant a thundering
+herd against the IdP. JWKSManager instead:
+
+- runs at most one fetch at a time; concurrent callers await the same one;
+- refreshes in the background `refresh_ahead` seconds before the keys expire;
+- keeps serving the last good keys for up to `max_stale` seconds past expiry
+  while the IdP cannot be reached, retrying at most every RETRY_SECONDS;
+- refetches for an unknown `kid` at most once per `unknown_kid_cooldown`, so
+  tokens with made-up kids cannot drive traffic to the IdP.
+"""
+
+import asyncio
+import time
+from typing import Optional
+
+import httpx
+from jose import JWTError
+
+from .config import get_settings
+from .token_cache import public_keys
+
+
+def select_jwk(jwks: dict, kid: Optional[str]) -> Optional[dict]:
+    keys = jwks.get("keys", [])
+    if not kid:
+        return keys[0] if keys else None
+    for k in keys:
+        if k.get("kid") == kid:
+            return k
+    return None
+
+
+class JWKSManager:
+    """Single-flight, refresh-ahead cache of the IdP's signing keys."""
+
+    RETRY_SECONDS = 30
+
+    def __init__(
+        self,
+        ttl: float = 3600,
+        refresh_ahead: float = 300,
+        max_stale: float = 86400,
+        unknown_kid_cooldown: float = 30,
+        timeout: float = 10.0,
+    ):
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self.max_stale = max_stale
+        self.unknown_kid_cooldown = unknown_kid_cooldown
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+        self._task: Optional[asyncio.Task] = None
+        self.clear()
+
+    def clear(self):
+        """Forget fetched keys (the HTTP client and background task are kept)."""
+        self._jwks: Optional[dict] = None
+        self._jwks_url: Optional[str] = None
+        self._fetched_at = 0.0
+        self._failed_at = 0.0
+        self._unknown_kid_at = float("-inf")
+        self._inflight: Optional[asyncio.Task] = None
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        return self._client
+
+    @staticmethod
+    def configured() -> bool:
+        settings = get_settings()
+        return bool(settings.oidc_issuer or settings.oidc_jwks_url)
+
+    def start(self):
+        """Fetch the keys now and keep them fresh in the background (called at app startup)."""
+        if self._task is None and self.configured():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        for task in (self._task, self._inflight):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+        self._task = None
+        self._inflight = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+                delay = max(self.ttl - self.refresh_ahead, 1)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                delay = self.RETRY_SECONDS
+            await asyncio.sleep(delay)
+
+    async def _fetch(self) -> dict:
+        settings = get_settings()
+        jwks_url = settings.oidc_jwks_url or self._jwks_url
+        if not jwks_url:
+            well_known = settings.oidc_issuer.rstrip("/") + "/.well-known/openid-configuration"
+            r = await self.http_client.get(well_known)
+            r.raise_for_status()
+            jwks_url = r.json().get("jwks_uri")
+            if not jwks_url:
+                raise JWTError("OIDC JWKS URL not available")
+
+        try:
+            r = await self.http_client.get(jwks_url)
+            r.raise_for_status()
+        except httpx.HTTPError:
+            # Rediscover next time in case the IdP moved its keys
+            self._jwks_url = None
+            raise
+        self._jwks_url = jwks_url
+        return r.json()
+
+    async def _refresh(self) -> dict:
+        try:
+            jwks = await self._fetch()
+        except Exception as e:
+            self._failed_at = time.monotonic()
+            print(f"JWKS refresh failed: {e}")
+            raise
+
+        if jwks != self._jwks:
+            # Keys may have rotated under the same kid
+            public_keys.clear()
+        self._jwks = jwks
+        self._fetched_at = time.monotonic()
+        self._failed_at = 0.0
+        return jwks
+
+    def _start_refresh(self) -> asyncio.Task:
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.create_task(self._refresh())
+            # Background refreshes have no awaiter; don't warn about their errors
+            self._inflight.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return self._inflight
+
+    async def refresh(self) -> dict:
+        """Fetch the JWKS, joining a fetch already in flight."""
+        # Shielded so one cancelled request doesn't abort the fetch for everyone
+        return await asyncio.shield(self._start_refresh())
+
+    async def get_jwks(self) -> dict:
+        if not self.configured():
+            raise JWTError("OIDC not configured")
+
+        age = time.monotonic() - self._fetched_at
+        if self._jwks is not None and age < self.ttl:
+            if age >= self.ttl - self.refresh_ahead:
+                self._start_refresh()
+            return self._jwks
+
+        stale_ok = self._jwks is not None and age < self.ttl + self.max_stale
+        if stale_ok and time.monotonic() - self._failed_at < self.RETRY_SECONDS:
+            # The IdP was down moments ago; don't make this request wait on it
+            return self._jwks
+        try:
+            return await self.refresh()
+        except Exception:
+            if not stale_ok:
+                raise
+            print(f"JWKS: IdP unreachable, serving keys fetched {int(age)}s ago")
+            return self._jwks
+
+    async def get_key(self, kid: Optional[str]) -> Optional[dict]:
+        """The JWK for `kid`, refetching for a kid not seen yet at most once per cooldown."""
+        key = select_jwk(await self.get_jwks(), kid)
+        if key is not None or not kid:
+            return key
+
+        if self._inflight is None or self._inflight.done():
+            now = time.monotonic()
+            if now - self._unknown_kid_at < self.unknown_kid_cooldown:
+                return None
+            self._unknown_kid_at = now
+        try:
+            jwks = await self.refresh()
+        except Exception:
+            return None
+        return select_jwk(jwks, kid)
+
+
+_settings = get_settings()
+jwks_manager = JWKSManager(
+    ttl=_settings.oidc_jwks_ttl_seconds,
+    refresh_ahead=_settings.oidc_jwks_refresh_ahead_seconds,
+    max_stale=_settings.oidc_jwks_max_stale_seconds,
+    unknown_kid_cooldown=_settings.oidc_jwks_unknown_kid_cooldown_seconds,
+)
@@ -0,0 +1,157 @@
+"""
+Process-wide LLM client registry.
+
+Agent services used to build a new Kernel, OpenAI/Azure client and HTTP
+connection pool on every request. The registry builds one pooled
+httpx.AsyncClient (keep-alive, HTTP/2 when the `h2` package is installed) and
+one chat completion service from Settings, and every service shares them.
+Per-request Kernels only wrap the shared service, so a chat turn no longer pays
+for client construction or a fresh TLS handshake.
+"""
+
+import importlib.util
+from typing import Optional
+
+import httpx
+from openai import AsyncAzureOpenAI, AsyncOpenAI
+from semantic_kernel import Kernel
+from semantic_kernel.connectors.ai.open_ai import AzureChatCompletion, OpenAIChatCompletion
+
+from .config import Settings, get_settings
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+PROVIDERS = ("azure", "openai", "groq", "local")
+
+
+def openai_compatible_base_url(provider: str, base_url: str) -> str:
+    """Normalize LLM_BASE_URL for AsyncOpenAI on groq/local providers."""
+    # Some users provide the full completion URL (legacy style)
+    if base_url.endswith("/chat/completions"):
+        base_url = base_url.replace("/chat/completions", "")
+    # Groq URLs may be just the domain; the legacy client used {base_url}/openai/v1
+    if provider == "groq" and "openai/v1" not in base_url:
+        base_url = base_url.rstrip("/") + "/openai/v1"
+    return base_url
+
+
+class LLMClientRegistry:
+    """Shared HTTP pool and chat completion service, built lazily from Settings."""
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._chat_service = None
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = httpx.AsyncClient(
+                http2=self.settings.llm_http2 and HTTP2_AVAILABLE,
+                timeout=httpx.Timeout(self.settings.llm_request_timeout_seconds, connect=10.0),
+                limits=httpx.Limits(
+                    max_connections=self.settings.llm_max_connections,
+                    max_keepalive_connections=self.settings.llm_max_keepalive_connections,
+                    keepalive_expiry=self.settings.llm_keepalive_expiry_seconds,
+                ),
+            )
+        return self._http_client
+
+    def start(self):
+        """Build the chat service, and with it the pool, up front (called at app startup)."""
+        try:
+            self.chat_service()
+        except ValueError as e:
+            # Misconfiguration still surfaces per request, as before
+            print(f"LLM client registry: chat service unavailable: {e}")
+            return
+        print(f"LLM client registry: {self.settings.llm_provider} pool ready "
+              f"(max {self.settings.llm_max_connections} connections, "
+              f"http2={self.settings.llm_http2 and HTTP2_AVAILABLE})")
+
+    def chat_service(self):
+        """The shared Semantic Kernel chat completion service (service_id "chat")."""
+        if self._chat_service is None:
+            self._chat_service = self._build_chat_service()
+        return self._chat_service
+
+    def create_kernel(self) -> Kernel:
+        """A fresh Kernel wired to the shared chat service; cheap enough per request."""
+        kernel = Kernel()
+        kernel.add_service(self.chat_service())
+        return kernel
+
+    def _build_chat_service(self):
+        settings = self.settings
+        provider = settings.llm_provider.lower()
+
+        if not settings.llm_model:
+            raise ValueError("LLM_MODEL environment variable is required")
+
+        if provider == "azure":
+            if not settings.llm_api_key:
+                raise ValueError("AZURE_OPENAI_API_KEY environment variable is required for Azure provider")
+            if not settings.llm_base_url:
+                raise ValueError("AZURE_OPENAI_ENDPOINT environment variable is required for Azure provider")
+
+            api_version = settings.azure_openai_api_version or "2024-02-01"
+            client = AsyncAzureOpenAI(
+                azure_endpoint=settings.llm_base_url,
+                api_key=settings.llm_api_key,
+                api_version=api_version,
+                http_client=self.http_client,
+            )
+            return AzureChatCompletion(
+                deployment_name=settings.llm_model,
+                endpoint=settings.llm_base_url,
+                api_key=settings.llm_api_key,
+                api_version=api_version,
+                async_client=client,
+                service_id="chat",
+            )
+        elif provider == "openai":
+            if not settings.llm_api_key:
+                raise ValueError("OPENAI_API_KEY environment variable is required for OpenAI provider")
+
+            client = AsyncOpenAI(api_key=settings.llm_api_key, http_client=self.http_client)
+        elif provider in ["groq", "local"]:
+            if not settings.llm_base_url:
+                raise ValueError(f"LLM_BASE_URL environment variable is required for {provider} provider")
+
+            client = AsyncOpenAI(
+                base_url=openai_compatible_base_url(provider, settings.llm_base_url),
+                api_key=settings.groq_api_key or settings.llm_api_key or "not-needed",
+                http_client=self.http_client,
+            )
+        else:
+            raise ValueError(f"Unsupported LLM provider: {provider}. Must be one of: {', '.join(PROVIDERS)}")
+
+        return OpenAIChatCompletion(
+            service_id="chat",
+            ai_model_id=settings.llm_model,
+            async_client=client,
+        )
+
+    async def aclose(self):
+        if self._http_client is not None:
+            await self._http_client.aclose()
+        self._http_client = None
+        self._chat_service = None
+
+
+_registry: Optional[LLMClientRegistry] = None
+
+
+def get_llm_registry() -> LLMClientRegistry:
+    """The process-wide registry, created on first use (normally at startup)."""
+    global _registry
+    if _registry is None:
+        _registry = LLMClientRegistry(get_settings())
+    return _registry
+
+
+async def close_llm_registry():
+    global _registry
+    if _registry is not None:
+        await _registry.aclose()
+        _registry = None
@@ -1,13 +1,18 @@
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import os
 import asyncio
 import traceback
 
-from .database import init_db, async_session
+from .auth import get_current_user
+from .database import engine, init_db, async_session, pool_stats
 from .routers import auth, users, tasks, themes, llm, ws, spotify
-from .agents.monitor import TaskMonitor
+from .agents.monitor import TaskMonitor, TaskPurger, TaskReranker
+from .config import get_settings
+from .jwks import jwks_manager
+from .llm_clients import close_llm_registry, get_llm_registry
+from .websockets import manager
 
 app = FastAPI(
     title="Liminal API",
@@ -46,6 +51,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 @app.middleware("http")
@@ -76,19 +82,53 @@ async def health_check():
     return {
         "status": "healthy",
         "version": "1.2.0",
-        "database": str(engine.url.render_as_string(hide_password=True))
+        "database": str(engine.url.render_as_string(hide_password=True)),
     }
 
+@app.get("/health/pool")
+async def pool_health(current_user=Depends(get_current_user)):
+    """Connection pool gauges for the worker that answers (authenticated users only, like /ws/stats)."""
+    return pool_stats(engine)
+
 @app.on_event("startup")
 async def on_startup():
     if os.getenv("DEBUG_STARTUP", "").lower() in ("1", "true", "yes"):
         print(f"DEBUG: Allowed Origins: {origins}")
     await init_db()
+
+    # Open the shared LLM connection pool once for all agent services
+    get_llm_registry().start()
+
+    # Fan websocket broadcasts out to every worker
+    await manager.start()
+
+    # Fetch OIDC signing keys up front and refresh them ahead of expiry
+    jwks_manager.start()
     
     # Start the monitor as a background task
     monitor = TaskMonitor(async_session)
     asyncio.create_task(monitor.start())
 
+    # Keep stored hybrid scores in step with approaching due dates
+    reranker = TaskReranker(async_session)
+    asyncio.create_task(reranker.start())
+
+    # Hard-delete tasks whose restore window has passed and prune old task events
+    settings = get_settings()
+    purger = TaskPurger(
+        async_session,
+        interval_seconds=settings.task_purge_interval_seconds,
+        batch_size=settings.task_purge_batch_size,
+        event_retention_seconds=settings.task_event_retention_seconds,
+    )
+    asyncio.create_task(purger.start())
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await manager.stop()
+    await jwks_manager.stop()
+    await close_llm_registry()
+
 
 @app.get("/")
 async def root():
@@ -0,0 +1,163 @@
+"""
+Database migrations: `python -m app.migrate` upgrades the schema to the
+newest Alembic revision (alembic/versions).
+
+Run it once per deploy, before the app starts. Worker startup only checks that
+the database is at that revision (check_schema); it no longer runs DDL, so a
+boot takes no table locks.
+
+Databases created before migrations existed (by init_db's create_all and its
+ALTER TABLE safeguards) have tables but no alembic_version. They are brought
+up to the baseline with those same statements one last time, then stamped at
+the baseline revision. PostgreSQL runs are serialized with an advisory lock,
+so concurrent deploys can't migrate twice.
+"""
+
+import asyncio
+from pathlib import Path
+from typing import Optional
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect, pool, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlmodel import SQLModel
+
+from . import models  # noqa: F401 - register tables for the legacy create_all
+from .database import DATABASE_URL
+
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+BASELINE_REVISION = "0001"
+# Arbitrary constant shared by every process running migrations
+MIGRATION_LOCK_ID = 0x6C696D696E616C
+
+
+class SchemaOutOfDate(RuntimeError):
+    pass
+
+
+def alembic_config() -> Config:
+    # env.py runs on the connection migrate() passes in config.attributes
+    return Config(str(ALEMBIC_INI))
+
+
+def head_revision(config: Optional[Config] = None) -> Optional[str]:
+    return ScriptDirectory.from_config(config or alembic_config()).get_current_head()
+
+
+def _current_revision(conn: Connection) -> Optional[str]:
+    return MigrationContext.configure(conn).get_current_revision()
+
+
+async def check_schema(engine: AsyncEngine):
+    """Raise SchemaOutOfDate unless the database is at the newest revision."""
+    async with engine.connect() as conn:
+        current = await conn.run_sync(_current_revision)
+    head = head_revision()
+    if current != head:
+        raise SchemaOutOfDate(
+            f"Database schema is at revision {current or 'none'}, expected {head}. "
+            "Run `python -m app.migrate` before starting the app."
+        )
+
+
+def _apply_legacy_safeguards(conn: Connection):
+    """What init_db used to run on every boot, for databases that predate migrations."""
+    SQLModel.metadata.create_all(conn)
+    if conn.dialect.name != "postgresql":
+        return
+
+    # Ensure 'user' table has 'oidc_issuer', 'google_sub' and 'updated_at'
+    conn.execute(text('ALTER TABLE "user" ADD COLUMN IF NOT EXISTS oidc_issuer TEXT'))
+    conn.execute(text('ALTER TABLE "user" ADD COLUMN IF NOT EXISTS google_sub TEXT'))
+    conn.execute(text('ALTER TABLE "user" ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now()'))
+    conn.execute(text('ALTER TABLE "user" ADD COLUMN IF NOT EXISTS spotify_access_token TEXT'))
+    conn.execute(text('ALTER TABLE "user" ADD COLUMN IF NOT EXISTS spotify_refresh_token TEXT'))
+    conn.execute(text('ALTER TABLE "user" ADD COLUMN IF NOT EXISTS spotify_token_expiry TIMESTAMP WITHOUT TIME ZONE'))
+    conn.execute(text('ALTER TABLE "user" ADD COLUMN IF NOT EXISTS spotify_display_name TEXT'))
+
+    # Ensure 'theme' table has 'order', 'created_at', 'updated_at'
+    conn.execute(text('ALTER TABLE theme ADD COLUMN IF NOT EXISTS "order" INTEGER DEFAULT 0'))
+    conn.execute(text('ALTER TABLE theme ADD COLUMN IF NOT EXISTS created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now()'))
+    conn.execute(text('ALTER TABLE theme ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now()'))
+
+    # Ensure 'initiative' table has 'created_at', 'updated_at'
+    conn.execute(text('ALTER TABLE initiative ADD COLUMN IF NOT EXISTS created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now()'))
+    conn.execute(text('ALTER TABLE initiative ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now()'))
+
+    # Ensure 'task' table has score columns and other new fields
+    conn.execute(text("ALTER TABLE task ADD COLUMN IF NOT EXISTS notes TEXT"))
+    conn.execute(text("ALTER TABLE task ADD COLUMN IF NOT EXISTS priority_score INTEGER DEFAULT 50"))
+    conn.execute(text("ALTER TABLE task ADD COLUMN IF NOT EXISTS effort_score INTEGER DEFAULT 50"))
+    conn.execute(text("ALTER TABLE task ADD COLUMN IF NOT EXISTS value_score INTEGER DEFAULT 50"))
+    conn.execute(text("ALTER TABLE task ADD COLUMN IF NOT EXISTS start_date TIMESTAMP WITHOUT TIME ZONE"))
+    conn.execute(text("ALTER TABLE task ADD COLUMN IF NOT EXISTS is_deleted BOOLEAN DEFAULT FALSE"))
+    conn.execute(text("ALTER TABLE task ADD COLUMN IF NOT EXISTS ai_relevance_score INTEGER DEFAULT 0"))
+    conn.execute(text("ALTER TABLE task ADD COLUMN IF NOT EXISTS ai_reasoning TEXT"))
+    conn.execute(text("ALTER TABLE task ADD COLUMN IF NOT EXISTS ai_suggestion_status TEXT DEFAULT 'none'"))
+    conn.execute(text("ALTER TABLE task ADD COLUMN IF NOT EXISTS parent_id TEXT"))
+    conn.execute(text("ALTER TABLE task ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now()"))
+    conn.execute(text("ALTER TABLE task ADD COLUMN IF NOT EXISTS hybrid_score INTEGER DEFAULT 0"))
+    conn.execute(text("ALTER TABLE task ADD COLUMN IF NOT EXISTS urgency_bucket INTEGER DEFAULT 0"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_task_user_id_hybrid_score ON task (user_id, hybrid_score)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_chatmessage_session_id_created_at ON chatmessage (session_id, created_at)"))
+    # Lets the purge job find expired soft-deleted tasks without scanning live ones
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_task_deleted_updated_at ON task (updated_at) WHERE is_deleted"))
+
+    # Trigram indexes for task search (see crud.search_tasks). pg_trgm may be
+    # unavailable on restricted hosts; search then falls back to the in-memory index.
+    try:
+        with conn.begin_nested():
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_task_title_trgm ON task USING gin (title gin_trgm_ops)"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_task_description_trgm ON task USING gin (description gin_trgm_ops)"))
+    except Exception as e:
+        print(f"Warning: pg_trgm search indexes not created: {e}")
+
+    # Backfill defaults if needed
+    conn.execute(text("UPDATE task SET priority_score = 50 WHERE priority_score IS NULL"))
+    conn.execute(text("UPDATE task SET effort_score = COALESCE(effort_score, estimated_duration, 50) WHERE effort_score IS NULL"))
+    conn.execute(text("UPDATE task SET value_score = 50 WHERE value_score IS NULL"))
+    conn.execute(text("UPDATE task SET is_deleted = FALSE WHERE is_deleted IS NULL"))
+    conn.execute(text("UPDATE task SET ai_relevance_score = 0 WHERE ai_relevance_score IS NULL"))
+    conn.execute(text("UPDATE task SET ai_suggestion_status = 'none' WHERE ai_suggestion_status IS NULL"))
+    # hybrid_score itself is backfilled by TaskReranker's first (full) pass
+    conn.execute(text("UPDATE task SET hybrid_score = 0 WHERE hybrid_score IS NULL"))
+    conn.execute(text("UPDATE task SET urgency_bucket = 0 WHERE urgency_bucket IS NULL"))
+
+
+def _upgrade(conn: Connection, config: Config):
+    config.attributes["connection"] = conn
+    tables = set(inspect(conn).get_table_names())
+    if "alembic_version" not in tables and "user" in tables:
+        print(f"Migrate: adopting an unversioned schema at revision {BASELINE_REVISION}")
+        _apply_legacy_safeguards(conn)
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, "head")
+
+
+async def migrate(url: str = DATABASE_URL):
+    """Upgrade the database at `url` to the newest revision."""
+    config = alembic_config()
+    engine = create_async_engine(url, poolclass=pool.NullPool)
+    try:
+        async with engine.connect() as conn:
+            if conn.dialect.name == "postgresql":
+                await conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+            await conn.run_sync(_upgrade, config)
+            await conn.commit()
+            current = await conn.run_sync(_current_revision)
+    finally:
+        await engine.dispose()
+    print(f"Migrate: database at revision {current}")
+
+
+def main():
+    asyncio.run(migrate())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 from typing import Optional, List
 from datetime import datetime
+from sqlalchemy import JSON, Column, Index
 from sqlmodel import Field, SQLModel, Relationship
 from enum import Enum
 
@@ -102,6 +103,10 @@ class Initiative(SQLModel, table=True):
     updated_at: datetime = Field(default_factory=datetime.utcnow, sa_column_kwargs={"onupdate": datetime.utcnow})
 
 class Task(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_task_user_id_hybrid_score", "user_id", "hybrid_score"),
+    )
+
     id: Optional[str] = Field(default=None, primary_key=True)
     title: str
     description: Optional[str] = None
@@ -129,6 +134,10 @@ class Task(SQLModel, table=True):
     ai_relevance_score: Optional[int] = Field(default=0, ge=0, le=100)
     ai_reasoning: Optional[str] = None
     ai_suggestion_status: AISuggestionStatus = Field(default=AISuggestionStatus.none)
+
+    # Materialized ranking (maintained on write and by TaskReranker)
+    hybrid_score: int = Field(default=0)
+    urgency_bucket: int = Field(default=0)
     
     # Recursive relation
     parent_id: Optional[str] = Field(default=None, foreign_key="task.id")
@@ -168,6 +177,10 @@ class ChatSession(SQLModel, table=True):
     updated_at: datetime = Field(default_factory=datetime.utcnow, sa_column_kwargs={"onupdate": datetime.utcnow})
 
 class ChatMessage(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_chatmessage_session_id_created_at", "session_id", "created_at"),
+    )
+
     id: Optional[str] = Field(default=None, primary_key=True)
     session_id: str = Field(foreign_key="chatsession.id")
     role: str # "system", "user", "assistant"
@@ -177,6 +190,38 @@ class ChatMessage(SQLModel, table=True):
     
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+class ConversationState(SQLModel, table=True):
+    """Orchestrator state for a chat session (e.g. a pending confirmation), one row per session."""
+    __tablename__ = "conversation_state"
+
+    session_id: str = Field(foreign_key="chatsession.id", primary_key=True)
+    state: dict = Field(default_factory=dict, sa_column=Column(JSON, nullable=False))
+
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class UserEventVersion(SQLModel, table=True):
+    """Latest task event version per user; bumped in the same transaction as the event."""
+    __tablename__ = "user_event_version"
+
+    user_id: str = Field(foreign_key="user.id", primary_key=True)
+    version: int = 0
+
+class TaskEvent(SQLModel, table=True):
+    """A task change pushed to the user's sockets, kept for a while so clients can resume."""
+    __tablename__ = "task_event"
+    __table_args__ = (
+        Index("ix_task_event_user_id_version", "user_id", "version", unique=True),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: str = Field(foreign_key="user.id")
+    version: int
+    type: str # "task.created", "task.updated", "task.deleted", "task.restored"
+    task_id: str
+    data: dict = Field(default_factory=dict, sa_column=Column(JSON, nullable=False))
+
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
 # --- API DTOs ---
 
 class TaskCreate(SQLModel):
@@ -17,6 +17,7 @@ from ..auth import (
 )
 from ..models import User, Token, Settings as UserSettings
 from ..config import get_settings
+from ..user_cache import user_cache
 
 try:
     from google.oauth2 import id_token as google_id_token
@@ -142,6 +143,7 @@ async def reset_password(
     user.hashed_password = get_password_hash(payload.new_password)
     session.add(user)
     await session.commit()
+    user_cache.invalidate(user.id, session)
 
     return {"message": "Password updated successfully"}
 
@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 import httpx
+import json
 
 from ..database import get_session
-from typing import List
+from typing import List, Optional
 from ..models import User, ChatRequest, ChatResponse, ChatMessage
 from ..auth import get_current_user
 from ..agents import AgentService
@@ -14,16 +16,35 @@ router = APIRouter(prefix="/llm", tags=["llm"])
 @router.get("/history/{session_id}", response_model=List[ChatMessage])
 async def get_chat_history(
     session_id: str,
+    response: Response,
+    limit: Optional[int] = Query(default=None, ge=1, le=200),
+    before: Optional[str] = None,
     session: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user),
 ):
+    """
+    Messages of a chat session.
+
+    Without `limit` the whole transcript is returned oldest first. With
+    `limit` a page is returned newest first, and the cursor for the next
+    (older) page, to pass as `before`, is in the `X-Next-Cursor` header.
+    """
     # Verify ownership? crud.get_chat_session checks user_id
     chat_session = await crud.get_chat_session(session, session_id, current_user.id)
     if not chat_session:
         raise HTTPException(status_code=404, detail="Session not found")
-    
+
+    if limit or before:
+        try:
+            messages, next_cursor = await crud.get_chat_history_page(session, session_id, limit=limit or 50, before=before)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return messages
+
     history = await crud.get_chat_history(session, session_id)
-    # Filter out internal state messages
+    # Filter out internal state messages (written by sessions before conversation_state)
     return [msg for msg in history if not (msg.role == "system" and msg.content.startswith("SK_STATE:"))]
 
 @router.delete("/history/{session_id}", status_code=204)
@@ -99,3 +120,35 @@ async def chat_with_llm(
         print(f"Agent Processing Error: {exc}")
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Agent processing failed: {str(exc)}") from exc
+
+
+@router.post("/chat/stream")
+async def chat_with_llm_stream(
+    payload: ChatRequest,
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Streaming variant of /llm/chat as Server-Sent Events.
+
+    Each event is a JSON object: `session`, then `delta` chunks (and `reset`
+    when a later agent turn replaces the text so far), then `done` with the
+    same fields as ChatResponse. Failures after the stream has started are
+    reported as an `error` event.
+    """
+    agent = AgentService(session, current_user.id)
+    messages = [m.dict() for m in payload.messages]
+
+    async def event_stream():
+        try:
+            async for event in agent.process_request_stream(messages, session_id=payload.session_id):
+                yield f"data: {json.dumps(event, default=str)}\n\n"
+        except Exception as exc:
+            print(f"Agent Streaming Error: {exc}")
+            yield f"data: {json.dumps({'type': 'error', 'detail': str(exc)})}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
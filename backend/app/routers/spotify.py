@@ -12,6 +12,7 @@ from ..auth import get_current_user
 from ..config import get_settings
 from ..database import get_session
 from ..models import User
+from ..user_cache import user_cache
 
 router = APIRouter(prefix="/spotify", tags=["spotify"])
 
@@ -40,6 +41,8 @@ async def _refresh_spotify_token(user: User, session: AsyncSession) -> str:
     settings = get_settings()
     if not settings.spotify_client_id or not settings.spotify_client_secret:
         raise HTTPException(status_code=503, detail="Spotify not configured")
+    # The user may come from another worker's cache; use the latest refresh token
+    await session.refresh(user)
     if not user.spotify_refresh_token:
         raise HTTPException(status_code=401, detail="Spotify not connected")
 
@@ -62,6 +65,7 @@ async def _refresh_spotify_token(user: User, session: AsyncSession) -> str:
 
     session.add(user)
     await session.commit()
+    user_cache.invalidate(user.id, session)
     return user.spotify_access_token
 
 
@@ -135,6 +139,7 @@ async def spotify_callback(
     user.spotify_display_name = display_name
     session.add(user)
     await session.commit()
+    user_cache.invalidate(user.id, session)
 
     return {"connected": True, "display_name": display_name}
 
@@ -181,4 +186,5 @@ async def spotify_disconnect(
     user.spotify_display_name = None
     session.add(user)
     await session.commit()
+    user_cache.invalidate(user.id, session)
     return {"disconnected": True}
@@ -1,13 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Literal, Optional
 
 from ..database import get_session
-from ..models import Task, TaskCreate, User, AISuggestionStatus, TaskParseRequest, TaskParseResponse
+from ..models import Task, TaskCreate, TaskStatus, User, AISuggestionStatus, TaskParseRequest, TaskParseResponse
 from ..auth import get_current_user
 from .. import crud
-from ..websockets import manager
-from ..agents.prioritization import AIPrioritizationService
+from ..task_events import TASK_CREATED, TASK_DELETED, TASK_RESTORED, TASK_UPDATED, publish_task_event, snapshot
+from ..agents.score_cache import score_cache
+from ..agents.suggestion_jobs import suggestion_jobs
 from ..agents.parsing import TaskParsingService
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
@@ -27,19 +28,36 @@ async def create_task(
     current_user: User = Depends(get_current_user),
 ):
     task = await crud.create_task(session, task_data, current_user.id)
-    await manager.broadcast("refresh", current_user.id)
+    await publish_task_event(session, task, TASK_CREATED)
     return task
 
 @router.get("/ai-suggestion", response_model=dict)
 async def get_ai_suggestion(
+    response: Response,
     session: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user),
 ):
-    prioritization_service = AIPrioritizationService(session, current_user.id)
-    suggestion = await prioritization_service.get_ai_suggestion()
+    """
+    Start (or join) a background scoring job and return the last known
+    suggestion immediately. The fresh suggestion is pushed over the websocket
+    as an `ai_suggestion` message when the job finishes.
+    """
+    job = suggestion_jobs.submit(current_user.id)
+    suggestion = await suggestion_jobs.last_known(session, current_user.id)
     if not suggestion:
-        raise HTTPException(status_code=404, detail="No active tasks or AI failed to provide a suggestion.")
-    return suggestion
+        response.status_code = status.HTTP_202_ACCEPTED
+        suggestion = {"suggested_task_id": None, "reasoning": None}
+    return {**suggestion, "job_id": job.id, "status": job.status}
+
+@router.get("/ai-suggestion/jobs/{job_id}", response_model=dict)
+async def get_ai_suggestion_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+):
+    job = suggestion_jobs.get(job_id, current_user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Suggestion job not found")
+    return job.to_dict()
 
 @router.post("/{task_id}/ai-feedback", response_model=Task)
 async def ai_feedback(
@@ -56,18 +74,50 @@ async def ai_feedback(
     if status_val not in [s.value for s in AISuggestionStatus]:
         raise HTTPException(status_code=400, detail=f"Invalid feedback status: {status_val}")
     
+    before = snapshot(task)
     task.ai_suggestion_status = AISuggestionStatus(status_val)
     await session.commit()
     await session.refresh(task)
-    await manager.broadcast("refresh", current_user.id)
+    score_cache.invalidate_task(current_user.id, task.id)
+    await publish_task_event(session, task, TASK_UPDATED, before)
     return task
 
 @router.get("", response_model=List[Task])
 async def get_tasks(
+    response: Response,
+    view: Literal["active", "all"] = "active",
+    status_filter: Optional[TaskStatus] = Query(default=None, alias="status"),
+    theme_id: Optional[str] = None,
+    initiative_id: Optional[str] = None,
+    limit: Optional[int] = Query(default=None, ge=1, le=500),
+    cursor: Optional[str] = None,
     session: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user),
 ):
-    return await crud.get_tasks(session, current_user.id)
+    """
+    List tasks ranked by hybrid score.
+
+    Defaults to the active board (no completed tasks); pass `view=all` to
+    include completed history. When `limit` is set, the cursor for the next
+    page is returned in the `X-Next-Cursor` header.
+    """
+    try:
+        tasks, next_cursor = await crud.get_task_page(
+            session,
+            current_user.id,
+            active_only=(view == "active"),
+            status=status_filter,
+            theme_id=theme_id,
+            initiative_id=initiative_id,
+            limit=limit,
+            cursor=cursor,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return tasks
 
 @router.get("/deleted", response_model=List[Task])
 async def get_deleted_tasks(
@@ -92,7 +142,7 @@ async def restore_task(
         raise HTTPException(status_code=404, detail="Task not found")
     
     restored_task = await crud.restore_task(session, task)
-    await manager.broadcast("refresh", current_user.id)
+    await publish_task_event(session, restored_task, TASK_RESTORED)
     return restored_task
 
 @router.patch("/{task_id}", response_model=Task)
@@ -106,8 +156,9 @@ async def update_task(
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
+    before = snapshot(task)
     updated_task = await crud.update_task(session, task, task_update)
-    await manager.broadcast("refresh", current_user.id)
+    await publish_task_event(session, updated_task, TASK_UPDATED, before)
     return updated_task
 
 @router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -121,5 +172,5 @@ async def delete_task(
         raise HTTPException(status_code=404, detail="Task not found")
 
     await crud.delete_task(session, task)
-    await manager.broadcast("refresh", current_user.id)
+    await publish_task_event(session, task, TASK_DELETED)
     return None
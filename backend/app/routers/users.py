@@ -10,6 +10,7 @@ from ..database import get_session
 from ..models import User, UserCreate, Settings
 from ..auth import get_current_user, get_password_hash
 from ..config import get_settings
+from ..user_cache import user_cache
 
 router = APIRouter(tags=["users"])
 
@@ -62,9 +63,7 @@ async def get_me(
     session: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user),
 ):
-    statement = select(Settings).where(Settings.user_id == current_user.id)
-    result = await session.execute(statement)
-    settings_row = result.scalar_one_or_none()
+    settings_row = await user_cache.get_settings(session, current_user.id)
 
     return {
         "id": current_user.id,
@@ -94,4 +93,10 @@ async def update_me_settings(
     session.add(settings_row)
     await session.commit()
     await session.refresh(settings_row)
+    user_cache.invalidate(current_user.id, session)
     return settings_row
+
+@router.get("/users/cache/stats")
+async def user_cache_stats(current_user: User = Depends(get_current_user)):
+    """User/settings cache counters for the worker that answers (authenticated users only)."""
+    return user_cache.stats()
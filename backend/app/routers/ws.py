@@ -1,58 +1,80 @@
+import json
+from typing import Optional
+
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException, status
-from ..websockets import manager
-from ..auth import get_current_user, oauth2_scheme
-from ..database import get_session
-from sqlalchemy.ext.asyncio import AsyncSession
-from jose import JWTError, jwt
-from ..config import get_settings
+from ..websockets import ClientConnection, manager
+from ..task_events import MAX_REPLAY, resume_messages
 from .. import auth
 
 router = APIRouter()
 
-async def get_user_from_token(token: str, session: AsyncSession) -> str:
+async def get_user_from_token(token: str) -> Optional[str]:
     """
     Manually validate token for WebSocket since middleware/Depends might fail 
     differently in WS context or we need query param extraction.
+
+    Goes through the same verified-token cache as get_current_user and
+    returns the local User.id (for OIDC tokens too, not the IdP `sub`), which
+    is what broadcasts are addressed to.
     """
-    settings = get_settings()
-    try:
-        # We try strict local validation first for speed
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        return payload.get("sub")
-    except JWTError:
-        # If local fails, try OIDC decode (but that's async and complex here)
-        # For MVP, let's assume valid JWT structure or call auth._decode_oidc_token
-        # But _decode_oidc_token is async.
-        try:
-            payload = await auth._decode_oidc_token(token)
-            return payload.get("sub")
-        except Exception as e:
-            print(f"WS_AUTH_FAILURE: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return None
+    return await auth.resolve_user_id(token)
+
+async def send_resume(connection: ClientConnection, user_id: str, since: Optional[int]):
+    from ..database import async_session
+
+    # A replay may use at most half the outbound queue, leaving the rest for
+    # broadcasts and pings arriving meanwhile; longer gaps get a resync instead
+    max_replay = max(1, min(MAX_REPLAY, connection.queue_size // 2))
+    async with async_session() as session:
+        messages = await resume_messages(session, user_id, since, max_replay=max_replay)
+    for message in messages:
+        if not await connection.send(message):
+            # Closed meanwhile (slow consumer); the client resumes on reconnect
+            return
+
+@router.get("/ws/stats")
+async def websocket_stats(current_user=Depends(auth.get_current_user)):
+    """Connection gauges for the worker that answers (authenticated users only)."""
+    return manager.stats()
 
 @router.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket, token: str):
+async def websocket_endpoint(websocket: WebSocket, token: str, since: Optional[int] = None):
     # Note: We use a raw `token` query param for simplicity.
     # In prod, consider HTTP-only cookies or ticket-based auth for WS.
     
-    # We need a session to verify user if needed, but get_user_from_token logic 
-    # handles JWT decoding. We'll skip DB check for pure speed unless token is invalid.
+    # get_user_from_token shares the verified-token cache with HTTP auth, so a
+    # token the client already used for API calls costs no verification or query.
     
-    user_id = await get_user_from_token(token, None) # Session is None for now as we just decode
+    user_id = await get_user_from_token(token)
     
     if not user_id:
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
         return
 
-    await manager.connect(websocket, user_id)
+    connection = await manager.connect(websocket, user_id)
     try:
+        # Registered before replaying, so nothing published meanwhile is lost;
+        # clients drop events at or below the version they already applied.
+        await send_resume(connection, user_id, since)
         while True:
             # Keep connection alive and listen for client pings if necessary
             data = await websocket.receive_text()
+            # Anything from the client, including the "pong" to our heartbeat, proves it alive
+            connection.touch()
             # We can handle client messages here (e.g. "ping")
             if data == "ping":
-                await websocket.send_text("pong")
+                # Through the queue: only the connection's writer sends on the socket
+                await connection.send("pong")
+            elif data.startswith("{"):
+                # {"type": "resume", "since": N}: the client saw a version gap
+                try:
+                    message = json.loads(data)
+                except json.JSONDecodeError:
+                    continue
+                if message.get("type") == "resume" and isinstance(message.get("since"), int):
+                    await send_resume(connection, user_id, message["since"])
     except WebSocketDisconnect:
+        pass
+    finally:
+        # Also runs when the socket was closed from our side (slow consumer)
         manager.disconnect(websocket, user_id)
@@ -0,0 +1,176 @@
+"""
+Per-user in-memory task search index.
+
+Backs crud.search_tasks so chat-driven lookups don't scan the task table.
+Each cached user holds their active tasks' normalized title/description and
+trigram postings for substring queries; fuzzy queries run rapidfuzz over the
+cached titles. Users are evicted LRU once `max_users` is exceeded, and each
+entry expires after `ttl_seconds` so writes made by other workers are
+eventually picked up.
+"""
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from rapidfuzz import fuzz, process
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from .config import get_settings
+from .models import Task, TaskStatus
+
+
+def _normalize(text: Optional[str]) -> str:
+    return (text or "").lower()
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+@dataclass
+class IndexedTask:
+    id: str
+    title: str
+    created_at: datetime
+    title_norm: str = ""
+    description_norm: str = ""
+    trigrams: Set[str] = field(default_factory=set)
+
+
+class UserSearchIndex:
+    """Active tasks of a single user."""
+
+    def __init__(self):
+        self.entries: Dict[str, IndexedTask] = {}
+        self.postings: Dict[str, Set[str]] = {}
+        self.built_at = time.monotonic()
+
+    def add(self, task_id: str, title: str, description: Optional[str], created_at: datetime):
+        self.remove(task_id)
+        entry = IndexedTask(
+            id=task_id,
+            title=title,
+            created_at=created_at,
+            title_norm=_normalize(title),
+            description_norm=_normalize(description),
+        )
+        entry.trigrams = _trigrams(entry.title_norm) | _trigrams(entry.description_norm)
+        self.entries[task_id] = entry
+        for gram in entry.trigrams:
+            self.postings.setdefault(gram, set()).add(task_id)
+
+    def remove(self, task_id: str):
+        entry = self.entries.pop(task_id, None)
+        if not entry:
+            return
+        for gram in entry.trigrams:
+            ids = self.postings.get(gram)
+            if ids is not None:
+                ids.discard(task_id)
+                if not ids:
+                    del self.postings[gram]
+
+    def substring_matches(self, query: str) -> List[IndexedTask]:
+        """Case-insensitive substring match on title or description, newest first."""
+        needle = _normalize(query)
+        grams = _trigrams(needle)
+
+        if grams:
+            # Every trigram of the query must appear in a matching task
+            candidate_ids = None
+            for gram in grams:
+                ids = self.postings.get(gram)
+                if not ids:
+                    return []
+                candidate_ids = set(ids) if candidate_ids is None else candidate_ids & ids
+            candidates = [self.entries[i] for i in candidate_ids]
+        else:
+            candidates = list(self.entries.values())
+
+        matches = [e for e in candidates if needle in e.title_norm or needle in e.description_norm]
+        matches.sort(key=lambda e: e.created_at, reverse=True)
+        return matches
+
+    def fuzzy_matches(self, query: str, score_cutoff: int, limit: int) -> List[Tuple[str, float]]:
+        """token_set_ratio over titles; returns (task_id, score) best first."""
+        if not self.entries:
+            return []
+        titles = {e.id: e.title for e in self.entries.values()}
+        matches = process.extract(
+            query,
+            titles,
+            scorer=fuzz.token_set_ratio,
+            score_cutoff=score_cutoff,
+            limit=limit,
+        )
+        return [(task_id, float(score)) for _, score, task_id in matches]
+
+
+class TaskSearchIndex:
+    """LRU of UserSearchIndex, kept in sync by the crud task write paths."""
+
+    def __init__(self, max_users: int = 256, ttl_seconds: int = 300):
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        self._users: "OrderedDict[str, UserSearchIndex]" = OrderedDict()
+
+    def _cached(self, user_id: str) -> Optional[UserSearchIndex]:
+        index = self._users.get(user_id)
+        if index is None:
+            return None
+        if time.monotonic() - index.built_at > self.ttl_seconds:
+            del self._users[user_id]
+            return None
+        self._users.move_to_end(user_id)
+        return index
+
+    async def get(self, session: AsyncSession, user_id: str) -> UserSearchIndex:
+        """Return the user's index, building it from the database on a miss."""
+        index = self._cached(user_id)
+        if index is not None:
+            return index
+
+        statement = (
+            select(Task.id, Task.title, Task.description, Task.created_at)
+            .where(Task.user_id == user_id, Task.is_deleted == False)
+            .where(Task.status != TaskStatus.done)
+        )
+        result = await session.execute(statement)
+
+        index = UserSearchIndex()
+        for task_id, title, description, created_at in result.all():
+            index.add(task_id, title, description, created_at)
+
+        self._users[user_id] = index
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+        return index
+
+    def upsert(self, task: Task):
+        """Reflect a written task; completed or deleted tasks leave the index."""
+        index = self._users.get(task.user_id)
+        if index is None:
+            return
+        if task.is_deleted or task.status == TaskStatus.done:
+            index.remove(task.id)
+        else:
+            index.add(task.id, task.title, task.description, task.created_at)
+
+    def remove(self, user_id: str, task_id: str):
+        index = self._users.get(user_id)
+        if index is not None:
+            index.remove(task_id)
+
+    def clear(self):
+        self._users.clear()
+
+
+_settings = get_settings()
+search_index = TaskSearchIndex(
+    max_users=_settings.search_index_max_users,
+    ttl_seconds=_settings.search_index_ttl_seconds,
+)
@@ -0,0 +1,108 @@
+"""
+Typed task change events for live clients.
+
+Task mutations used to broadcast the string "refresh", after which every
+connected device re-fetched the whole task list. They now publish one event
+per change:
+
+    {"type": "task.updated", "version": 42, "task_id": "...", "changes": {...}}
+
+task.created and task.restored carry the full task as "task", task.updated
+only the fields that changed, and task.deleted just the id. `version` is per
+user and goes up by exactly one per event, so a client can tell when it
+missed one. Events are kept for a while (see TaskPurger) and the websocket
+replays them to clients that resume from the last version they applied.
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import crud
+from .models import Task, TaskEvent
+
+TASK_CREATED = "task.created"
+TASK_UPDATED = "task.updated"
+TASK_DELETED = "task.deleted"
+TASK_RESTORED = "task.restored"
+
+# Clients further behind than this refetch instead of replaying
+MAX_REPLAY = 500
+
+
+def snapshot(task: Task) -> Dict[str, Any]:
+    """The task as clients see it; take one before an update to diff against."""
+    return task.model_dump(mode="json")
+
+
+def changed_fields(before: Dict[str, Any], task: Task) -> Dict[str, Any]:
+    return {key: value for key, value in snapshot(task).items() if before.get(key) != value}
+
+
+def to_message(event: TaskEvent) -> str:
+    return json.dumps({"type": event.type, "version": event.version, "task_id": event.task_id, **event.data})
+
+
+async def publish_task_event(
+    session: AsyncSession,
+    task: Task,
+    event_type: str,
+    before: Optional[Dict[str, Any]] = None,
+) -> Optional[TaskEvent]:
+    """
+    Record a change to `task` and push it to the owner's sockets.
+
+    Call after the change is committed. For updates pass the snapshot taken
+    before the change; an update that changed nothing publishes nothing.
+    """
+    from .websockets import manager
+
+    if event_type == TASK_UPDATED:
+        changes = changed_fields(before, task) if before is not None else snapshot(task)
+        if not changes:
+            return None
+        data = {"changes": changes}
+    elif event_type == TASK_DELETED:
+        data = {}
+    else:
+        data = {"task": snapshot(task)}
+
+    try:
+        event = await crud.record_task_event(session, task.user_id, event_type, task.id, data)
+    except Exception as e:
+        # The change itself is committed; make clients refetch rather than miss it
+        print(f"Task Events: Failed to record {event_type} for {task.id}: {e}")
+        await session.rollback()
+        # Rollback expired the task and callers still return it
+        await session.refresh(task)
+        await manager.broadcast("refresh", task.user_id)
+        return None
+
+    await manager.broadcast(to_message(event), task.user_id)
+    return event
+
+
+async def resume_messages(
+    session: AsyncSession, user_id: str, since: Optional[int], max_replay: int = MAX_REPLAY
+) -> List[str]:
+    """
+    What to send a socket that just connected.
+
+    Without `since` that is a hello carrying the current version. With it,
+    the events the client missed, or a resync (refetch everything) when
+    those are no longer all available or there are more than `max_replay`.
+    """
+    version = await crud.get_task_event_version(session, user_id)
+    if since is None:
+        return [json.dumps({"type": "hello", "version": version})]
+    if since == version:
+        return []
+
+    if since < version:
+        events = await crud.get_task_events_since(session, user_id, since, limit=max_replay + 1)
+        # Versions have no gaps, so a missing first event means it was pruned
+        if events and events[0].version == since + 1 and len(events) <= max_replay:
+            return [to_message(event) for event in events]
+
+    return [json.dumps({"type": "resync", "version": version})]
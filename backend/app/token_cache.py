@@ -0,0 +1,93 @@
+"""
+Process-level cache of verified bearer tokens.
+
+Verifying a token means a JWKS lookup and an RSA signature check (OIDC) or
+an HMAC check (local auth), and then a user lookup. The same token comes back
+on every request until it expires, so the result is cached under a hash of
+the token: the verified claims, whether it is a local token, and the User.id
+it resolved to. An entry lives until the token's `exp` and is never served
+after it. Tokens without `exp` are not cached.
+
+Constructed public keys are cached per JWK as well (see PublicKeyCache), so
+even a token seen for the first time skips `jwk.construct`.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .config import get_settings
+
+
+@dataclass
+class VerifiedToken:
+    claims: Dict[str, Any]
+    local: bool
+    expires_at: float
+    user_id: Optional[str] = None
+
+
+class TokenCache:
+    """LRU of verified tokens, each valid until its `exp` claim."""
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, VerifiedToken]" = OrderedDict()
+
+    @staticmethod
+    def make_key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str) -> Optional[VerifiedToken]:
+        key = self.make_key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.time() >= entry.expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, token: str, claims: Dict[str, Any], local: bool) -> VerifiedToken:
+        """Remember a verified token; returns the entry (cached or not, e.g. without `exp`)."""
+        exp = claims.get("exp")
+        entry = VerifiedToken(claims=claims, local=local, expires_at=float(exp) if exp is not None else 0.0)
+        if exp is None or self.max_entries <= 0:
+            return entry
+
+        key = self.make_key(token)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def discard(self, token: str):
+        self._entries.pop(self.make_key(token), None)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class PublicKeyCache:
+    """Constructed verification keys per (kid, alg), dropped whenever the JWKS is refetched."""
+
+    def __init__(self):
+        self._keys: Dict[Tuple[Optional[str], str], Any] = {}
+
+    def get(self, kid: Optional[str], alg: str, construct: Callable[[], Any]) -> Any:
+        key = self._keys.get((kid, alg))
+        if key is None:
+            key = construct()
+            self._keys[(kid, alg)] = key
+        return key
+
+    def clear(self):
+        self._keys.clear()
+
+
+token_cache = TokenCache(max_entries=get_settings().token_cache_size)
+public_keys = PublicKeyCache()
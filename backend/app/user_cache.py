@@ -0,0 +1,184 @@
+"""
+Cache of users and their settings rows, per request and per process.
+
+Every authenticated request resolved its User with a query, /me read the
+Settings row with another, and a chat turn loaded the User again for the
+prompt context. UserCache serves all of them:
+
+- per request: rows are kept on the request's session (`session.info`), so the
+  same user or settings row is never queried twice in one request;
+- per process: column snapshots live in an LRU keyed by User.id with a short
+  TTL. A hit rebuilds the row and attaches it to the session as if it had just
+  been loaded, so routes can still modify and commit it like a queried row.
+
+Writes that change a cached row call `invalidate(user_id)` once committed
+(settings updates, Spotify token changes, password resets, OIDC linking).
+The invalidation is also sent to the other workers through the websocket
+broadcast backend (LISTEN/NOTIFY on PostgreSQL), so they drop their copy too.
+Delivery is best-effort, and the short TTL bounds how long a missed one
+can leave a stale copy.
+"""
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple, Type
+
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
+from sqlmodel import SQLModel, select
+
+from .config import get_settings
+from .models import Settings as UserSettings, User
+from .websockets import manager
+
+INVALIDATE_CONTROL = "user_cache.invalidate"
+
+_SCOPE_KEY = "user_cache"
+
+
+@dataclass
+class CachedRow:
+    # Column values, or None for "this user has no settings row"
+    data: Optional[Dict[str, Any]]
+    expires_at: float
+
+
+class UserCache:
+    """TTL'd LRU of User and Settings snapshots plus a per-session scope."""
+
+    def __init__(self, max_entries: int = 4096, ttl_seconds: int = 60):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, str], CachedRow]" = OrderedDict()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.request_hits = 0
+        self.misses = 0
+        self.requests = 0
+        self.invalidations = 0
+
+    def clear(self):
+        self._entries.clear()
+        self.reset_stats()
+
+    # --- Lookups -----------------------------------------------------------
+
+    async def get_user(self, session, user_id: str) -> Optional[User]:
+        return await self._lookup(session, User, "user", user_id, User.id == user_id)
+
+    async def get_settings(self, session, user_id: str) -> Optional[UserSettings]:
+        return await self._lookup(session, UserSettings, "settings", user_id, UserSettings.user_id == user_id)
+
+    def remember(self, session, user: User):
+        """Cache a user resolved some other way (e.g. by OIDC subject)."""
+        self._put(("user", user.id), self._snapshot(user))
+        scope = self._scope(session)
+        if scope is not None:
+            scope[("user", user.id)] = user
+
+    def invalidate(self, user_id: str, session=None):
+        """Forget a user's cached rows here and on every other worker; call after committing a change to them."""
+        self.invalidate_local(user_id, session)
+        manager.publish_control(INVALIDATE_CONTROL, {"user_id": user_id})
+
+    def invalidate_local(self, user_id: str, session=None):
+        """Forget a user's cached rows on this worker only."""
+        self.invalidations += 1
+        scope = self._scope(session) if session is not None else None
+        for kind in ("user", "settings"):
+            self._entries.pop((kind, user_id), None)
+            if scope is not None:
+                scope.pop((kind, user_id), None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.request_hits + self.misses
+        saved = self.hits + self.request_hits
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "request_hits": self.request_hits,
+            "misses": self.misses,
+            "hit_rate": round(saved / lookups, 3) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "queries_saved": saved,
+            "queries_saved_per_request": round(saved / self.requests, 3) if self.requests else 0.0,
+        }
+
+    # --- Internals ---------------------------------------------------------
+
+    async def _lookup(self, session, model: Type[SQLModel], kind: str, user_id: str, where):
+        key = (kind, user_id)
+        scope = self._scope(session)
+        if scope is None:
+            # Not a real session (a test double): rows can't be attached, so just query
+            result = await session.execute(select(model).where(where))
+            return result.scalar_one_or_none()
+        if key in scope:
+            self.request_hits += 1
+            return scope[key]
+
+        entry = self._get(key)
+        if entry is not None:
+            self.hits += 1
+            row = self._attach(session, model, entry.data) if entry.data is not None else None
+        else:
+            self.misses += 1
+            result = await session.execute(select(model).where(where))
+            row = result.scalar_one_or_none()
+            # A missing settings row is worth remembering; a missing user is not
+            if row is not None or kind == "settings":
+                self._put(key, self._snapshot(row) if row is not None else None)
+
+        scope[key] = row
+        return row
+
+    def _scope(self, session) -> Optional[Dict[Tuple[str, str], Any]]:
+        info = getattr(session, "info", None)
+        if not isinstance(info, dict):
+            return None
+        scope = info.get(_SCOPE_KEY)
+        if scope is None:
+            scope = info[_SCOPE_KEY] = {}
+            self.requests += 1
+        return scope
+
+    def _get(self, key: Tuple[str, str]) -> Optional[CachedRow]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() >= entry.expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _put(self, key: Tuple[str, str], data: Optional[Dict[str, Any]]):
+        if self.max_entries <= 0 or self.ttl_seconds <= 0:
+            return
+        self._entries[key] = CachedRow(data=data, expires_at=time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    @staticmethod
+    def _snapshot(row: SQLModel) -> Dict[str, Any]:
+        return {column.key: getattr(row, column.key) for column in row.__table__.columns}
+
+    @staticmethod
+    def _attach(session, model: Type[SQLModel], data: Dict[str, Any]) -> SQLModel:
+        """Rebuild a cached row as a persistent, unmodified instance of `session`."""
+        existing = session.identity_map.get(identity_key(model, data["id"]))
+        if existing is not None:
+            return existing
+        row = model(**data)
+        make_transient_to_detached(row)
+        session.add(row)
+        return row
+
+
+_settings = get_settings()
+user_cache = UserCache(max_entries=_settings.user_cache_size, ttl_seconds=_settings.user_cache_ttl_seconds)
+manager.on_control(INVALIDATE_CONTROL, lambda data: user_cache.invalidate_local(data["user_id"]))
@@ -1,33 +1,491 @@
-from typing import List, Dict
-from fastapi import WebSocket
+"""
+Websocket connections and broadcast fan-out.
+
+ConnectionManager only knows the sockets attached to this process. A
+broadcast goes through a BroadcastBackend, which carries it to every worker;
+each worker then delivers it to its own sockets. InMemoryBroadcastBackend
+(the default, and what tests use) simply delivers locally.
+Backends also carry control messages between workers, such as cache
+invalidations. These go to handlers registered with
+`manager.on_control(kind, handler)` rather than to sockets.
+PostgresBroadcastBackend publishes with NOTIFY, and every worker LISTENs on
+the channel over its own asyncpg connection, so live updates reach a user's
+devices whichever worker or replica they are connected to. That connection is
+opened outside the engine's pool: it is held for the life of the worker and
+would otherwise permanently take one of the pool's slots.
+
+Delivery never waits on a socket. Each connection has a bounded outbound
+queue drained by its own writer task, and every send is bounded by a
+timeout. A slow or half-dead client therefore only delays itself: when its
+send times out or its queue overflows, it is closed (or, with the "drop"
+policy, loses its oldest queued message). Broadcasting is just enqueueing,
+so request handlers return without waiting for delivery.
+
+Each worker also runs a heartbeat: every `ping_interval` it sends "ping" to
+its sockets (clients answer "pong"), and closes any socket it has not heard
+from within `idle_timeout`. That reaps connections whose peer vanished
+without a close frame. A user may hold at most `max_connections_per_user`
+sockets per worker; a new one evicts their oldest.
+"""
+
+import abc
+import asyncio
+import json
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import WebSocket, status
+from sqlalchemy import text
+
+Deliver = Callable[[str, str], None]
+Control = Callable[[str, Dict[str, Any]], None]
+
+
+class BroadcastBackend(abc.ABC):
+    """Carries broadcasts to every worker."""
+
+    def attach(self, deliver: Deliver, control: Optional[Control] = None):
+        """Set the callbacks for socket messages and for control messages from other workers."""
+        self._deliver = deliver
+        self._control = control
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    @abc.abstractmethod
+    def publish(self, user_id: str, message: str):
+        """Hand a message over for delivery; must not block."""
+
+    def publish_control(self, kind: str, data: Dict[str, Any]):
+        """Send a control message to the other workers; must not block."""
+        # A single process has no other workers
+
+
+class InMemoryBroadcastBackend(BroadcastBackend):
+    """Single-process fan-out: delivers straight to local sockets."""
+
+    def publish(self, user_id: str, message: str):
+        self._deliver(user_id, message)
+
+
+class PostgresBroadcastBackend(BroadcastBackend):
+    """
+    Cross-worker fan-out over Postgres LISTEN/NOTIFY.
+
+    The publishing worker delivers locally at once and queues a NOTIFY for
+    the others; a single notifier task sends queued NOTIFYs in publish order,
+    batching whatever has piled up into one transaction. Notifications
+    carrying this worker's own origin id are ignored. NOTIFY payloads are
+    capped at 8000 bytes, so larger messages only reach local sockets.
+    """
+
+    MAX_PAYLOAD_BYTES = 7900
+    NOTIFY_BATCH_SIZE = 100
+
+    def __init__(
+        self,
+        engine,
+        channel: str = "liminal_broadcast",
+        reconnect_seconds: float = 5.0,
+        max_pending: int = 10000,
+    ):
+        self.engine = engine
+        self.channel = channel
+        self.reconnect_seconds = reconnect_seconds
+        self.origin = uuid.uuid4().hex
+        self._pending: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self._listen_task: Optional[asyncio.Task] = None
+        self._notify_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._listen_task is None:
+            self._listen_task = asyncio.create_task(self._listen_forever())
+        self._ensure_notifier()
+
+    async def stop(self):
+        for task in (self._listen_task, self._notify_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._listen_task = self._notify_task = None
+
+    def publish(self, user_id: str, message: str):
+        self._deliver(user_id, message)
+        self._notify(self.encode(user_id, message))
+
+    def publish_control(self, kind: str, data: Dict[str, Any]):
+        self._notify(json.dumps({"origin": self.origin, "control": kind, "data": data}))
+
+    def _notify(self, payload: str):
+        """Queue a NOTIFY for the other workers."""
+        if len(payload.encode("utf-8")) > self.MAX_PAYLOAD_BYTES:
+            print(f"Broadcast: {len(payload)} byte message too large for NOTIFY; delivered locally only")
+            return
+        try:
+            self._pending.put_nowait(payload)
+        except asyncio.QueueFull:
+            print("Broadcast: NOTIFY backlog full; delivered locally only")
+            return
+        self._ensure_notifier()
+
+    def encode(self, user_id: str, message: str) -> str:
+        return json.dumps({"origin": self.origin, "user_id": user_id, "message": message})
+
+    def handle_notification(self, payload: str):
+        """Deliver a NOTIFY payload from another worker to local sockets or control handlers."""
+        try:
+            data = json.loads(payload)
+        except json.JSONDecodeError:
+            print(f"Broadcast: Ignoring malformed notification: {payload[:100]}")
+            return
+        if data.get("origin") == self.origin:
+            return
+        if "control" in data:
+            if self._control is not None:
+                self._control(data["control"], data.get("data") or {})
+            return
+        self._deliver(data["user_id"], data["message"])
+
+    def _ensure_notifier(self):
+        if self._notify_task is None or self._notify_task.done():
+            self._notify_task = asyncio.create_task(self._notify_forever())
+
+    async def _notify_forever(self):
+        while True:
+            payloads = [await self._pending.get()]
+            while len(payloads) < self.NOTIFY_BATCH_SIZE and not self._pending.empty():
+                payloads.append(self._pending.get_nowait())
+            try:
+                async with self.engine.connect() as conn:
+                    for payload in payloads:
+                        await conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": self.channel, "payload": payload})
+                    await conn.commit()
+            except Exception as e:
+                print(f"Broadcast: NOTIFY failed, {len(payloads)} messages delivered locally only: {e}")
+
+    def listener_dsn(self) -> str:
+        """The engine's URL as a plain DSN for asyncpg.connect."""
+        return self.engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+
+    async def _connect_listener(self):
+        import asyncpg
+
+        return await asyncpg.connect(self.listener_dsn())
+
+    async def _close_listener(self, listener):
+        if listener.is_closed():
+            return
+        try:
+            await listener.close(timeout=self.reconnect_seconds)
+        except Exception:
+            listener.terminate()
+
+    async def _listen_forever(self):
+        def on_notify(connection, pid, channel, payload):
+            self.handle_notification(payload)
+
+        while True:
+            listener = None
+            try:
+                listener = await self._connect_listener()
+                closed = asyncio.Event()
+                listener.add_termination_listener(lambda _: closed.set())
+                await listener.add_listener(self.channel, on_notify)
+                print(f"Broadcast: Listening on '{self.channel}'")
+                await closed.wait()
+                print("Broadcast: Listener connection lost")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Broadcast: Listener error: {e}")
+            finally:
+                if listener is not None:
+                    await self._close_listener(listener)
+            await asyncio.sleep(self.reconnect_seconds)
+
+
+class ClientConnection:
+    """One socket with its own bounded outbound queue and writer task."""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        user_id: str,
+        on_close: Callable[["ClientConnection"], None],
+        queue_size: int = 256,
+        send_timeout: float = 5.0,
+        overflow: str = "close",
+    ):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.overflow = overflow
+        self.dropped = 0
+        self.closed = False
+        self.close_code: Optional[int] = None
+        self.last_seen = time.monotonic()
+        self._on_close = on_close
+        self._closed = asyncio.Event()
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._writer = asyncio.create_task(self._write_forever())
+
+    def touch(self):
+        """Record that the client was heard from."""
+        self.last_seen = time.monotonic()
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize()
+
+    def offer(self, message: str) -> bool:
+        """Queue a message without waiting; applies the overflow policy when full."""
+        if self.closed:
+            return False
+        try:
+            self._queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            pass
+
+        if self.overflow == "drop":
+            self._queue.get_nowait()
+            self._queue.put_nowait(message)
+            self.dropped += 1
+            return True
+
+        print(f"WS: Closing slow connection for user {self.user_id} (queue full)")
+        self.close(status.WS_1013_TRY_AGAIN_LATER)
+        return False
+
+    async def send(self, message: str) -> bool:
+        """
+        Queue a message, waiting for room; for the socket's own handler (pong, replays).
+
+        Returns False without queueing once the connection is closed, including
+        when it closes while waiting (the writer no longer drains the queue).
+        """
+        if self.closed:
+            return False
+        put = asyncio.ensure_future(self._queue.put(message))
+        closed = asyncio.ensure_future(self._closed.wait())
+        try:
+            await asyncio.wait((put, closed), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            closed.cancel()
+            if not put.done():
+                put.cancel()
+        return put.done() and not put.cancelled()
+
+    def close(self, code: int = status.WS_1000_NORMAL_CLOSURE, close_socket: bool = True):
+        if self.closed:
+            return
+        self.closed = True
+        self.close_code = code
+        self._closed.set()
+        self._on_close(self)
+        if asyncio.current_task() is not self._writer:
+            self._writer.cancel()
+        if close_socket:
+            # Closing wakes the endpoint's receive loop, which then cleans up
+            self._closer = asyncio.create_task(self._close_socket(code))
+
+    async def _close_socket(self, code: int):
+        try:
+            async with asyncio.timeout(self.send_timeout):
+                await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+    async def _write_forever(self):
+        while True:
+            message = await self._queue.get()
+            try:
+                # asyncio.timeout rather than wait_for: on 3.11 wait_for can swallow the
+                # cancellation close() sends when the send finishes at the same moment
+                async with asyncio.timeout(self.send_timeout):
+                    await self.websocket.send_text(message)
+            except TimeoutError:
+                print(f"WS: Send to user {self.user_id} timed out after {self.send_timeout}s; closing")
+                self.close(status.WS_1013_TRY_AGAIN_LATER)
+                return
+            except Exception:
+                # Dead connection
+                self.close()
+                return
+
 
 class ConnectionManager:
-    def __init__(self):
-        # Map user_id to a list of their active WebSockets
-        self.active_connections: Dict[str, List[WebSocket]] = {}
+    def __init__(
+        self,
+        backend: Optional[BroadcastBackend] = None,
+        send_timeout: float = 5.0,
+        queue_size: int = 256,
+        overflow: str = "close",
+        ping_interval: float = 25.0,
+        idle_timeout: float = 60.0,
+        max_connections_per_user: int = 5,
+    ):
+        # Map user_id to their active connections on this worker
+        self.active_connections: Dict[str, List[ClientConnection]] = {}
+        self.send_timeout = send_timeout
+        self.queue_size = queue_size
+        self.overflow = overflow
+        self.ping_interval = ping_interval
+        self.idle_timeout = idle_timeout
+        self.max_connections_per_user = max_connections_per_user
+        # Lifetime counts for stats()
+        self.reaped = 0
+        self.evicted = 0
+        self.slow_closed = 0
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._control_handlers: Dict[str, Callable[[Dict[str, Any]], None]] = {}
+        self.use_backend(backend or InMemoryBroadcastBackend())
 
-    async def connect(self, websocket: WebSocket, user_id: str):
+    def use_backend(self, backend: BroadcastBackend):
+        backend.attach(self.deliver_local, self.handle_control)
+        self.backend = backend
+
+    def on_control(self, kind: str, handler: Callable[[Dict[str, Any]], None]):
+        """Run `handler` for control messages of `kind` published by other workers."""
+        self._control_handlers[kind] = handler
+
+    def publish_control(self, kind: str, data: Dict[str, Any]):
+        """Send a control message to the other workers (not this one) without waiting."""
+        self.backend.publish_control(kind, data)
+
+    def handle_control(self, kind: str, data: Dict[str, Any]):
+        handler = self._control_handlers.get(kind)
+        if handler is None:
+            print(f"Broadcast: No handler for control message '{kind}'")
+            return
+        try:
+            handler(data)
+        except Exception as e:
+            print(f"Broadcast: Control handler for '{kind}' failed: {e}")
+
+    async def start(self):
+        """Apply settings, choose the broadcast backend and start it (called at app startup)."""
+        from .config import get_settings
+        from .database import engine
+
+        settings = get_settings()
+        self.send_timeout = settings.ws_send_timeout_seconds
+        self.queue_size = settings.ws_send_queue_size
+        self.overflow = settings.ws_queue_overflow.lower()
+        self.ping_interval = settings.ws_ping_interval_seconds
+        self.idle_timeout = settings.ws_idle_timeout_seconds
+        self.max_connections_per_user = settings.ws_max_connections_per_user
+
+        choice = settings.broadcast_backend.lower()
+        if choice == "auto" and settings.db_pgbouncer:
+            # LISTEN needs a session-level connection, which transaction pooling doesn't give
+            print("Broadcast: DB_PGBOUNCER is set; LISTEN/NOTIFY needs BROADCAST_BACKEND=postgres "
+                  "and a session-mode pool, staying in-process")
+            choice = "memory"
+        if choice == "postgres" or (choice == "auto" and engine.dialect.name == "postgresql"):
+            self.use_backend(PostgresBroadcastBackend(engine, channel=settings.broadcast_channel))
+        await self.backend.start()
+        print(f"Broadcast: Using {type(self.backend).__name__}")
+
+        if self._heartbeat_task is None:
+            self._heartbeat_task = asyncio.create_task(self._heartbeat())
+
+    async def stop(self):
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
+        await self.backend.stop()
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            try:
+                reaped = self.sweep()
+                if reaped:
+                    print(f"WS: Reaped {reaped} idle connections")
+            except Exception as e:
+                print(f"WS: Heartbeat error: {e}")
+
+    def sweep(self) -> int:
+        """Close connections idle past `idle_timeout` and ping the rest. Returns the number closed."""
+        now = time.monotonic()
+        reaped = 0
+        for connections in list(self.active_connections.values()):
+            for connection in connections[:]:
+                if now - connection.last_seen > self.idle_timeout:
+                    connection.close(status.WS_1001_GOING_AWAY)
+                    reaped += 1
+                else:
+                    connection.offer("ping")
+        self.reaped += reaped
+        return reaped
+
+    async def connect(self, websocket: WebSocket, user_id: str) -> ClientConnection:
         await websocket.accept()
-        if user_id not in self.active_connections:
-            self.active_connections[user_id] = []
-        self.active_connections[user_id].append(websocket)
+        connection = ClientConnection(
+            websocket,
+            user_id,
+            on_close=self._remove,
+            queue_size=self.queue_size,
+            send_timeout=self.send_timeout,
+            overflow=self.overflow,
+        )
+        # Over the cap, the oldest is usually the stale half of a mobile reconnect
+        existing = self.active_connections.get(user_id, [])
+        while existing and len(existing) >= max(1, self.max_connections_per_user):
+            existing[0].close(status.WS_1008_POLICY_VIOLATION)
+            self.evicted += 1
+            existing = self.active_connections.get(user_id, [])
+        self.active_connections.setdefault(user_id, []).append(connection)
+        return connection
 
     def disconnect(self, websocket: WebSocket, user_id: str):
-        if user_id in self.active_connections:
-            if websocket in self.active_connections[user_id]:
-                self.active_connections[user_id].remove(websocket)
-            if not self.active_connections[user_id]:
-                del self.active_connections[user_id]
+        for connection in self.active_connections.get(user_id, [])[:]:
+            if connection.websocket is websocket:
+                # The client is already gone; just stop writing
+                connection.close(close_socket=False)
+
+    def _remove(self, connection: ClientConnection):
+        if connection.close_code == status.WS_1013_TRY_AGAIN_LATER:
+            self.slow_closed += 1
+        connections = self.active_connections.get(connection.user_id)
+        if connections and connection in connections:
+            connections.remove(connection)
+            if not connections:
+                del self.active_connections[connection.user_id]
+
+    def stats(self) -> Dict[str, int]:
+        """Connection gauges and lifetime counters for this worker."""
+        connections = [c for user_connections in self.active_connections.values() for c in user_connections]
+        return {
+            "connections": len(connections),
+            "users": len(self.active_connections),
+            "queued_messages": sum(c.queued for c in connections),
+            "reaped": self.reaped,
+            "evicted": self.evicted,
+            "slow_closed": self.slow_closed,
+        }
+
+    def enqueue(self, message: str, user_id: str):
+        """Queue a message for all of a user's connections, on every worker, without waiting."""
+        self.backend.publish(user_id, message)
 
     async def broadcast(self, message: str, user_id: str):
-        """Send a message to all connections for a specific user."""
-        if user_id in self.active_connections:
-            # Iterate over a copy to avoid modification issues if disconnect happens concurrently
-            for connection in self.active_connections[user_id][:]:
-                try:
-                    await connection.send_text(message)
-                except Exception:
-                    # Clean up dead connection if send fails
-                    self.disconnect(connection, user_id)
+        """Send a message to all of a user's connections, on every worker. Returns once queued."""
+        self.enqueue(message, user_id)
+
+    def deliver_local(self, user_id: str, message: str):
+        """Queue a message for the user's connections on this worker."""
+        # Iterate over a copy: an overflowing connection removes itself
+        for connection in self.active_connections.get(user_id, [])[:]:
+            connection.offer(message)
 
 manager = ConnectionManager()
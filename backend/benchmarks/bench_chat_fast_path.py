@@ -0,0 +1,98 @@
+"""
+Benchmark: chat confirmation turns with and without the zero-LLM fast path.
+
+Replays "yes"/"no" answers to a pending confirmation through
+AgentService.process_request on an in-memory SQLite database, once with
+USE_CHAT_FAST_PATH on and once with it off (orchestrator, agents and group
+chat built per turn). Neither path calls the model, so no LLM endpoint is
+needed. Run from the backend directory:
+    python -m benchmarks.bench_chat_fast_path
+"""
+
+import asyncio
+import os
+import statistics
+import time
+import uuid
+
+# The slow path builds a Kernel around the shared chat service; point it at a
+# dummy local endpoint unless a real one is configured
+os.environ.setdefault("LLM_PROVIDER", "local")
+os.environ.setdefault("LLM_BASE_URL", "http://localhost:11434/v1")
+os.environ.setdefault("LLM_MODEL", "bench-model")
+
+from unittest.mock import AsyncMock, patch
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel
+
+from app import crud
+from app.agents import core
+from app.agents.core import AgentService
+from app.agents.fast_path import save_pending_confirmation
+from app.models import TaskCreate, User
+
+TURNS = 200
+ACTIVE_TASKS = 10
+
+
+async def run_turns(session_maker, user_id: str, fast_path: bool) -> list:
+    timings = []
+    core.USE_CHAT_FAST_PATH = fast_path
+    async with session_maker() as session:
+        for i in range(TURNS):
+            chat_session = await crud.create_chat_session(session, user_id, title="bench")
+            await save_pending_confirmation(session, chat_session.id, {
+                "action": "create_task",
+                "details": {"title": f"Bench task {i}"},
+            })
+            reply = "yes" if i % 2 == 0 else "no"
+
+            start = time.perf_counter()
+            # A fresh service per turn, as the /llm/chat endpoint does
+            await AgentService(session, user_id).process_request(
+                [{"role": "user", "content": reply}], session_id=chat_session.id
+            )
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def describe(timings: list) -> str:
+    ordered = sorted(timings)
+    p50 = statistics.median(ordered) * 1000
+    p95 = ordered[int(len(ordered) * 0.95) - 1] * 1000
+    return f"p50 {p50:7.2f} ms   p95 {p95:7.2f} ms"
+
+
+async def main():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    user_id = str(uuid.uuid4())
+    async with session_maker() as session:
+        session.add(User(id=user_id, email="bench@example.com", name="Bench"))
+        await session.commit()
+        for i in range(ACTIVE_TASKS):
+            await crud.create_task(session, TaskCreate(title=f"Existing task {i}"), user_id)
+
+    with patch("app.websockets.manager") as mock_manager, \
+         patch.object(core, "USE_SK_ORCHESTRATOR", True):
+        mock_manager.broadcast = AsyncMock()
+        # Warm imports and the shared chat service before timing
+        await run_turns(session_maker, user_id, fast_path=False)
+
+        slow = await run_turns(session_maker, user_id, fast_path=False)
+        fast = await run_turns(session_maker, user_id, fast_path=True)
+
+    print(f"Confirmation turns ({TURNS} each)")
+    print(f"  orchestrator path: {describe(slow)}")
+    print(f"  fast path:         {describe(fast)}")
+    print(f"  p50 reduction:     {1 - statistics.median(fast) / statistics.median(slow):.0%}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,71 @@
+"""
+Micro-benchmark: scalar vs vectorized hybrid scoring.
+
+Run from the backend directory:
+    python -m benchmarks.bench_scoring
+"""
+
+import random
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.agents.prioritization import calculate_hybrid_score, calculate_hybrid_scores
+
+SIZES = [1_000, 10_000, 100_000]
+REPEATS = 5
+
+
+def make_inputs(n: int, now: datetime):
+    rng = random.Random(n)
+    due_dates = [
+        now + timedelta(seconds=rng.uniform(-3 * 86400, 14 * 86400)) if rng.random() > 0.3 else None
+        for _ in range(n)
+    ]
+    ai_scores = [rng.randint(0, 100) for _ in range(n)]
+    priority_scores = [rng.randint(1, 100) for _ in range(n)]
+    return ai_scores, due_dates, priority_scores
+
+
+def best_of(fn, repeats: int = REPEATS) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    now = datetime.utcnow()
+    print("Hybrid scoring, best of %d runs" % REPEATS)
+    print(f"{'tasks':>8} {'scalar (ms)':>12} {'batch (ms)':>11} {'speedup':>8} {'datetime64 (ms)':>16} {'speedup':>8}")
+    for n in SIZES:
+        ai_scores, due_dates, priority_scores = make_inputs(n, now)
+        due_array = np.array(due_dates, dtype="datetime64[us]")
+
+        def scalar():
+            return [calculate_hybrid_score(a, d, p) for a, d, p in zip(ai_scores, due_dates, priority_scores)]
+
+        def batch():
+            return calculate_hybrid_scores(ai_scores, due_dates, priority_scores)
+
+        def batch_datetime64():
+            return calculate_hybrid_scores(ai_scores, due_array, priority_scores)
+
+        expected = [calculate_hybrid_score(a, d, p, now) for a, d, p in zip(ai_scores, due_dates, priority_scores)]
+        assert calculate_hybrid_scores(ai_scores, due_dates, priority_scores, now).tolist() == expected
+        assert calculate_hybrid_scores(ai_scores, due_array, priority_scores, now).tolist() == expected
+
+        scalar_s = best_of(scalar)
+        batch_s = best_of(batch)
+        array_s = best_of(batch_datetime64)
+        print(
+            f"{n:>8} {scalar_s * 1000:>12.2f} {batch_s * 1000:>11.2f} {scalar_s / batch_s:>7.1f}x"
+            f" {array_s * 1000:>16.2f} {scalar_s / array_s:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -118,3 +118,24 @@ def sample_task_data():
         "effort_score": 70,
         "value_score": 75
     }
+
+
+@pytest.fixture(autouse=True)
+def reset_process_caches():
+    """AI scoring results, conversation state, verified tokens, OIDC keys and users are cached process-wide; start each test cold."""
+    from app.agents.conversation_state import conversation_state
+    from app.agents.score_cache import score_cache
+    from app.jwks import jwks_manager
+    from app.token_cache import token_cache
+    from app.user_cache import user_cache
+    score_cache.clear()
+    conversation_state.clear()
+    token_cache.clear()
+    jwks_manager.clear()
+    user_cache.clear()
+    yield
+    score_cache.clear()
+    conversation_state.clear()
+    token_cache.clear()
+    jwks_manager.clear()
+    user_cache.clear()
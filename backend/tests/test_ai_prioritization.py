@@ -78,6 +78,9 @@ async def test_get_ai_suggestion_flow(mock_session, mock_user, sample_tasks):
         mock_settings.return_value.llm_provider = "local"
         mock_settings.return_value.llm_model = "mock-model"
         mock_settings.return_value.llm_base_url = "http://localhost:1234/v1"
+        mock_settings.return_value.ai_scoring_chunk_tokens = 2500
+        mock_settings.return_value.ai_scoring_max_concurrency = 3
+        mock_settings.return_value.ai_scoring_chunk_timeout_seconds = 5
 
         service = AIPrioritizationService(mock_session, mock_user.id)
         
@@ -114,6 +117,9 @@ async def test_update_task_scores(mock_session, mock_user, sample_tasks):
         mock_settings.return_value.llm_provider = "local"
         mock_settings.return_value.llm_model = "mock-model"
         mock_settings.return_value.llm_base_url = "http://localhost:1234/v1"
+        mock_settings.return_value.ai_scoring_chunk_tokens = 2500
+        mock_settings.return_value.ai_scoring_max_concurrency = 3
+        mock_settings.return_value.ai_scoring_chunk_timeout_seconds = 5
 
         service = AIPrioritizationService(mock_session, mock_user.id)
         
@@ -173,6 +179,9 @@ async def test_update_task_scores_with_reasoning(mock_session, mock_user, sample
         mock_settings.return_value.llm_provider = "local"
         mock_settings.return_value.llm_model = "mock-model"
         mock_settings.return_value.llm_base_url = "http://localhost:1234/v1"
+        mock_settings.return_value.ai_scoring_chunk_tokens = 2500
+        mock_settings.return_value.ai_scoring_max_concurrency = 3
+        mock_settings.return_value.ai_scoring_chunk_timeout_seconds = 5
 
         service = AIPrioritizationService(mock_session, mock_user.id)
         
@@ -192,20 +201,252 @@ async def test_update_task_scores_with_reasoning(mock_session, mock_user, sample
 @pytest.mark.asyncio
 async def test_groq_config_prioritization(mock_session, mock_user):
     """Test that groq_api_key is prioritized for the Groq provider."""
-    with patch("app.agents.prioritization.get_settings") as mock_settings, \
-         patch("app.agents.prioritization.AsyncOpenAI") as mock_openai, \
-         patch("app.agents.prioritization.OpenAIChatCompletion") as mock_sk_service:
-        
-        mock_settings.return_value.llm_provider = "groq"
-        mock_settings.return_value.llm_model = "groq-model"
-        mock_settings.return_value.llm_base_url = "https://api.groq.com"
-        mock_settings.return_value.llm_api_key = "generic-key"
-        mock_settings.return_value.groq_api_key = "special-groq-key"
+    from app.config import Settings
+    from app.llm_clients import LLMClientRegistry
+
+    settings = Settings(
+        llm_provider="groq",
+        llm_model="groq-model",
+        llm_base_url="https://api.groq.com",
+        llm_api_key="generic-key",
+        groq_api_key="special-groq-key",
+    )
+    with patch("app.llm_clients.AsyncOpenAI") as mock_openai, \
+         patch("app.llm_clients.OpenAIChatCompletion") as mock_sk_service:
 
-        AIPrioritizationService(mock_session, mock_user.id)
+        registry = LLMClientRegistry(settings)
+        registry.chat_service()
         
         # Verify AsyncOpenAI was called with the groq-specific key
         mock_openai.assert_called_once()
         args, kwargs = mock_openai.call_args
         assert kwargs["api_key"] == "special-groq-key"
         assert "openai/v1" in kwargs["base_url"]
+
+@pytest.mark.asyncio
+async def test_update_task_scores_batched_write_back(db_session):
+    """Scores are written in one UPDATE, unknown IDs are ignored and the row count is reported."""
+    import json
+    from sqlalchemy import event
+    from sqlmodel import select
+
+    user = User(id="batch-user", email="batch@example.com")
+    db_session.add(user)
+    tasks = [Task(id=f"t{i}", title=f"Task {i}", priority_score=50, user_id=user.id) for i in range(3)]
+    tasks.append(Task(id="done", title="Done", status=TaskStatus.done, user_id=user.id))
+    db_session.add_all(tasks)
+    await db_session.commit()
+
+    response_data = {
+        "scores": [
+            {"task_id": "t0", "score": 90, "reasoning": "Urgent"},
+            {"task_id": "t1", "score": "40", "reasoning": "Later"},
+            {"task_id": "t2", "score": None},
+            {"task_id": "done", "score": 80},
+            {"task_id": "someone-else", "score": 70},
+        ],
+        "strategy_summary": "Urgent first.",
+    }
+    mock_result = MagicMock()
+    mock_result.__str__.return_value = json.dumps(response_data)
+
+    updates = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("UPDATE"):
+            updates.append(statement)
+
+    sync_engine = db_session.bind.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", record)
+    try:
+        with patch("app.agents.prioritization.get_settings") as mock_settings, \
+             patch("semantic_kernel.Kernel.invoke_prompt", new=AsyncMock(return_value=mock_result)):
+            mock_settings.return_value.llm_provider = "local"
+            mock_settings.return_value.llm_model = "mock-model"
+            mock_settings.return_value.llm_base_url = "http://localhost:1234/v1"
+            mock_settings.return_value.ai_scoring_chunk_tokens = 2500
+            mock_settings.return_value.ai_scoring_max_concurrency = 3
+            mock_settings.return_value.ai_scoring_chunk_timeout_seconds = 5
+
+            service = AIPrioritizationService(db_session, user.id)
+            data = await service.update_task_scores()
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", record)
+
+    assert data["updated_count"] == 2
+    assert len(updates) == 1
+
+    db_session.expire_all()
+    rows = {t.id: t for t in (await db_session.execute(select(Task))).scalars().all()}
+    assert rows["t0"].ai_relevance_score == 90
+    assert rows["t0"].ai_reasoning == "Urgent"
+    assert rows["t0"].hybrid_score == 55  # 0.5 * 90 + 0.2 * 50
+    assert rows["t1"].ai_relevance_score == 40
+    assert rows["t2"].ai_relevance_score == 0
+    assert rows["done"].ai_relevance_score == 0
+
+def test_chunk_tasks_by_tokens():
+    """Large lists are split into budgeted chunks; everything fits in one chunk by default."""
+    from app.agents.prioritization import chunk_tasks_by_tokens
+
+    tasks = [Task(id=str(i), title=f"Task {i}", user_id="u") for i in range(30)]
+
+    assert chunk_tasks_by_tokens(tasks, 100_000) == [tasks]
+
+    chunks = chunk_tasks_by_tokens(tasks, 400)
+    assert len(chunks) > 1
+    assert [t for chunk in chunks for t in chunk] == tasks
+
+    # A budget smaller than one task still makes progress
+    assert len(chunk_tasks_by_tokens(tasks[:3], 1)) == 3
+
+def test_merge_chunk_scores():
+    """Merging skips failed chunks, clamps scores and drops IDs from other chunks."""
+    from app.agents.prioritization import merge_chunk_scores
+
+    chunks = [
+        [Task(id="a", title="A", user_id="u"), Task(id="b", title="B", user_id="u")],
+        [Task(id="c", title="C", user_id="u")],
+        [Task(id="d", title="D", user_id="u")],
+    ]
+    results = [
+        {"scores": [{"task_id": "a", "score": 140}, {"task_id": "b", "score": "35.6"}, {"task_id": "c", "score": 10}],
+         "strategy_summary": "Chunk one"},
+        TimeoutError(),
+        {"scores": [{"task_id": "d", "score": 50}], "strategy_summary": "Chunk three"},
+    ]
+
+    data = merge_chunk_scores(chunks, results)
+    assert data["scores"] == [
+        {"task_id": "a", "score": 100, "reasoning": None},
+        {"task_id": "b", "score": 36, "reasoning": None},
+        {"task_id": "d", "score": 50, "reasoning": None},
+    ]
+    assert data["strategy_summary"] == "Chunk one"
+    assert data["failed_chunks"] == 1
+    assert merge_chunk_scores(chunks[1:2], [None]) is None
+
+def test_merge_chunk_scores_normalizes_across_chunks():
+    """Chunks scored on different scales are rescaled onto one range before merging."""
+    from app.agents.prioritization import merge_chunk_scores
+
+    chunks = [
+        [Task(id=i, title=i, user_id="u") for i in ("a", "b", "c")],
+        [Task(id=i, title=i, user_id="u") for i in ("d", "e", "f")],
+    ]
+    results = [
+        # A generous chunk: everything looks urgent
+        {"scores": [{"task_id": "a", "score": 95}, {"task_id": "b", "score": 85}, {"task_id": "c", "score": 80}],
+         "strategy_summary": "Generous"},
+        # A strict chunk: its best task only got 40
+        {"scores": [{"task_id": "d", "score": 40}, {"task_id": "e", "score": 30}, {"task_id": "f", "score": 20}],
+         "strategy_summary": "Strict"},
+    ]
+
+    scores = {s["task_id"]: s["score"] for s in merge_chunk_scores(chunks, results)["scores"]}
+    assert scores == {"a": 95, "b": 45, "c": 20, "d": 95, "e": 58, "f": 20}
+    # Raw 40 < raw 85, but d is its chunk's top task and now outranks b
+    ranked = sorted(scores, key=lambda task_id: -scores[task_id])
+    assert ranked.index("d") < ranked.index("e") < ranked.index("b")
+
+    # A single chunk keeps its scores as-is
+    single = merge_chunk_scores(chunks[1:], results[1:])
+    assert [s["score"] for s in single["scores"]] == [40, 30, 20]
+
+def test_merge_chunk_scores_calibrates_against_anchors():
+    """With anchors, each chunk is mapped onto the anchors' reference scores and anchors are dropped."""
+    from app.agents.prioritization import merge_chunk_scores, pick_anchor_tasks
+
+    chunks = [[Task(id="new", title="New", user_id="u")]]
+    anchors = {"low": 20, "high": 80}
+    results = [{"scores": [
+        {"task_id": "new", "score": 95},
+        {"task_id": "low", "score": 50},
+        {"task_id": "high", "score": 100},
+    ]}]
+
+    data = merge_chunk_scores(chunks, results, anchors=anchors)
+    # 50 -> 20 and 100 -> 80, so 95 -> 74
+    assert data["scores"] == [{"task_id": "new", "score": 74, "reasoning": None}]
+
+    tasks = [Task(id=str(i), title=str(i), user_id="u") for i in range(10)]
+    picked = pick_anchor_tasks(tasks, {str(i): i * 10 for i in range(10)}, count=4)
+    assert [t.id for t in picked] == ["0", "3", "6", "9"]
+
+@pytest.mark.asyncio
+async def test_update_task_scores_partial_chunk_failure(db_session):
+    """Chunks are scored separately and a failing chunk doesn't discard the others."""
+    import json
+    import re
+
+    user = User(id="chunk-user", email="chunk@example.com")
+    db_session.add(user)
+    db_session.add_all([Task(id=f"t{i:02d}", title=f"Task {i}", user_id=user.id) for i in range(20)])
+    await db_session.commit()
+
+    prompts = []
+
+    async def fake_invoke(kernel, prompt, **kwargs):
+        prompts.append(prompt)
+        ids = re.findall(r"- ID: (t\d+)", prompt)
+        if "t00" in ids:
+            raise RuntimeError("model unavailable")
+        result = MagicMock()
+        result.__str__.return_value = json.dumps({
+            "scores": [{"task_id": task_id, "score": 60} for task_id in ids],
+            "strategy_summary": "Chunked",
+        })
+        return result
+
+    with patch("app.agents.prioritization.get_settings") as mock_settings, \
+         patch("semantic_kernel.Kernel.invoke_prompt", new=fake_invoke):
+        mock_settings.return_value.llm_provider = "local"
+        mock_settings.return_value.llm_model = "mock-model"
+        mock_settings.return_value.llm_base_url = "http://localhost:1234/v1"
+        mock_settings.return_value.ai_scoring_chunk_tokens = 1000
+        mock_settings.return_value.ai_scoring_max_concurrency = 2
+        mock_settings.return_value.ai_scoring_chunk_timeout_seconds = 5
+
+        service = AIPrioritizationService(db_session, user.id)
+        data = await service.update_task_scores()
+
+    assert len(prompts) > 1
+    assert data["failed_chunks"] == 1
+    assert 0 < data["updated_count"] < 20
+    assert len(data["scores"]) == data["updated_count"]
+
+@pytest.mark.asyncio
+async def test_update_task_scores_header_over_budget(db_session, capsys):
+    """A chunk budget smaller than the prompt header is logged and scores one task per chunk."""
+    import json
+    import re
+
+    user = User(id="tiny-budget-user", email="tiny@example.com")
+    db_session.add(user)
+    db_session.add_all([Task(id=f"t{i}", title=f"Task {i}", user_id=user.id) for i in range(3)])
+    await db_session.commit()
+
+    prompts = []
+
+    async def fake_invoke(kernel, prompt, **kwargs):
+        prompts.append(prompt)
+        ids = re.findall(r"- ID: (t\d+)", prompt)
+        result = MagicMock()
+        result.__str__.return_value = json.dumps({"scores": [{"task_id": i, "score": 70} for i in ids]})
+        return result
+
+    with patch("app.agents.prioritization.get_settings") as mock_settings, \
+         patch("semantic_kernel.Kernel.invoke_prompt", new=fake_invoke):
+        mock_settings.return_value.llm_provider = "local"
+        mock_settings.return_value.llm_model = "mock-model"
+        mock_settings.return_value.llm_base_url = "http://localhost:1234/v1"
+        mock_settings.return_value.ai_scoring_chunk_tokens = 10
+        mock_settings.return_value.ai_scoring_max_concurrency = 2
+        mock_settings.return_value.ai_scoring_chunk_timeout_seconds = 5
+
+        service = AIPrioritizationService(db_session, user.id)
+        data = await service.update_task_scores()
+
+    assert "exceeds ai_scoring_chunk_tokens=10" in capsys.readouterr().out
+    assert len(prompts) == 3
+    assert data["updated_count"] == 3
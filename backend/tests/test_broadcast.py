@@ -0,0 +1,269 @@
+"""
+Tests for websocket broadcast backends and per-connection delivery.
+"""
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from sqlalchemy.engine import make_url
+
+from app.websockets import BroadcastBackend, ConnectionManager, InMemoryBroadcastBackend, PostgresBroadcastBackend
+
+
+class FakeSocket:
+    def __init__(self, fail=False, stall=False):
+        self.sent = []
+        self.fail = fail
+        self.stall = stall
+        self.close_code = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message):
+        if self.fail:
+            raise RuntimeError("socket closed")
+        if self.stall:
+            await asyncio.sleep(3600)
+        self.sent.append(message)
+
+    async def close(self, code=1000):
+        self.close_code = code
+
+
+def postgres_engine():
+    """An engine stand-in whose connections record executed statements."""
+    conn = MagicMock()
+    conn.execute = AsyncMock()
+    conn.commit = AsyncMock()
+    context = MagicMock()
+    context.__aenter__ = AsyncMock(return_value=conn)
+    context.__aexit__ = AsyncMock(return_value=False)
+    engine = MagicMock()
+    engine.connect.return_value = context
+    return engine, conn
+
+
+async def settle():
+    """Let writer and notifier tasks run."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_in_memory_backend_delivers_to_user_sockets():
+    manager = ConnectionManager(InMemoryBroadcastBackend())
+    mine, other, dead = FakeSocket(), FakeSocket(), FakeSocket(fail=True)
+    await manager.connect(mine, "u1")
+    await manager.connect(dead, "u1")
+    await manager.connect(other, "u2")
+
+    await manager.broadcast("refresh", "u1")
+    await settle()
+
+    assert mine.sent == ["refresh"]
+    assert other.sent == []
+    # The failed socket was dropped
+    assert [c.websocket for c in manager.active_connections["u1"]] == [mine]
+
+
+@pytest.mark.asyncio
+async def test_stalled_socket_does_not_hold_up_others():
+    manager = ConnectionManager(send_timeout=0.05)
+    stalled, phone = FakeSocket(stall=True), FakeSocket()
+    await manager.connect(stalled, "u1")
+    await manager.connect(phone, "u1")
+
+    # Returns once queued, without waiting on either socket
+    manager.enqueue("one", "u1")
+    await manager.broadcast("two", "u1")
+    await settle()
+    assert phone.sent == ["one", "two"]
+
+    await asyncio.sleep(0.1)
+    assert stalled.close_code == 1013
+    assert [c.websocket for c in manager.active_connections["u1"]] == [phone]
+
+
+@pytest.mark.asyncio
+async def test_full_queue_closes_or_drops():
+    closing = ConnectionManager(queue_size=2, overflow="close")
+    socket = FakeSocket(stall=True)
+    await closing.connect(socket, "u1")
+    for i in range(4):
+        closing.enqueue(str(i), "u1")
+    await settle()
+    assert socket.close_code == 1013
+    assert "u1" not in closing.active_connections
+
+    dropping = ConnectionManager(queue_size=2, overflow="drop")
+    socket = FakeSocket()
+    connection = await dropping.connect(socket, "u1")
+    for i in range(4):
+        dropping.enqueue(str(i), "u1")
+    await settle()
+    # Nothing was sent before the loop finished: the two oldest were dropped
+    assert socket.sent == ["2", "3"]
+    assert connection.dropped == 2
+
+
+@pytest.mark.asyncio
+async def test_postgres_backend_delivers_locally_and_notifies_in_order():
+    engine, conn = postgres_engine()
+    manager = ConnectionManager(PostgresBroadcastBackend(engine, channel="test_channel"))
+    socket = FakeSocket()
+    await manager.connect(socket, "u1")
+
+    manager.enqueue("first", "u1")
+    manager.enqueue("second", "u1")
+    await settle()
+
+    assert socket.sent == ["first", "second"]
+    payloads = [json.loads(call.args[1]["payload"]) for call in conn.execute.call_args_list]
+    assert [p["message"] for p in payloads] == ["first", "second"]
+    assert all(call.args[1]["channel"] == "test_channel" for call in conn.execute.call_args_list)
+    assert payloads[0]["origin"] == manager.backend.origin
+    # Both went out in one transaction
+    conn.commit.assert_awaited_once()
+    await manager.stop()
+
+
+@pytest.mark.asyncio
+async def test_postgres_backend_skips_notify_for_oversized_messages():
+    engine, conn = postgres_engine()
+    manager = ConnectionManager(PostgresBroadcastBackend(engine))
+    socket = FakeSocket()
+    await manager.connect(socket, "u1")
+
+    big = "x" * PostgresBroadcastBackend.MAX_PAYLOAD_BYTES
+    await manager.broadcast(big, "u1")
+    await settle()
+
+    assert socket.sent == [big]
+    conn.execute.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_notifications_from_other_workers_are_delivered():
+    engine, _ = postgres_engine()
+    here = ConnectionManager(PostgresBroadcastBackend(engine))
+    there = PostgresBroadcastBackend(engine)
+    socket = FakeSocket()
+    await here.connect(socket, "u1")
+
+    here.backend.handle_notification(there.encode("u1", "refresh"))
+    # Our own notifications were already delivered locally
+    here.backend.handle_notification(here.backend.encode("u1", "echo"))
+    here.backend.handle_notification("not json")
+    await settle()
+
+    assert socket.sent == ["refresh"]
+
+
+@pytest.mark.asyncio
+async def test_control_messages_reach_other_workers_handlers():
+    engine, conn = postgres_engine()
+    here = ConnectionManager(PostgresBroadcastBackend(engine))
+    there = ConnectionManager(PostgresBroadcastBackend(engine))
+    received = []
+    here.on_control("cache.invalidate", received.append)
+    there.on_control("cache.invalidate", received.append)
+
+    there.publish_control("cache.invalidate", {"user_id": "u1"})
+    await settle()
+    payload = conn.execute.call_args.args[1]["payload"]
+
+    # Not applied on the publishing worker, only where the notification arrives
+    there.backend.handle_notification(payload)
+    assert received == []
+    here.backend.handle_notification(payload)
+    assert received == [{"user_id": "u1"}]
+    await there.stop()
+
+
+def test_broadcast_backend_requires_publish():
+    class NoPublish(BroadcastBackend):
+        pass
+
+    with pytest.raises(TypeError):
+        BroadcastBackend()
+    with pytest.raises(TypeError):
+        NoPublish()
+
+
+@pytest.mark.asyncio
+async def test_listener_uses_a_dedicated_connection_outside_the_pool():
+    """LISTEN runs on its own asyncpg connection, never on one checked out of the engine's pool."""
+    engine, _ = postgres_engine()
+    engine.url = make_url("postgresql+asyncpg://app:secret@db:5432/liminal")
+    backend = PostgresBroadcastBackend(engine, channel="test_channel")
+    backend.attach(lambda user_id, message: None)
+
+    listener = MagicMock()
+    listener.add_listener = AsyncMock()
+    listener.close = AsyncMock()
+    listener.is_closed.return_value = False
+    connect = AsyncMock(return_value=listener)
+
+    with patch("asyncpg.connect", new=connect):
+        await backend.start()
+        await settle()
+        await backend.stop()
+
+    connect.assert_awaited_once_with("postgresql://app:secret@db:5432/liminal")
+    listener.add_listener.assert_awaited_once()
+    assert listener.add_listener.call_args.args[0] == "test_channel"
+    listener.close.assert_awaited_once()
+    engine.connect.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_sweep_pings_live_and_reaps_idle_connections():
+    manager = ConnectionManager(idle_timeout=30)
+    idle, live = FakeSocket(), FakeSocket()
+    idle_connection = await manager.connect(idle, "u1")
+    await manager.connect(live, "u1")
+    idle_connection.last_seen -= 60
+
+    assert manager.sweep() == 1
+    await settle()
+
+    assert idle.close_code == 1001
+    assert live.sent == ["ping"]
+    assert manager.stats()["connections"] == 1
+    assert manager.stats()["reaped"] == 1
+
+
+@pytest.mark.asyncio
+async def test_connection_cap_evicts_oldest():
+    manager = ConnectionManager(max_connections_per_user=2)
+    sockets = [FakeSocket() for _ in range(3)]
+    for socket in sockets:
+        await manager.connect(socket, "u1")
+    await manager.connect(FakeSocket(), "u2")
+    await settle()
+
+    assert sockets[0].close_code == 1008
+    assert [c.websocket for c in manager.active_connections["u1"]] == sockets[1:]
+    assert manager.stats() == {
+        "connections": 3, "users": 2, "queued_messages": 0, "reaped": 0, "evicted": 1, "slow_closed": 0,
+    }
+
+    # A cap of one still keeps the newest socket registered
+    single = ConnectionManager(max_connections_per_user=1)
+    first, second = FakeSocket(), FakeSocket()
+    await single.connect(first, "u1")
+    await single.connect(second, "u1")
+    assert [c.websocket for c in single.active_connections["u1"]] == [second]
+
+
+@pytest.mark.asyncio
+async def test_ws_stats_requires_authentication(client):
+    assert (await client.get("/ws/stats")).status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_ws_stats_for_authenticated_users(authed_client):
+    response = await authed_client.get("/ws/stats")
+    assert response.status_code == 200
+    assert "connections" in response.json()
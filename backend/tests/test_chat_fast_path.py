@@ -0,0 +1,160 @@
+"""
+Tests for the zero-LLM chat fast path.
+
+Confirmation replies and exact commands must be handled without building
+the SK orchestrator (Kernel, agents, group chat).
+"""
+import pytest
+import uuid
+from unittest.mock import AsyncMock, patch
+from sqlmodel import SQLModel, select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+
+from app import crud
+from app.agents.core import AgentService
+from app.agents.fast_path import FastPathRouter, save_pending_confirmation
+from app.models import ChatMessage, Task, TaskCreate, TaskStatus, User
+
+
+@pytest.fixture
+async def async_session():
+    """Create an in-memory async SQLite database for testing."""
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        echo=False,
+        connect_args={"check_same_thread": False}
+    )
+
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+    async_session_maker = async_sessionmaker(
+        engine, class_=AsyncSession, expire_on_commit=False
+    )
+
+    async with async_session_maker() as session:
+        yield session
+
+    await engine.dispose()
+
+
+@pytest.fixture
+async def test_user(async_session):
+    """Create a test user."""
+    user = User(id=str(uuid.uuid4()), email="test@example.com", name="Test User")
+    async_session.add(user)
+    await async_session.commit()
+    await async_session.refresh(user)
+    return user
+
+
+@pytest.fixture
+def no_orchestrator():
+    """Fail the test if the SK orchestrator is constructed."""
+    with patch("app.agents.sk_orchestrator.SKOrchestrator.__init__", side_effect=AssertionError("orchestrator built")) as init, \
+         patch("app.websockets.manager") as mock_manager:
+        mock_manager.broadcast = AsyncMock()
+        yield init
+
+
+async def pending_session(async_session, user_id, pending):
+    chat_session = await crud.create_chat_session(async_session, user_id, title="test")
+    await save_pending_confirmation(async_session, chat_session.id, pending)
+    return chat_session
+
+
+@pytest.mark.asyncio
+async def test_confirmation_yes_creates_task(async_session, test_user, no_orchestrator):
+    pending = {"action": "create_task", "details": {"title": "Review code", "priority_score": 70}}
+    chat_session = await pending_session(async_session, test_user.id, pending)
+
+    service = AgentService(async_session, test_user.id)
+    with patch("app.agents.core.USE_SK_ORCHESTRATOR", True):
+        result = await service.process_request([{"role": "user", "content": "Yes!"}], session_id=chat_session.id)
+
+    assert result["content"].startswith("✓ Created task: 'Review code'")
+    assert result["pending_confirmation"] is None
+    tasks = (await async_session.execute(select(Task).where(Task.user_id == test_user.id))).scalars().all()
+    assert [t.title for t in tasks] == ["Review code"]
+
+    # The confirmation is cleared, so a second "yes" is not a fast-path turn
+    assert await FastPathRouter(async_session, test_user.id).route("yes", chat_session.id) is None
+
+
+@pytest.mark.asyncio
+async def test_confirmation_cancel(async_session, test_user, no_orchestrator):
+    pending = {"action": "create_task", "details": {"title": "Review code"}}
+    chat_session = await pending_session(async_session, test_user.id, pending)
+
+    router = FastPathRouter(async_session, test_user.id)
+    assert await router.route("cancel", chat_session.id) == "Okay, cancelled. What else can I help with?"
+
+    assert await crud.get_conversation_state(async_session, chat_session.id) == {"pending_confirmation": None}
+    tasks = (await async_session.execute(select(Task))).scalars().all()
+    assert tasks == []
+
+
+@pytest.mark.asyncio
+async def test_confirmation_edit_falls_through(async_session, test_user):
+    pending = {"action": "create_task", "details": {"title": "Review code"}}
+    chat_session = await pending_session(async_session, test_user.id, pending)
+
+    router = FastPathRouter(async_session, test_user.id)
+    assert await router.route("make it due Friday", chat_session.id) is None
+
+
+@pytest.mark.asyncio
+async def test_complete_exact_title(async_session, test_user, no_orchestrator):
+    task = await crud.create_task(async_session, TaskCreate(title="Pay rent"), test_user.id)
+    await crud.create_task(async_session, TaskCreate(title="Pay rent deposit"), test_user.id)
+
+    service = AgentService(async_session, test_user.id)
+    with patch("app.agents.core.USE_SK_ORCHESTRATOR", True):
+        result = await service.process_request([{"role": "user", "content": "complete pay rent"}])
+
+    assert result["content"] == "✓ Marked 'Pay rent' as complete!"
+    await async_session.refresh(task)
+    assert task.status == TaskStatus.done
+
+    messages = (await async_session.execute(
+        select(ChatMessage).where(ChatMessage.session_id == result["session_id"])
+    )).scalars().all()
+    assert [m.role for m in messages] == ["user", "assistant"]
+
+
+@pytest.mark.asyncio
+async def test_complete_ambiguous_or_fuzzy_falls_through(async_session, test_user):
+    await crud.create_task(async_session, TaskCreate(title="Pay rent"), test_user.id)
+    await crud.create_task(async_session, TaskCreate(title="pay rent"), test_user.id)
+    await crud.create_task(async_session, TaskCreate(title="Write report"), test_user.id)
+
+    router = FastPathRouter(async_session, test_user.id)
+    assert await router.route("complete pay rent", None) is None
+    assert await router.route("complete the report", None) is None
+
+
+@pytest.mark.asyncio
+async def test_delete_by_id(async_session, test_user, no_orchestrator):
+    task = await crud.create_task(async_session, TaskCreate(title="Old idea"), test_user.id)
+
+    router = FastPathRouter(async_session, test_user.id)
+    assert await router.route(f"delete {task.id}", None) == "✓ Deleted task 'Old idea'."
+    assert await crud.get_task_by_id(async_session, task.id, test_user.id) is None
+
+    # Unknown ids and titles go to the agents
+    assert await router.route(f"delete {uuid.uuid4()}", None) is None
+    assert await router.route("delete old idea", None) is None
+
+
+@pytest.mark.asyncio
+async def test_other_turns_use_orchestrator(async_session, test_user):
+    service = AgentService(async_session, test_user.id)
+    with patch("app.agents.core.USE_SK_ORCHESTRATOR", True), \
+         patch("app.agents.core.AgentService._ensure_sk_orchestrator", new_callable=AsyncMock) as ensure:
+        service._sk_orchestrator = AsyncMock()
+        service._sk_orchestrator.process_request.return_value = "Hi there"
+        service._sk_orchestrator.pending_confirmation = None
+        result = await service.process_request([{"role": "user", "content": "yes"}])
+
+    ensure.assert_awaited_once()
+    assert result["content"] == "Hi there"
@@ -0,0 +1,126 @@
+"""
+Tests for paginated and windowed chat history retrieval.
+"""
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from httpx import AsyncClient
+from sqlmodel import select
+
+from app import crud
+from app.agents.sk_orchestrator import SKOrchestrator
+from app.models import ChatMessage, User
+from semantic_kernel.contents import AuthorRole
+
+
+async def seed_session(db_session, count: int, user_id: str = None):
+    if user_id is None:
+        user = User(id="history-user", email="history@example.com", name="History")
+        db_session.add(user)
+        await db_session.commit()
+        user_id = user.id
+
+    chat_session = await crud.create_chat_session(db_session, user_id, title="history")
+    start = datetime(2026, 1, 1, 12, 0, 0)
+    for i in range(count):
+        db_session.add(ChatMessage(
+            id=f"m{i:03d}",
+            session_id=chat_session.id,
+            role="user" if i % 2 == 0 else "assistant",
+            content=f"message {i}",
+            created_at=start + timedelta(seconds=i),
+        ))
+    # Legacy state row, never part of the visible history
+    db_session.add(ChatMessage(
+        id="state",
+        session_id=chat_session.id,
+        role="system",
+        content='SK_STATE: {"pending_confirmation": null}',
+        created_at=start + timedelta(seconds=count),
+    ))
+    await db_session.commit()
+    return chat_session
+
+
+@pytest.mark.asyncio
+async def test_history_pages_newest_first(db_session):
+    chat_session = await seed_session(db_session, 25)
+
+    seen = []
+    cursor = None
+    while True:
+        page, cursor = await crud.get_chat_history_page(db_session, chat_session.id, limit=10, before=cursor)
+        seen.extend(m.content for m in page)
+        if cursor is None:
+            break
+
+    assert seen == [f"message {i}" for i in range(24, -1, -1)]
+
+
+@pytest.mark.asyncio
+async def test_history_cursor_breaks_timestamp_ties(db_session):
+    user = User(id="tie-user", email="tie@example.com", name="Tie")
+    db_session.add(user)
+    await db_session.commit()
+    chat_session = await crud.create_chat_session(db_session, user.id)
+    at = datetime(2026, 1, 1)
+    for i in range(5):
+        db_session.add(ChatMessage(id=f"t{i}", session_id=chat_session.id, role="user", content=str(i), created_at=at))
+    await db_session.commit()
+
+    first, cursor = await crud.get_chat_history_page(db_session, chat_session.id, limit=2)
+    rest, _ = await crud.get_chat_history_page(db_session, chat_session.id, limit=10, before=cursor)
+    assert [m.id for m in first + rest] == ["t4", "t3", "t2", "t1", "t0"]
+
+
+@pytest.mark.asyncio
+async def test_recent_messages_respect_token_budget(db_session):
+    chat_session = await seed_session(db_session, 12)
+
+    window = await crud.get_recent_chat_messages(db_session, chat_session.id, max_messages=6, token_budget=10_000)
+    assert [m.content for m in window] == [f"message {i}" for i in range(6, 12)]
+
+    # "message N" is ~3 tokens each
+    window = await crud.get_recent_chat_messages(db_session, chat_session.id, max_messages=6, token_budget=7)
+    assert [m.content for m in window] == ["message 10", "message 11"]
+
+
+@pytest.mark.asyncio
+async def test_orchestrator_recent_history_skips_current_message(db_session):
+    chat_session = await seed_session(db_session, 4)
+    await crud.add_chat_message(db_session, chat_session.id, "user", "what next?")
+
+    with patch("app.agents.sk_orchestrator.get_settings") as mock_settings:
+        mock_settings.return_value.chat_context_max_messages = 10
+        mock_settings.return_value.chat_context_token_budget = 1000
+        orchestrator = SKOrchestrator(db_session, chat_session.user_id, chat_session.id)
+
+    history = await orchestrator.get_recent_history(exclude_latest="what next?")
+    assert [(m.role, m.content) for m in history] == [
+        (AuthorRole.USER, "message 0"),
+        (AuthorRole.ASSISTANT, "message 1"),
+        (AuthorRole.USER, "message 2"),
+        (AuthorRole.ASSISTANT, "message 3"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_history_endpoint_pagination(authed_client: AsyncClient, db_session):
+    user = (await db_session.execute(select(User).where(User.email == "test@example.com"))).scalar_one()
+    chat_session = await seed_session(db_session, 5, user_id=user.id)
+
+    response = await authed_client.get(f"/llm/history/{chat_session.id}", params={"limit": 3})
+    assert response.status_code == 200
+    assert [m["content"] for m in response.json()] == ["message 4", "message 3", "message 2"]
+
+    cursor = response.headers["X-Next-Cursor"]
+    response = await authed_client.get(f"/llm/history/{chat_session.id}", params={"limit": 3, "before": cursor})
+    assert [m["content"] for m in response.json()] == ["message 1", "message 0"]
+    assert "X-Next-Cursor" not in response.headers
+
+    # Unpaginated: whole transcript, oldest first, state rows filtered
+    response = await authed_client.get(f"/llm/history/{chat_session.id}")
+    assert [m["content"] for m in response.json()] == [f"message {i}" for i in range(5)]
+
+    response = await authed_client.get(f"/llm/history/{chat_session.id}", params={"before": "not-a-cursor"})
+    assert response.status_code == 400
@@ -0,0 +1,139 @@
+"""
+Tests for coalesced chat persistence (ChatOutbox).
+"""
+import pytest
+import uuid
+from datetime import datetime
+from unittest.mock import patch
+from sqlalchemy import event
+from sqlmodel import SQLModel
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+
+from app import crud
+from app.agents.chat_outbox import ChatOutbox
+from app.agents.conversation_state import conversation_state
+from app.agents.core import AgentService
+from app.agents.fast_path import save_pending_confirmation
+from app.models import User
+
+
+@pytest.fixture
+async def async_session():
+    """Create an in-memory async SQLite database for testing."""
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        echo=False,
+        connect_args={"check_same_thread": False}
+    )
+
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+    async_session_maker = async_sessionmaker(
+        engine, class_=AsyncSession, expire_on_commit=False
+    )
+
+    async with async_session_maker() as session:
+        yield session
+
+    await engine.dispose()
+
+
+@pytest.fixture
+async def test_user(async_session):
+    """Create a test user."""
+    user = User(id=str(uuid.uuid4()), email="test@example.com", name="Test User")
+    async_session.add(user)
+    await async_session.commit()
+    await async_session.refresh(user)
+    return user
+
+
+@pytest.fixture
+def commits(async_session):
+    """Count commits on the test session."""
+    seen = []
+    listener = lambda session: seen.append(session)
+    event.listen(async_session.sync_session, "after_commit", listener)
+    yield seen
+    event.remove(async_session.sync_session, "after_commit", listener)
+
+
+class FakeOrchestrator:
+    """Stands in for SKOrchestrator: queues a pending confirmation, then answers (or fails)."""
+
+    def __init__(self, service, chat_session, reply=None, error=None):
+        self.service = service
+        self.chat_session_id = chat_session.id
+        self.reply = reply
+        self.error = error
+        self.pending_confirmation = {"action": "create_task", "details": {"title": "Later"}}
+
+    async def process_request(self, message):
+        await save_pending_confirmation(
+            self.service.session, self.chat_session_id, self.pending_confirmation, self.service.outbox
+        )
+        if self.error:
+            raise self.error
+        return self.reply
+
+
+def use_fake_orchestrator(service, **kwargs):
+    async def ensure(chat_session):
+        service._sk_orchestrator = FakeOrchestrator(service, chat_session, **kwargs)
+    return patch.object(service, "_ensure_sk_orchestrator", side_effect=ensure)
+
+
+@pytest.mark.asyncio
+async def test_turn_commits_once(async_session, test_user, commits):
+    service = AgentService(async_session, test_user.id)
+
+    with patch("app.agents.core.USE_SK_ORCHESTRATOR", True), use_fake_orchestrator(service, reply="Here you go"):
+        result = await service.process_request([{"role": "user", "content": "plan my day"}])
+
+    # New session, user message, state and reply: one transaction
+    assert len(commits) == 1
+
+    history = await crud.get_chat_history(async_session, result["session_id"])
+    assert [(m.role, m.content) for m in history] == [("user", "plan my day"), ("assistant", "Here you go")]
+    assert history[0].created_at < history[1].created_at
+    state = await crud.get_conversation_state(async_session, result["session_id"])
+    assert state["pending_confirmation"]["details"] == {"title": "Later"}
+
+
+@pytest.mark.asyncio
+async def test_failed_turn_still_saves_user_message(async_session, test_user):
+    service = AgentService(async_session, test_user.id)
+
+    with patch("app.agents.core.USE_SK_ORCHESTRATOR", True), \
+         use_fake_orchestrator(service, error=RuntimeError("model down")):
+        with pytest.raises(RuntimeError):
+            await service.process_request([{"role": "user", "content": "plan my day"}])
+
+    history = await crud.get_chat_history(async_session, service._sk_orchestrator.chat_session_id)
+    assert [(m.role, m.content) for m in history] == [("user", "plan my day")]
+
+
+@pytest.mark.asyncio
+async def test_outbox_orders_and_shows_queued_state(async_session, test_user, commits):
+    outbox = ChatOutbox(async_session)
+    chat_session = outbox.create_chat_session(test_user.id)
+
+    # Same-instant enqueues still get strictly increasing timestamps
+    with patch("app.agents.chat_outbox.datetime") as mock_datetime:
+        mock_datetime.utcnow.return_value = datetime(2026, 1, 1)
+        for i in range(3):
+            outbox.add_message(chat_session.id, "user", str(i))
+
+    await conversation_state.save(async_session, chat_session.id, {"pending_confirmation": {"action": "x"}}, outbox)
+    conversation_state.clear()
+    assert await conversation_state.load(async_session, chat_session.id, outbox) == {"pending_confirmation": {"action": "x"}}
+    assert commits == []
+
+    await outbox.flush()
+    assert len(commits) == 1
+    assert not outbox.pending
+
+    history = await crud.get_chat_history(async_session, chat_session.id)
+    assert [m.content for m in history] == ["0", "1", "2"]
+    assert await crud.get_conversation_state(async_session, chat_session.id) == {"pending_confirmation": {"action": "x"}}
@@ -0,0 +1,201 @@
+"""
+Tests for streaming chat responses (/llm/chat/stream).
+"""
+import asyncio
+import json
+import pytest
+import uuid
+from unittest.mock import patch
+from httpx import AsyncClient
+from sqlmodel import SQLModel, select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+
+from app.agents.core import AgentService, ConfirmationTailFilter
+from app.models import ChatMessage, User
+
+
+@pytest.fixture
+async def async_session():
+    """Create an in-memory async SQLite database for testing."""
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        echo=False,
+        connect_args={"check_same_thread": False}
+    )
+
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+    async_session_maker = async_sessionmaker(
+        engine, class_=AsyncSession, expire_on_commit=False
+    )
+
+    async with async_session_maker() as session:
+        yield session
+
+    await engine.dispose()
+
+
+@pytest.fixture
+async def test_user(async_session):
+    """Create a test user."""
+    user = User(id=str(uuid.uuid4()), email="test@example.com", name="Test User")
+    async_session.add(user)
+    await async_session.commit()
+    await async_session.refresh(user)
+    return user
+
+
+CONFIRMATION_REPLY = [
+    "I'll create a task: **Review code**\n",
+    "Reply 'yes' to confirm.\n\npending_",
+    "confirmation: {\"action\": \"create_task\", ",
+    "\"details\": {\"title\": \"Review code\"}}",
+]
+
+
+def fake_stream(chunks_by_turn, pending=None):
+    """Stand-in for SKOrchestrator.process_request_stream."""
+    async def process_request_stream(self, message):
+        last = None
+        for turn, chunks in enumerate(chunks_by_turn):
+            for chunk in chunks:
+                yield turn, chunk
+            last = "".join(chunks)
+        self.pending_confirmation = pending
+        self.last_response = last
+    return process_request_stream
+
+
+def test_confirmation_tail_filter_splits():
+    """The marker is removed even when it arrives split across chunks."""
+    tail_filter = ConfirmationTailFilter()
+    visible = "".join(tail_filter.feed(chunk) for chunk in CONFIRMATION_REPLY) + tail_filter.flush()
+    assert visible == "I'll create a task: **Review code**\nReply 'yes' to confirm.\n\n"
+
+    tail_filter = ConfirmationTailFilter()
+    assert tail_filter.feed("Almost pending") == "Almost "
+    assert tail_filter.feed(" but not") == "pending but not"
+    assert tail_filter.flush() == ""
+
+    tail_filter = ConfirmationTailFilter()
+    assert tail_filter.feed("ends with pend") == "ends with "
+    assert tail_filter.flush() == "pend"
+
+
+@pytest.mark.asyncio
+async def test_stream_events_and_single_persist(async_session, test_user):
+    pending = {"action": "create_task", "details": {"title": "Review code"}}
+    service = AgentService(async_session, test_user.id)
+
+    with patch("app.agents.core.USE_SK_ORCHESTRATOR", True), \
+         patch("app.agents.sk_orchestrator.SKOrchestrator.process_request_stream",
+               new=fake_stream([["Thinking..."], CONFIRMATION_REPLY], pending)):
+        events = [e async for e in service.process_request_stream(
+            [{"role": "user", "content": "Create task review code"}]
+        )]
+
+    assert events[0]["type"] == "session"
+    assert [e["type"] for e in events[1:3]] == ["delta", "reset"]
+
+    streamed = "".join(e["content"] for e in events[3:] if e["type"] == "delta")
+    assert "pending_confirmation" not in streamed
+    assert streamed.startswith("I'll create a task")
+
+    done = events[-1]
+    assert done["type"] == "done"
+    assert done["content"] == "I'll create a task: **Review code**\nReply 'yes' to confirm."
+    assert done["pending_confirmation"] == pending
+    assert done["confirmation_options"] == ["Yes", "No", "Edit"]
+
+    result = await async_session.execute(
+        select(ChatMessage).where(ChatMessage.session_id == done["session_id"])
+    )
+    messages = result.scalars().all()
+    assert [(m.role, m.content) for m in messages] == [
+        ("user", "Create task review code"),
+        ("assistant", done["content"]),
+    ]
+
+
+def stalled_stream(started: asyncio.Event):
+    """Streams one chunk, then waits on the model forever."""
+    async def process_request_stream(self, message):
+        yield 0, "Working on it"
+        started.set()
+        await asyncio.Event().wait()
+    return process_request_stream
+
+
+async def saved_messages(session, session_id):
+    result = await session.execute(select(ChatMessage).where(ChatMessage.session_id == session_id))
+    return [(m.role, m.content) for m in result.scalars().all()]
+
+
+@pytest.mark.asyncio
+async def test_stream_closed_early_saves_user_message(async_session, test_user):
+    """A client disconnect closes the generator mid-turn; what the turn queued is still saved."""
+    service = AgentService(async_session, test_user.id)
+
+    with patch("app.agents.core.USE_SK_ORCHESTRATOR", True), \
+         patch("app.agents.sk_orchestrator.SKOrchestrator.process_request_stream",
+               new=fake_stream([["Hello", " there"]])):
+        stream = service.process_request_stream([{"role": "user", "content": "Plan my day"}])
+        session_event = await stream.__anext__()
+        assert (await stream.__anext__())["type"] == "delta"
+        await stream.aclose()
+
+    assert await saved_messages(async_session, session_event["session_id"]) == [("user", "Plan my day")]
+
+
+@pytest.mark.asyncio
+async def test_stream_cancelled_midway_saves_user_message(async_session, test_user):
+    """Cancelling the consuming task while the model is mid-reply still flushes the outbox."""
+    service = AgentService(async_session, test_user.id)
+    started = asyncio.Event()
+    events = []
+
+    async def consume():
+        async for event in service.process_request_stream([{"role": "user", "content": "Plan my week"}]):
+            events.append(event)
+
+    with patch("app.agents.core.USE_SK_ORCHESTRATOR", True), \
+         patch("app.agents.sk_orchestrator.SKOrchestrator.process_request_stream",
+               new=stalled_stream(started)):
+        task = asyncio.create_task(consume())
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    assert [e["type"] for e in events] == ["session", "delta"]
+    assert await saved_messages(async_session, events[0]["session_id"]) == [("user", "Plan my week")]
+
+
+@pytest.mark.asyncio
+async def test_stream_endpoint(authed_client: AsyncClient):
+    with patch("app.agents.core.USE_SK_ORCHESTRATOR", True), \
+         patch("app.agents.sk_orchestrator.SKOrchestrator.process_request_stream",
+               new=fake_stream([["Hello", " there"]])):
+        response = await authed_client.post(
+            "/llm/chat/stream",
+            json={"messages": [{"role": "user", "content": "hi"}]},
+        )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line.startswith("data: ")]
+    assert [e["type"] for e in events] == ["session", "delta", "delta", "done"]
+    assert events[-1]["content"] == "Hello there"
+
+
+@pytest.mark.asyncio
+async def test_stream_endpoint_reports_errors(authed_client: AsyncClient):
+    with patch("app.agents.core.AgentService.process_request_stream", side_effect=RuntimeError("model down")):
+        response = await authed_client.post(
+            "/llm/chat/stream",
+            json={"messages": [{"role": "user", "content": "hi"}]},
+        )
+
+    events = [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line.startswith("data: ")]
+    assert events == [{"type": "error", "detail": "model down"}]
@@ -0,0 +1,140 @@
+"""
+Tests for the keyed conversation_state store.
+"""
+import pytest
+import uuid
+from sqlalchemy import event, func, select
+from sqlmodel import SQLModel
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+
+from app import crud
+from app.agents.conversation_state import ConversationStateStore
+from app.models import ChatMessage, ConversationState, User
+
+
+@pytest.fixture
+async def engine():
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        echo=False,
+        connect_args={"check_same_thread": False}
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+async def async_session(engine):
+    async_session_maker = async_sessionmaker(
+        engine, class_=AsyncSession, expire_on_commit=False
+    )
+    async with async_session_maker() as session:
+        yield session
+
+
+@pytest.fixture
+async def chat_session(async_session):
+    user = User(id=str(uuid.uuid4()), email="test@example.com", name="Test User")
+    async_session.add(user)
+    await async_session.commit()
+    return await crud.create_chat_session(async_session, user.id, title="test")
+
+
+@pytest.fixture
+def statements(engine):
+    """Record SQL statements issued on the engine."""
+    seen = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        seen.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    yield seen
+    event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+
+@pytest.mark.asyncio
+async def test_save_upserts_one_row(async_session, chat_session):
+    store = ConversationStateStore(max_entries=0)
+    pending = {"action": "create_task", "details": {"title": "A"}}
+
+    await store.save(async_session, chat_session.id, {"pending_confirmation": pending})
+    await store.save(async_session, chat_session.id, {"pending_confirmation": None})
+
+    count = (await async_session.execute(select(func.count()).select_from(ConversationState))).scalar_one()
+    assert count == 1
+    assert await store.load(async_session, chat_session.id) == {"pending_confirmation": None}
+
+    # State no longer leaks into the transcript
+    assert await crud.get_chat_history(async_session, chat_session.id) == []
+
+
+@pytest.mark.asyncio
+async def test_cache_serves_loads_without_queries(async_session, chat_session, statements):
+    store = ConversationStateStore(max_entries=8)
+    pending = {"action": "update_task", "details": {"id": "t1", "title": "B"}}
+    await store.save(async_session, chat_session.id, {"pending_confirmation": pending})
+
+    statements.clear()
+    state = await store.load(async_session, chat_session.id)
+    assert state == {"pending_confirmation": pending}
+    assert statements == []
+
+    # Callers get copies; mutating one doesn't corrupt the cache
+    state["pending_confirmation"]["details"].pop("id")
+    assert (await store.load(async_session, chat_session.id))["pending_confirmation"]["details"]["id"] == "t1"
+
+
+@pytest.mark.asyncio
+async def test_default_store_sees_other_workers_writes(async_session, chat_session):
+    """With the default settings every load reads the table, so a worker never replays a stale confirmation."""
+    worker_a, worker_b = ConversationStateStore(), ConversationStateStore()
+    pending = {"action": "create_task", "details": {"title": "A"}}
+
+    await worker_a.save(async_session, chat_session.id, {"pending_confirmation": pending})
+    assert await worker_b.load(async_session, chat_session.id) == {"pending_confirmation": pending}
+
+    # Worker B confirms and clears it; worker A must not still see it pending
+    await worker_b.save(async_session, chat_session.id, {"pending_confirmation": None})
+    assert await worker_a.load(async_session, chat_session.id) == {"pending_confirmation": None}
+
+
+@pytest.mark.asyncio
+async def test_load_cost_independent_of_history_length(async_session, chat_session, statements):
+    store = ConversationStateStore(max_entries=0)
+    for i in range(50):
+        await crud.add_chat_message(async_session, chat_session.id, "user", f"message {i}")
+    await store.save(async_session, chat_session.id, {"pending_confirmation": None})
+
+    statements.clear()
+    await store.load(async_session, chat_session.id)
+    assert len(statements) == 1
+    assert "chatmessage" not in statements[0].lower()
+
+
+@pytest.mark.asyncio
+async def test_legacy_sk_state_is_migrated(async_session, chat_session):
+    store = ConversationStateStore(max_entries=0)
+    await crud.add_chat_message(async_session, chat_session.id, "system", 'SK_STATE: {"pending_confirmation": {"action": "old"}}')
+    await crud.add_chat_message(async_session, chat_session.id, "user", "hello")
+    await crud.add_chat_message(async_session, chat_session.id, "system", 'SK_STATE: {"pending_confirmation": {"action": "create_task"}}')
+
+    assert await store.load(async_session, chat_session.id) == {"pending_confirmation": {"action": "create_task"}}
+    assert await crud.get_conversation_state(async_session, chat_session.id) == {"pending_confirmation": {"action": "create_task"}}
+
+
+@pytest.mark.asyncio
+async def test_clear_chat_history_resets_state(async_session, chat_session):
+    from app.agents.conversation_state import conversation_state
+
+    await conversation_state.save(async_session, chat_session.id, {"pending_confirmation": {"action": "create_task"}})
+    await crud.add_chat_message(async_session, chat_session.id, "user", "hello")
+
+    await crud.clear_chat_history(async_session, chat_session.id)
+
+    assert await crud.get_conversation_state(async_session, chat_session.id) is None
+    assert await conversation_state.load(async_session, chat_session.id) == {}
+    count = (await async_session.execute(select(func.count()).select_from(ChatMessage))).scalar_one()
+    assert count == 0
@@ -0,0 +1,81 @@
+"""
+Tests for engine pool options and the /health/pool gauges.
+"""
+import pytest
+from unittest.mock import patch
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.config import get_settings
+from app.database import engine_options, pool_stats
+
+PG_URL = "postgresql+asyncpg://user:password@db:5432/liminal"
+
+
+def test_sqlite_keeps_default_pool():
+    assert engine_options("sqlite+aiosqlite:///:memory:", get_settings()) == {}
+
+
+@pytest.mark.asyncio
+async def test_pool_settings_reach_the_engine():
+    settings = get_settings()
+    with patch.object(settings, "db_pool_size", 3), \
+         patch.object(settings, "db_max_overflow", 2), \
+         patch.object(settings, "db_statement_timeout_ms", 15000):
+        options = engine_options(PG_URL, settings)
+        engine = create_async_engine(PG_URL, **options)
+        try:
+            stats = pool_stats(engine)
+        finally:
+            await engine.dispose()
+
+    assert options["pool_pre_ping"] is True
+    assert options["connect_args"] == {
+        "statement_cache_size": settings.db_statement_cache_size,
+        "server_settings": {"statement_timeout": "15000"},
+    }
+    assert stats["size"] == 3
+    assert stats["capacity"] == 5
+    assert stats["checked_out"] == 0 and stats["utilization"] == 0.0
+
+
+@pytest.mark.asyncio
+async def test_pool_stats_read_the_reported_pool():
+    """Capacity comes from the engine's pool, not from the global settings."""
+    engine = create_async_engine(PG_URL, pool_size=7, max_overflow=4)
+    unlimited = create_async_engine(PG_URL, pool_size=2, max_overflow=-1)
+    try:
+        assert pool_stats(engine)["capacity"] == 11
+        stats = pool_stats(unlimited)
+        assert stats["capacity"] is None and stats["utilization"] is None
+    finally:
+        await engine.dispose()
+        await unlimited.dispose()
+
+
+def test_pgbouncer_mode_disables_prepared_statement_caches():
+    settings = get_settings()
+    with patch.object(settings, "db_pgbouncer", True), \
+         patch.object(settings, "db_statement_timeout_ms", 15000):
+        connect_args = engine_options(PG_URL, settings)["connect_args"]
+
+    assert connect_args["statement_cache_size"] == 0
+    assert connect_args["prepared_statement_cache_size"] == 0
+    # Unique statement names; the timeout is set per transaction instead of at connect
+    name = connect_args["prepared_statement_name_func"]
+    assert name() != name()
+    assert "server_settings" not in connect_args
+
+
+@pytest.mark.asyncio
+async def test_pool_gauges_require_authentication(client):
+    assert "pool" not in (await client.get("/health")).json()
+    assert (await client.get("/health/pool")).status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_health_pool_reports_gauges(authed_client):
+    response = await authed_client.get("/health/pool")
+
+    assert response.status_code == 200
+    pool = response.json()
+    assert pool["class"]
@@ -1,4 +1,6 @@
 import pytest
+from unittest.mock import AsyncMock, patch
+from sqlalchemy.exc import DBAPIError
 from sqlmodel import create_engine, Session, SQLModel
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from app import crud
@@ -152,3 +154,48 @@ async def test_fuzzy_search_case_insensitive(async_session, test_user):
 
     assert len(results) == 1
     assert results[0][0].id == task.id
+
+@pytest.mark.asyncio
+async def test_search_backend_selection(async_session):
+    """SQLite uses the in-memory index unless Postgres search is forced."""
+    with patch("app.crud.get_settings") as mock_settings:
+        mock_settings.return_value.search_backend = "auto"
+        assert crud._use_postgres_search(async_session) is False
+
+        mock_settings.return_value.search_backend = "postgres"
+        assert crud._use_postgres_search(async_session) is True
+
+        mock_settings.return_value.search_backend = "memory"
+        assert crud._use_postgres_search(async_session) is False
+
+@pytest.mark.asyncio
+async def test_postgres_search_failure_falls_back(async_session, test_user):
+    """If the pg_trgm query fails, search still answers from the in-memory index."""
+    await crud.create_task(async_session, TaskCreate(title="Review code", status=TaskStatus.todo), test_user.id)
+
+    failing = AsyncMock(side_effect=DBAPIError("SELECT", {}, Exception("function word_similarity does not exist")))
+    with patch("app.crud._use_postgres_search", return_value=True), \
+         patch("app.crud._search_tasks_postgres", new=failing), \
+         patch("app.crud._pg_search_available", True):
+        results = await crud.search_tasks(async_session, test_user.id, "Review code")
+        assert crud._pg_search_available is False
+
+    assert failing.await_count == 1
+    assert [task.title for task, _ in results] == ["Review code"]
+
+
+@pytest.mark.asyncio
+async def test_transient_postgres_search_failure_keeps_pg_search(async_session, test_user):
+    """A timeout or dropped connection only falls back for that one query."""
+    await crud.create_task(async_session, TaskCreate(title="Review code", status=TaskStatus.todo), test_user.id)
+
+    timeout = Exception("canceling statement due to statement timeout")
+    timeout.sqlstate = "57014"
+    failing = AsyncMock(side_effect=DBAPIError("SELECT", {}, timeout))
+    with patch("app.crud._use_postgres_search", return_value=True), \
+         patch("app.crud._search_tasks_postgres", new=failing), \
+         patch("app.crud._pg_search_available", True):
+        results = await crud.search_tasks(async_session, test_user.id, "Review code")
+        assert crud._pg_search_available is True
+
+    assert [task.title for task, _ in results] == ["Review code"]
@@ -61,3 +61,38 @@ def test_urgency_score_calculation():
     assert calculate_urgency_score(now + timedelta(days=7)) == 0
     assert calculate_urgency_score(now + timedelta(days=10)) == 0
     assert calculate_urgency_score(None) == 0
+
+def test_batch_scores_match_scalar():
+    """Vectorized scoring must exactly match the scalar functions."""
+    import random
+    from app.agents.prioritization import (
+        calculate_hybrid_score,
+        calculate_hybrid_scores,
+        calculate_urgency_score,
+        calculate_urgency_scores,
+    )
+
+    now = datetime.utcnow()
+    rng = random.Random(42)
+    due_dates = [
+        None,
+        now,
+        now - timedelta(microseconds=1),
+        now + timedelta(microseconds=1),
+        now + timedelta(days=7),
+        now + timedelta(days=7, microseconds=-1),
+        now + timedelta(days=3.5),
+    ]
+    due_dates += [
+        now + timedelta(seconds=rng.uniform(-3 * 86400, 10 * 86400)) if rng.random() > 0.2 else None
+        for _ in range(2000)
+    ]
+    ai_scores = [rng.randint(0, 100) for _ in due_dates]
+    priority_scores = [rng.randint(1, 100) for _ in due_dates]
+
+    urgency = calculate_urgency_scores(due_dates, now)
+    assert urgency.tolist() == [calculate_urgency_score(d, now) for d in due_dates]
+
+    hybrid = calculate_hybrid_scores(ai_scores, due_dates, priority_scores, now)
+    expected = [calculate_hybrid_score(a, d, p, now) for a, d, p in zip(ai_scores, due_dates, priority_scores)]
+    assert hybrid.tolist() == expected
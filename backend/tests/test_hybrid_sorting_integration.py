@@ -46,8 +46,8 @@ async def test_done_tasks_at_bottom(authed_client: AsyncClient):
         "priority": "low"
     })
     
-    # 3. Fetch tasks
-    response = await authed_client.get("/tasks")
+    # 3. Fetch tasks (completed history is only included in the "all" view)
+    response = await authed_client.get("/tasks", params={"view": "all"})
     assert response.status_code == 200
     tasks = response.json()
     
@@ -0,0 +1,118 @@
+"""
+Tests for the single-flight, refresh-ahead JWKS manager.
+"""
+import asyncio
+import httpx
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.config import get_settings
+from app.jwks import JWKSManager
+from app.token_cache import public_keys
+
+KEYS = {"keys": [{"kid": "k1", "kty": "RSA"}]}
+ROTATED = {"keys": [{"kid": "k1", "kty": "RSA"}, {"kid": "k2", "kty": "RSA"}]}
+
+
+@pytest.fixture(autouse=True)
+def oidc_configured():
+    with patch.object(get_settings(), "oidc_jwks_url", "https://idp.example/certs"):
+        yield
+
+
+def slow_fetch(*results):
+    """A _fetch stand-in that yields to the loop before answering, like a real request."""
+    results = list(results)
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        result = results.pop(0) if len(results) > 1 else results[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    return AsyncMock(side_effect=fetch)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_fetch():
+    manager = JWKSManager()
+    with patch.object(manager, "_fetch", slow_fetch(KEYS)) as fetch:
+        keys = await asyncio.gather(*(manager.get_key("k1") for _ in range(20)))
+
+    assert fetch.await_count == 1
+    assert all(k["kid"] == "k1" for k in keys)
+
+
+@pytest.mark.asyncio
+async def test_refreshes_in_background_before_expiry():
+    manager = JWKSManager(ttl=100, refresh_ahead=10)
+    with patch.object(manager, "_fetch", slow_fetch(KEYS, ROTATED)) as fetch:
+        await manager.get_jwks()
+        manager._fetched_at -= 95
+
+        # Inside the refresh-ahead window: current keys come back without waiting
+        assert await manager.get_jwks() == KEYS
+        assert await manager.get_jwks() == KEYS
+        await asyncio.sleep(0.05)
+
+        assert fetch.await_count == 2
+        assert await manager.get_jwks() == ROTATED
+
+
+@pytest.mark.asyncio
+async def test_serves_stale_keys_while_idp_is_down():
+    manager = JWKSManager(ttl=100, max_stale=1000)
+    down = httpx.ConnectError("connection refused")
+    with patch.object(manager, "_fetch", slow_fetch(KEYS, down)) as fetch:
+        await manager.get_jwks()
+        manager._fetched_at -= 200
+
+        assert await manager.get_jwks() == KEYS
+        # The failure is remembered: the next request doesn't wait on the IdP again
+        assert await manager.get_jwks() == KEYS
+        assert fetch.await_count == 2
+
+        # Past max_stale the error surfaces
+        manager._fetched_at -= 1000
+        manager._failed_at = 0.0
+        with pytest.raises(httpx.ConnectError):
+            await manager.get_jwks()
+
+
+@pytest.mark.asyncio
+async def test_unknown_kid_refreshes_are_rate_limited():
+    manager = JWKSManager(unknown_kid_cooldown=60)
+    with patch.object(manager, "_fetch", slow_fetch(KEYS)) as fetch:
+        assert await manager.get_key("k1") is not None
+        for i in range(5):
+            assert await manager.get_key(f"forged-{i}") is None
+
+    # One initial fetch and one refresh for the first unknown kid
+    assert fetch.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_rotation_picks_up_new_kid_and_drops_constructed_keys():
+    manager = JWKSManager()
+    public_keys.clear()
+    with patch.object(manager, "_fetch", slow_fetch(KEYS, ROTATED)):
+        await manager.get_key("k1")
+        public_keys.get("k1", "RS256", lambda: "constructed")
+
+        assert (await manager.get_key("k2"))["kid"] == "k2"
+
+    assert public_keys.get("k1", "RS256", lambda: "rebuilt") == "rebuilt"
+    public_keys.clear()
+
+
+@pytest.mark.asyncio
+async def test_background_task_starts_and_stops():
+    manager = JWKSManager()
+    with patch.object(manager, "_fetch", slow_fetch(KEYS)) as fetch:
+        manager.start()
+        await asyncio.sleep(0.05)
+        await manager.stop()
+
+    assert fetch.await_count == 1
+    assert manager._task is None
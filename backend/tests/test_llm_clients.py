@@ -0,0 +1,46 @@
+"""
+Tests for the shared LLM client registry.
+"""
+import pytest
+from unittest.mock import patch
+
+from app.config import Settings
+from app.llm_clients import LLMClientRegistry, openai_compatible_base_url
+
+
+def test_base_url_normalization():
+    assert openai_compatible_base_url("local", "http://localhost:11434/v1/chat/completions") == "http://localhost:11434/v1"
+    assert openai_compatible_base_url("groq", "https://api.groq.com/") == "https://api.groq.com/openai/v1"
+    assert openai_compatible_base_url("groq", "https://api.groq.com/openai/v1") == "https://api.groq.com/openai/v1"
+
+
+@pytest.mark.asyncio
+async def test_services_share_one_client():
+    """Every kernel wraps the same chat service and HTTP pool."""
+    registry = LLMClientRegistry(Settings(llm_provider="local", llm_model="test-model"))
+
+    first = registry.create_kernel()
+    second = registry.create_kernel()
+    assert first is not second
+    assert first.get_service("chat") is second.get_service("chat")
+    assert registry.chat_service().client._client is registry.http_client
+
+    client = registry.http_client
+    assert registry.http_client is client
+
+    await registry.aclose()
+    assert client.is_closed
+
+
+def test_configuration_errors():
+    with pytest.raises(ValueError, match="LLM_MODEL"):
+        LLMClientRegistry(Settings(llm_model="")).chat_service()
+    with pytest.raises(ValueError, match="Unsupported LLM provider"):
+        LLMClientRegistry(Settings(llm_provider="mystery", llm_model="m")).chat_service()
+
+
+def test_start_tolerates_misconfiguration():
+    registry = LLMClientRegistry(Settings(llm_model=""))
+    with patch("builtins.print") as mock_print:
+        registry.start()
+    assert "unavailable" in mock_print.call_args.args[0]
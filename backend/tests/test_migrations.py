@@ -0,0 +1,52 @@
+"""
+Tests for the Alembic migration chain and the startup schema check.
+"""
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import pool
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+
+from app.migrate import SchemaOutOfDate, check_schema, head_revision, migrate
+
+
+@pytest.fixture
+async def database(tmp_path):
+    url = f"sqlite+aiosqlite:///{tmp_path / 'liminal.db'}"
+    engine = create_async_engine(url, poolclass=pool.NullPool)
+    yield url, engine
+    await engine.dispose()
+
+
+def schema_diff(conn):
+    return compare_metadata(MigrationContext.configure(conn), SQLModel.metadata)
+
+
+@pytest.mark.asyncio
+async def test_migrations_build_the_model_schema(database):
+    url, engine = database
+    with pytest.raises(SchemaOutOfDate):
+        await check_schema(engine)
+
+    await migrate(url)
+
+    await check_schema(engine)
+    async with engine.connect() as conn:
+        assert await conn.run_sync(schema_diff) == []
+
+
+@pytest.mark.asyncio
+async def test_unversioned_schema_is_adopted(database):
+    url, engine = database
+    # A database created by the old create_all-on-boot init_db
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+    await migrate(url)
+    # Running it again is a no-op
+    await migrate(url)
+
+    async with engine.connect() as conn:
+        revision = await conn.run_sync(lambda c: MigrationContext.configure(c).get_current_revision())
+    assert revision == head_revision()
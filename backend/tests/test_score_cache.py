@@ -0,0 +1,127 @@
+"""
+Tests for the content-addressed AI score cache.
+"""
+import json
+import re
+import pytest
+from unittest.mock import MagicMock, patch
+
+from app import crud
+from app.agents.prioritization import SCORE_ANCHOR_TASKS, AIPrioritizationService
+from app.agents.score_cache import ScoreCache
+from app.models import Task, User
+
+
+def test_get_put_and_ttl():
+    cache = ScoreCache(max_entries=10, ttl_seconds=60)
+    key = ScoreCache.make_key("u1", "ctx", ["block a", "block b"])
+
+    assert cache.get(key) is None
+    cache.put(key, "u1", ["a", "b"], {"scores": []})
+    assert cache.get(key) == {"scores": []}
+
+    # Any change to the content changes the key
+    assert ScoreCache.make_key("u1", "ctx", ["block a", "block b!"]) != key
+    assert ScoreCache.make_key("u2", "ctx", ["block a", "block b"]) != key
+
+    cache._entries[key].expires_at = 0
+    assert cache.get(key) is None
+
+
+def test_invalidate_task_is_selective():
+    cache = ScoreCache(max_entries=10, ttl_seconds=60)
+    cache.put("k1", "u1", ["a", "b"], {"scores": [1]})
+    cache.put("k2", "u1", ["c"], {"scores": [2]})
+    cache.put("k3", "u2", ["a"], {"scores": [3]})
+
+    assert cache.invalidate_task("u1", "a") == 1
+    assert cache.get("k1") is None
+    assert cache.get("k2") is not None
+    assert cache.get("k3") is not None
+
+
+def test_lru_eviction_and_disabled_ttl():
+    cache = ScoreCache(max_entries=2, ttl_seconds=60)
+    cache.put("k1", "u1", ["a"], {})
+    cache.put("k2", "u1", ["b"], {})
+    cache.get("k1")
+    cache.put("k3", "u1", ["c"], {})
+    assert cache.get("k2") is None
+    assert cache.get("k1") is not None
+    assert ("u1", "b") not in cache._by_task
+
+    disabled = ScoreCache(ttl_seconds=0)
+    disabled.put("k1", "u1", ["a"], {})
+    assert disabled.get("k1") is None
+
+
+@pytest.mark.asyncio
+async def test_unchanged_tasks_skip_the_llm(db_session):
+    """A repeat scoring run is served from cache; edited or new tasks are the only ones re-scored."""
+    user = User(id="cache-user", email="cache@example.com")
+    db_session.add(user)
+    db_session.add_all([Task(id=f"t{i:02d}", title=f"Task {i}", user_id=user.id) for i in range(20)])
+    await db_session.commit()
+
+    calls = []
+
+    async def fake_invoke(kernel, prompt, **kwargs):
+        ids = re.findall(r"- ID: (t\d+)", prompt)
+        calls.append(ids)
+        # Scored alone, an edited task's batch comes back on a more generous scale
+        generous = "Renamed" in prompt
+        result = MagicMock()
+        result.__str__.return_value = json.dumps({
+            "scores": [{"task_id": task_id, "score": 90 if generous else 60} for task_id in ids],
+            "strategy_summary": "Only the renamed task" if generous else "Cached",
+        })
+        return result
+
+    with patch("app.agents.prioritization.get_settings") as mock_settings, \
+         patch("semantic_kernel.Kernel.invoke_prompt", new=fake_invoke):
+        mock_settings.return_value.llm_provider = "local"
+        mock_settings.return_value.llm_model = "mock-model"
+        mock_settings.return_value.llm_base_url = "http://localhost:1234/v1"
+        mock_settings.return_value.ai_scoring_chunk_tokens = 1000
+        mock_settings.return_value.ai_scoring_max_concurrency = 2
+        mock_settings.return_value.ai_scoring_chunk_timeout_seconds = 5
+
+        service = AIPrioritizationService(db_session, user.id)
+        first = await service.update_task_scores()
+        chunk_count = len(calls)
+        assert chunk_count > 1
+        assert first["cached_tasks"] == 0
+        assert first["updated_count"] == 20
+
+        # Same scores as stored: no LLM call and no UPDATE
+        second = await service.update_task_scores()
+        assert len(calls) == chunk_count
+        assert second["cached_tasks"] == 20
+        assert second["strategy_summary"] == "Cached"
+        assert len(second["scores"]) == 20
+        assert second["updated_count"] == 0
+
+        # Editing a non-prompt field keeps the cache; a title change re-scores just that task
+        task = await crud.get_task_by_id(db_session, "t19", user.id)
+        await crud.update_task(db_session, task, {"notes": "irrelevant"})
+        await service.update_task_scores()
+        assert len(calls) == chunk_count
+
+        # A title change re-scores that task, with a few cached tasks as anchors
+        await crud.update_task(db_session, task, {"title": "Renamed"})
+        third = await service.update_task_scores()
+        assert calls[-1][0] == "t19"
+        assert len(calls[-1]) == 1 + SCORE_ANCHOR_TASKS
+        assert third["cached_tasks"] == 19
+        # The anchors came back 30 points higher than cached, so t19's 90 is calibrated to 60
+        assert {s["task_id"]: s["score"] for s in third["scores"]}["t19"] == 60
+        # ...and a summary of one re-scored task doesn't replace the list-wide one
+        assert third["strategy_summary"] == "Cached"
+
+        # A new task shifts the chunk boundaries but only the new task is scored
+        db_session.add(Task(id="t20", title="New task", user_id=user.id))
+        await db_session.commit()
+        fourth = await service.update_task_scores()
+        assert calls[-1][0] == "t20"
+        assert fourth["cached_tasks"] == 20
+        assert fourth["updated_count"] == 1
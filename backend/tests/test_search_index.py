@@ -0,0 +1,110 @@
+"""
+Tests for the per-user in-memory task search index.
+"""
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+from sqlmodel import SQLModel
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+
+from app import crud
+from app.models import TaskCreate, TaskStatus, User
+from app.search_index import TaskSearchIndex, UserSearchIndex, search_index
+import uuid
+
+
+@pytest.fixture
+async def async_session():
+    """Create an in-memory async SQLite database for testing."""
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        echo=False,
+        connect_args={"check_same_thread": False}
+    )
+
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+    async_session_maker = async_sessionmaker(
+        engine, class_=AsyncSession, expire_on_commit=False
+    )
+
+    async with async_session_maker() as session:
+        yield session
+
+    await engine.dispose()
+
+
+@pytest.fixture
+async def test_user(async_session):
+    """Create a test user."""
+    user = User(id=str(uuid.uuid4()), email="test@example.com", name="Test User")
+    async_session.add(user)
+    await async_session.commit()
+    await async_session.refresh(user)
+    return user
+
+
+def test_substring_matches_use_trigram_postings():
+    index = UserSearchIndex()
+    index.add("1", "Review cloud code", None, datetime(2026, 1, 1))
+    index.add("2", "Buy groceries", "milk and CODE books", datetime(2026, 1, 2))
+    index.add("3", "Walk dog", None, datetime(2026, 1, 3))
+
+    assert [e.id for e in index.substring_matches("code")] == ["2", "1"]
+    assert [e.id for e in index.substring_matches("xyz")] == []
+    # Queries shorter than a trigram fall back to scanning every entry
+    assert [e.id for e in index.substring_matches("od")] == ["2", "1"]
+
+    index.remove("2")
+    assert [e.id for e in index.substring_matches("code")] == ["1"]
+    assert "boo" not in index.postings
+
+
+@pytest.mark.asyncio
+async def test_lru_evicts_least_recently_used_user(async_session):
+    index = TaskSearchIndex(max_users=2)
+    await index.get(async_session, "a")
+    await index.get(async_session, "b")
+    await index.get(async_session, "a")
+    await index.get(async_session, "c")
+
+    assert list(index._users) == ["a", "c"]
+
+
+@pytest.mark.asyncio
+async def test_warm_search_only_loads_matches(async_session, test_user):
+    """Once the index is built, a miss does not touch the database at all."""
+    await crud.create_task(async_session, TaskCreate(title="Review code"), test_user.id)
+    await crud.search_tasks(async_session, test_user.id, "Review")
+
+    with patch.object(async_session, "execute", wraps=async_session.execute) as execute:
+        assert await crud.search_tasks(async_session, test_user.id, "Unrelated thing") == []
+        assert execute.await_count == 0
+
+        results = await crud.search_tasks(async_session, test_user.id, "review")
+        assert [t.title for t, _ in results] == ["Review code"]
+        assert execute.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_index_follows_task_writes(async_session, test_user):
+    """Create, update, delete and restore keep a warm index in sync."""
+    await crud.search_tasks(async_session, test_user.id, "warm up")
+
+    task = await crud.create_task(async_session, TaskCreate(title="Plan sprint"), test_user.id)
+    assert [t.id for t, _ in await crud.search_tasks(async_session, test_user.id, "sprint")] == [task.id]
+
+    task = await crud.update_task(async_session, task, {"title": "Plan roadmap"})
+    assert await crud.search_tasks(async_session, test_user.id, "sprint") == []
+    assert [t.id for t, _ in await crud.search_tasks(async_session, test_user.id, "roadmap")] == [task.id]
+
+    await crud.delete_task(async_session, task)
+    assert await crud.search_tasks(async_session, test_user.id, "roadmap") == []
+
+    await crud.restore_task(async_session, task)
+    assert [t.id for t, _ in await crud.search_tasks(async_session, test_user.id, "roadmap")] == [task.id]
+
+    await crud.update_task(async_session, task, {"status": TaskStatus.done})
+    assert await crud.search_tasks(async_session, test_user.id, "roadmap") == []
+    assert task.id not in search_index._users[test_user.id].entries
@@ -0,0 +1,157 @@
+"""
+Tests for background AI suggestion jobs.
+"""
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+from httpx import AsyncClient
+
+from app.agents.suggestion_jobs import SuggestionJobManager
+from app.models import Task, User
+
+
+class FakeSessionFactory:
+    """Hands the test session to the job in place of a fresh one."""
+
+    def __init__(self, session):
+        self.session = session
+
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        return self.session
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+@pytest.mark.asyncio
+async def test_concurrent_submits_share_one_job(db_session):
+    jobs = SuggestionJobManager(FakeSessionFactory(db_session))
+    release = asyncio.Event()
+
+    async def slow_suggestion(self):
+        await release.wait()
+        return {"suggested_task_id": "t1", "reasoning": "Do it"}
+
+    with patch("app.agents.suggestion_jobs.AIPrioritizationService.__init__", return_value=None), \
+         patch("app.agents.suggestion_jobs.AIPrioritizationService.get_ai_suggestion", new=slow_suggestion), \
+         patch("app.agents.suggestion_jobs.manager.broadcast", new=AsyncMock()) as broadcast:
+        first = jobs.submit("user-1")
+        second = jobs.submit("user-1")
+        other = jobs.submit("user-2")
+        assert first is second
+        assert other is not first
+        assert first.status == "pending"
+
+        release.set()
+        await first.wait()
+        await other.wait()
+
+    assert first.status == "done"
+    assert first.suggestion == {"suggested_task_id": "t1", "reasoning": "Do it"}
+    assert jobs.get(first.id, "user-1") is first
+    assert jobs.get(first.id, "user-2") is None
+
+    messages = {call.args[1]: json.loads(call.args[0]) for call in broadcast.await_args_list}
+    assert messages["user-1"]["type"] == "ai_suggestion"
+    assert messages["user-1"]["job_id"] == first.id
+    assert messages["user-1"]["suggestion"]["suggested_task_id"] == "t1"
+
+    # A finished job no longer blocks a new one
+    assert "user-1" not in jobs._running
+
+
+@pytest.mark.asyncio
+async def test_failed_job_is_reported(db_session):
+    jobs = SuggestionJobManager(FakeSessionFactory(db_session))
+
+    with patch("app.agents.suggestion_jobs.AIPrioritizationService.__init__", side_effect=ValueError("no model")), \
+         patch("app.agents.suggestion_jobs.manager.broadcast", new=AsyncMock()) as broadcast:
+        job = jobs.submit("user-1")
+        await job.wait()
+
+    assert job.status == "failed"
+    assert job.error == "no model"
+    assert job.suggestion is None
+    assert json.loads(broadcast.await_args.args[0])["status"] == "failed"
+
+
+@pytest.mark.asyncio
+async def test_last_known_falls_back_to_stored_scores(db_session):
+    jobs = SuggestionJobManager(FakeSessionFactory(db_session))
+    user = User(id="u1", email="u1@example.com")
+    db_session.add(user)
+    db_session.add_all([
+        Task(id="low", title="Low", ai_relevance_score=20, user_id=user.id),
+        Task(id="high", title="High", ai_relevance_score=80, ai_reasoning="Due today", user_id=user.id),
+    ])
+    await db_session.commit()
+
+    assert await jobs.last_known(db_session, "nobody") is None
+    assert await jobs.last_known(db_session, user.id) == {"suggested_task_id": "high", "reasoning": "Due today"}
+
+
+@pytest.mark.asyncio
+async def test_last_known_drops_completed_and_dismissed_tasks(db_session):
+    """A finished job's suggestion isn't replayed once its task is done or dismissed."""
+    from app.models import AISuggestionStatus, TaskStatus
+
+    jobs = SuggestionJobManager(FakeSessionFactory(db_session))
+    user = User(id="u1", email="u1@example.com")
+    db_session.add(user)
+    tasks = [
+        Task(id="first", title="First", ai_relevance_score=90, user_id=user.id),
+        Task(id="second", title="Second", ai_relevance_score=70, user_id=user.id),
+        Task(id="third", title="Third", ai_relevance_score=50, user_id=user.id),
+    ]
+    db_session.add_all(tasks)
+    await db_session.commit()
+
+    async def suggest_first(self):
+        return {"suggested_task_id": "first", "reasoning": "Top score"}
+
+    with patch("app.agents.suggestion_jobs.AIPrioritizationService.__init__", return_value=None), \
+         patch("app.agents.suggestion_jobs.AIPrioritizationService.get_ai_suggestion", new=suggest_first), \
+         patch("app.agents.suggestion_jobs.manager.broadcast", new=AsyncMock()):
+        await jobs.submit(user.id).wait()
+
+    tasks[0].status = TaskStatus.done
+    await db_session.commit()
+    assert (await jobs.last_known(db_session, user.id))["suggested_task_id"] == "second"
+
+    tasks[1].ai_suggestion_status = AISuggestionStatus.dismissed
+    await db_session.commit()
+    assert (await jobs.last_known(db_session, user.id))["suggested_task_id"] == "third"
+
+
+@pytest.mark.asyncio
+async def test_endpoint_returns_immediately(authed_client: AsyncClient, db_session):
+    """The endpoint doesn't wait for the LLM and exposes the job for polling."""
+    jobs = SuggestionJobManager(FakeSessionFactory(db_session))
+    release = asyncio.Event()
+
+    async def slow_suggestion(self):
+        await release.wait()
+        return None
+
+    with patch("app.routers.tasks.suggestion_jobs", jobs), \
+         patch("app.agents.suggestion_jobs.AIPrioritizationService.__init__", return_value=None), \
+         patch("app.agents.suggestion_jobs.AIPrioritizationService.get_ai_suggestion", new=slow_suggestion):
+        response = await authed_client.get("/tasks/ai-suggestion")
+        assert response.status_code == 202
+        body = response.json()
+        assert body["status"] == "pending"
+        assert body["suggested_task_id"] is None
+
+        response = await authed_client.get(f"/tasks/ai-suggestion/jobs/{body['job_id']}")
+        assert response.status_code == 200
+        assert response.json()["status"] == "pending"
+
+        release.set()
+        await jobs._jobs[body["job_id"]].wait()
+
+        response = await authed_client.get("/tasks/ai-suggestion/jobs/unknown")
+        assert response.status_code == 404
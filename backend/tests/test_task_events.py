@@ -0,0 +1,188 @@
+"""
+Tests for typed task change events and resuming from a version.
+"""
+import asyncio
+import json
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+from app import crud
+from app.models import TaskEvent, User
+from app.routers.ws import send_resume
+from app.task_events import MAX_REPLAY, resume_messages
+from app.websockets import ConnectionManager
+from tests import conftest
+
+
+@pytest.fixture
+def broadcast():
+    with patch("app.websockets.manager.broadcast", new=AsyncMock()) as mock_broadcast:
+        yield mock_broadcast
+
+
+def sent(broadcast):
+    return [json.loads(call.args[0]) for call in broadcast.await_args_list]
+
+
+async def add_user(db_session, user_id):
+    db_session.add(User(id=user_id, email=f"{user_id}@example.com", name=user_id))
+    await db_session.commit()
+
+
+@pytest.mark.asyncio
+async def test_task_mutations_publish_typed_events(authed_client, broadcast):
+    created = (await authed_client.post("/tasks", json={"title": "Write report"})).json()
+    await authed_client.patch(f"/tasks/{created['id']}", json={"title": "Write the report"})
+    await authed_client.delete(f"/tasks/{created['id']}")
+    await authed_client.post(f"/tasks/{created['id']}/restore")
+
+    events = sent(broadcast)
+    assert [e["type"] for e in events] == ["task.created", "task.updated", "task.deleted", "task.restored"]
+    assert [e["version"] for e in events] == [1, 2, 3, 4]
+    assert all(e["task_id"] == created["id"] for e in events)
+
+    assert events[0]["task"]["title"] == "Write report"
+    # Only what changed (the title and its derived fields), not the whole task
+    assert events[1]["changes"]["title"] == "Write the report"
+    assert "priority" not in events[1]["changes"]
+    assert set(events[2]) == {"type", "version", "task_id"}
+    assert events[3]["task"]["is_deleted"] is False
+
+
+@pytest.mark.asyncio
+async def test_versions_are_per_user(db_session):
+    for user_id in ("u1", "u2"):
+        await add_user(db_session, user_id)
+
+    versions = []
+    for user_id in ("u1", "u1", "u2", "u1"):
+        event = await crud.record_task_event(db_session, user_id, "task.deleted", "t1", {})
+        versions.append((user_id, event.version))
+
+    assert versions == [("u1", 1), ("u1", 2), ("u2", 1), ("u1", 3)]
+    assert await crud.get_task_event_version(db_session, "u1") == 3
+    assert await crud.get_task_event_version(db_session, "nobody") == 0
+
+
+@pytest.mark.asyncio
+async def test_resume_replays_missed_events(db_session):
+    await add_user(db_session, "u1")
+    for i in range(5):
+        await crud.record_task_event(db_session, "u1", "task.updated", f"t{i}", {"changes": {"title": str(i)}})
+
+    assert [json.loads(m) for m in await resume_messages(db_session, "u1", None)] == [{"type": "hello", "version": 5}]
+    assert await resume_messages(db_session, "u1", 5) == []
+
+    replayed = [json.loads(m) for m in await resume_messages(db_session, "u1", 2)]
+    assert [(m["version"], m["changes"]["title"]) for m in replayed] == [(3, "2"), (4, "3"), (5, "4")]
+
+    # Ahead of the server (e.g. restored database): start over
+    assert json.loads((await resume_messages(db_session, "u1", 9))[0]) == {"type": "resync", "version": 5}
+
+
+@pytest.mark.asyncio
+async def test_resume_resyncs_when_events_were_pruned(db_session):
+    await add_user(db_session, "u1")
+    for i in range(3):
+        event = await crud.record_task_event(db_session, "u1", "task.deleted", f"t{i}", {})
+        event.created_at = datetime.utcnow() - timedelta(days=2 - i)
+    await db_session.commit()
+
+    assert await crud.purge_task_events(db_session, datetime.utcnow() - timedelta(hours=36)) == 1
+    assert json.loads((await resume_messages(db_session, "u1", 0))[0]) == {"type": "resync", "version": 3}
+    assert len(await resume_messages(db_session, "u1", 1)) == 2
+
+
+@pytest.mark.asyncio
+async def test_resume_resyncs_when_too_far_behind(db_session):
+    await add_user(db_session, "u1")
+    db_session.add_all([
+        TaskEvent(user_id="u1", version=v, type="task.deleted", task_id="t", data={})
+        for v in range(1, MAX_REPLAY + 2)
+    ])
+    await db_session.commit()
+    with patch("app.crud.get_task_event_version", new=AsyncMock(return_value=MAX_REPLAY + 1)):
+        assert json.loads((await resume_messages(db_session, "u1", 0))[0])["type"] == "resync"
+        assert len(await resume_messages(db_session, "u1", 1)) == MAX_REPLAY
+
+
+class GatedSocket:
+    """A socket whose sends wait until the test opens the gate."""
+
+    def __init__(self):
+        self.sent = []
+        self.gate = asyncio.Event()
+        self.close_code = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message):
+        await self.gate.wait()
+        self.sent.append(message)
+
+    async def close(self, code=1000):
+        self.close_code = code
+
+
+async def add_events(db_session, user_id, count):
+    await add_user(db_session, user_id)
+    for i in range(count):
+        await crud.record_task_event(db_session, user_id, "task.deleted", f"t{i}", {})
+
+
+@pytest.mark.asyncio
+async def test_replay_during_live_traffic_keeps_the_socket_open(db_session):
+    """A replay leaves room in the queue for broadcasts and pings that arrive meanwhile."""
+    await add_events(db_session, "u1", 20)
+    manager = ConnectionManager(queue_size=8)
+    socket = GatedSocket()
+    connection = await manager.connect(socket, "u1")
+
+    with patch("app.database.async_session", new=conftest.test_session_maker):
+        # Far behind: more than half the queue would be needed, so resync instead
+        await send_resume(connection, "u1", 10)
+        for i in range(5):
+            manager.enqueue(f"live {i}", "u1")
+        manager.sweep()
+        assert not connection.closed
+
+        socket.gate.set()
+        await asyncio.sleep(0.01)
+        assert json.loads(socket.sent[0]) == {"type": "resync", "version": 20}
+        assert socket.sent[1:] == [f"live {i}" for i in range(5)] + ["ping"]
+
+        # A short gap is replayed, interleaved with live traffic, and nothing overflows
+        socket.gate.clear()
+        socket.sent.clear()
+        await send_resume(connection, "u1", 17)
+        for i in range(4):
+            manager.enqueue(f"live {i}", "u1")
+        assert not connection.closed
+        socket.gate.set()
+        await asyncio.sleep(0.01)
+
+    assert [json.loads(m)["version"] for m in socket.sent[:3]] == [18, 19, 20]
+    assert socket.sent[3:] == [f"live {i}" for i in range(4)]
+    connection.close()
+
+
+@pytest.mark.asyncio
+async def test_send_gives_up_when_the_connection_closes():
+    """A handler waiting for queue room returns once the connection is closed instead of hanging."""
+    manager = ConnectionManager(queue_size=1)
+    socket = GatedSocket()
+    connection = await manager.connect(socket, "u1")
+    connection.offer("first")  # taken by the writer, which then waits on the socket
+    await asyncio.sleep(0)
+    connection.offer("second")  # fills the queue
+
+    waiting = asyncio.create_task(connection.send("third"))
+    await asyncio.sleep(0)
+    assert not waiting.done()
+
+    connection.offer("overflow")  # the "close" policy closes the socket
+    assert connection.closed
+    assert await asyncio.wait_for(waiting, timeout=1) is False
+    assert await connection.send("after close") is False
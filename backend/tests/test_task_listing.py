@@ -0,0 +1,159 @@
+"""
+Tests for GET /tasks filtering, views and cursor pagination.
+"""
+import pytest
+from datetime import datetime, timedelta
+from httpx import AsyncClient
+from sqlmodel import SQLModel
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+
+from app import crud
+from app.agents.prioritization import calculate_hybrid_score, refresh_hybrid_score
+from app.models import Task, TaskStatus, User
+import uuid
+
+
+@pytest.fixture
+async def async_session():
+    """Create an in-memory async SQLite database for testing."""
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        echo=False,
+        connect_args={"check_same_thread": False}
+    )
+
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+    async_session_maker = async_sessionmaker(
+        engine, class_=AsyncSession, expire_on_commit=False
+    )
+
+    async with async_session_maker() as session:
+        yield session
+
+    await engine.dispose()
+
+
+@pytest.fixture
+async def test_user(async_session):
+    """Create a test user."""
+    user = User(id=str(uuid.uuid4()), email="test@example.com", name="Test User")
+    async_session.add(user)
+    await async_session.commit()
+    await async_session.refresh(user)
+    return user
+
+
+@pytest.mark.asyncio
+async def test_ranking_matches_hybrid_score(async_session, test_user):
+    """Stored-score ordering should agree with calculate_hybrid_score."""
+    now = datetime.utcnow()
+    specs = [
+        (0, None, 50),
+        (90, now + timedelta(days=10), 20),
+        (10, now - timedelta(days=1), 30),
+        (40, now + timedelta(days=2), 80),
+        (70, now + timedelta(hours=6), 10),
+        (20, now + timedelta(days=5), 95),
+    ]
+    for i, (ai, due, priority) in enumerate(specs):
+        task = Task(
+            id=f"task-{i}",
+            title=f"Task {i}",
+            ai_relevance_score=ai,
+            due_date=due,
+            priority_score=priority,
+            user_id=test_user.id,
+        )
+        refresh_hybrid_score(task, now)
+        async_session.add(task)
+    await async_session.commit()
+
+    tasks = await crud.get_tasks(async_session, test_user.id)
+    scores = [calculate_hybrid_score(t.ai_relevance_score, t.due_date, t.priority_score, now) for t in tasks]
+    assert scores == sorted(scores, reverse=True)
+
+
+@pytest.mark.asyncio
+async def test_cursor_pagination_walks_all_tasks(async_session, test_user):
+    """Paging with the returned cursor should visit every task exactly once."""
+    for i in range(7):
+        task = Task(
+            id=f"task-{i}",
+            title=f"Task {i}",
+            priority_score=50 + i * 5,
+            user_id=test_user.id,
+        )
+        refresh_hybrid_score(task)
+        async_session.add(task)
+    await async_session.commit()
+
+    seen = []
+    cursor = None
+    while True:
+        page, cursor = await crud.get_task_page(async_session, test_user.id, limit=3, cursor=cursor)
+        seen.extend(t.id for t in page)
+        if not cursor:
+            break
+
+    assert len(seen) == 7
+    assert len(set(seen)) == 7
+    assert seen[0] == "task-6"  # Highest priority first
+
+
+@pytest.mark.asyncio
+async def test_invalid_cursor_raises(async_session, test_user):
+    with pytest.raises(ValueError):
+        await crud.get_task_page(async_session, test_user.id, limit=3, cursor="not-a-cursor")
+
+
+@pytest.mark.asyncio
+async def test_default_view_excludes_done(authed_client: AsyncClient):
+    """GET /tasks defaults to the active board."""
+    await authed_client.post("/tasks", json={"title": "Active Task"})
+    await authed_client.post("/tasks", json={"title": "Done Task", "status": "done"})
+
+    response = await authed_client.get("/tasks")
+    assert response.status_code == 200
+    assert [t["title"] for t in response.json()] == ["Active Task"]
+
+    response = await authed_client.get("/tasks", params={"view": "all"})
+    assert {t["title"] for t in response.json()} == {"Active Task", "Done Task"}
+
+
+@pytest.mark.asyncio
+async def test_status_and_theme_filters(authed_client: AsyncClient):
+    """Status and theme filters are applied server-side."""
+    theme = (await authed_client.post("/themes", json={"title": "Work"})).json()
+    await authed_client.post("/tasks", json={"title": "Themed", "theme_id": theme["id"]})
+    await authed_client.post("/tasks", json={"title": "In Progress", "status": "in_progress"})
+    await authed_client.post("/tasks", json={"title": "Done Task", "status": "done"})
+
+    response = await authed_client.get("/tasks", params={"theme_id": theme["id"]})
+    assert [t["title"] for t in response.json()] == ["Themed"]
+
+    response = await authed_client.get("/tasks", params={"status": "in_progress"})
+    assert [t["title"] for t in response.json()] == ["In Progress"]
+
+    response = await authed_client.get("/tasks", params={"status": "done"})
+    assert [t["title"] for t in response.json()] == ["Done Task"]
+
+
+@pytest.mark.asyncio
+async def test_pagination_header(authed_client: AsyncClient):
+    """The next-page cursor is returned in the X-Next-Cursor header."""
+    for i in range(3):
+        await authed_client.post("/tasks", json={"title": f"Task {i}"})
+
+    response = await authed_client.get("/tasks", params={"limit": 2})
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+    cursor = response.headers["X-Next-Cursor"]
+
+    response = await authed_client.get("/tasks", params={"limit": 2, "cursor": cursor})
+    assert len(response.json()) == 1
+    assert "X-Next-Cursor" not in response.headers
+
+    response = await authed_client.get("/tasks", params={"cursor": "garbage"})
+    assert response.status_code == 400
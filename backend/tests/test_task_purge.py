@@ -0,0 +1,120 @@
+"""
+Tests for set-based chat history clearing and the TaskPurger job.
+"""
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import event, func, insert, select
+from sqlmodel import SQLModel
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+
+from app import crud
+from app.agents.monitor import TaskPurger
+from app.models import ChatMessage, Task, User
+import uuid
+
+
+@pytest.fixture
+async def engine():
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        echo=False,
+        connect_args={"check_same_thread": False}
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def session_maker(engine):
+    return async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+@pytest.fixture
+async def test_user(session_maker):
+    async with session_maker() as session:
+        user = User(id=str(uuid.uuid4()), email="test@example.com", name="Test User")
+        session.add(user)
+        await session.commit()
+        return user
+
+
+async def seed_tasks(session_maker, user_id, count, deleted, age, **extra):
+    updated_at = datetime.utcnow() - age
+    rows = [
+        {"id": f"{'d' if deleted else 'l'}{age.days}-{i}", "title": f"Task {i}", "user_id": user_id,
+         "is_deleted": deleted, "created_at": updated_at, "updated_at": updated_at, **extra}
+        for i in range(count)
+    ]
+    async with session_maker() as session:
+        await session.execute(insert(Task), rows)
+        await session.commit()
+    return [row["id"] for row in rows]
+
+
+async def remaining_ids(session_maker):
+    async with session_maker() as session:
+        return set((await session.execute(select(Task.id))).scalars().all())
+
+
+@pytest.mark.asyncio
+async def test_clear_chat_history_is_one_delete(engine, session_maker, test_user):
+    async with session_maker() as session:
+        chat_session = await crud.create_chat_session(session, test_user.id)
+        session.add_all([
+            ChatMessage(id=str(i), session_id=chat_session.id, role="user", content=str(i))
+            for i in range(200)
+        ])
+        await session.commit()
+
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine.sync_engine, "before_cursor_execute", listener)
+        try:
+            await crud.clear_chat_history(session, chat_session.id)
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", listener)
+
+        message_deletes = [s for s in statements if s.startswith("DELETE FROM chatmessage")]
+        assert len(message_deletes) == 1
+        assert not any(s.startswith("SELECT") for s in statements)
+        count = (await session.execute(select(func.count()).select_from(ChatMessage))).scalar_one()
+        assert count == 0
+
+
+@pytest.mark.asyncio
+async def test_purge_only_expired_deleted_tasks(session_maker, test_user):
+    expired = await seed_tasks(session_maker, test_user.id, 7, deleted=True, age=timedelta(days=2))
+    restorable = await seed_tasks(session_maker, test_user.id, 2, deleted=True, age=timedelta(hours=1))
+    live = await seed_tasks(session_maker, test_user.id, 3, deleted=False, age=timedelta(days=30))
+
+    purger = TaskPurger(session_maker, batch_size=3, batch_pause_seconds=0)
+    assert await purger.run_once() == 7
+    assert await remaining_ids(session_maker) == set(restorable + live)
+
+    # Restorable tasks are still listed for undo
+    async with session_maker() as session:
+        deleted = await crud.get_deleted_tasks(session, test_user.id)
+    assert {t.id for t in deleted} == set(restorable)
+
+    assert await purger.run_once() == 0
+
+
+@pytest.mark.asyncio
+async def test_purge_batches_and_detaches_subtasks(session_maker, test_user):
+    parents = await seed_tasks(session_maker, test_user.id, 5, deleted=True, age=timedelta(days=3))
+    async with session_maker() as session:
+        session.add(Task(id="child", title="Child", user_id=test_user.id, parent_id=parents[0]))
+        await session.commit()
+
+    async with session_maker() as session:
+        cutoff = datetime.utcnow() - crud.DELETED_TASK_RESTORE_WINDOW
+        assert await crud.purge_deleted_tasks(session, cutoff, batch_size=2) == 2
+        assert await crud.purge_deleted_tasks(session, cutoff, batch_size=2) == 2
+        assert await crud.purge_deleted_tasks(session, cutoff, batch_size=2) == 1
+        assert await crud.purge_deleted_tasks(session, cutoff, batch_size=2) == 0
+
+        child = await session.get(Task, "child")
+        await session.refresh(child)
+        assert child.parent_id is None
@@ -0,0 +1,118 @@
+"""
+Tests for the materialized hybrid score and the background TaskReranker.
+"""
+import pytest
+from datetime import datetime, timedelta
+from sqlmodel import SQLModel
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+
+from app import crud
+from app.agents.monitor import TaskReranker
+from app.agents.prioritization import calculate_hybrid_score, calculate_urgency_score
+from app.models import Task, TaskCreate, TaskStatus, User
+import uuid
+
+
+@pytest.fixture
+async def session_maker():
+    """Create an in-memory async SQLite database for testing."""
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        echo=False,
+        connect_args={"check_same_thread": False}
+    )
+
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    await engine.dispose()
+
+
+@pytest.fixture
+async def test_user(session_maker):
+    """Create a test user."""
+    async with session_maker() as session:
+        user = User(id=str(uuid.uuid4()), email="test@example.com", name="Test User")
+        session.add(user)
+        await session.commit()
+        return user
+
+
+@pytest.mark.asyncio
+async def test_score_maintained_on_write(session_maker, test_user):
+    """create_task and update_task keep the stored score in sync."""
+    async with session_maker() as session:
+        task = await crud.create_task(
+            session,
+            TaskCreate(title="Write report", priority_score=80, due_date=datetime.utcnow() + timedelta(days=1)),
+            test_user.id,
+        )
+        assert task.urgency_bucket == calculate_urgency_score(task.due_date)
+        assert task.hybrid_score == calculate_hybrid_score(0, task.due_date, task.priority_score)
+
+        task = await crud.update_task(session, task, {"ai_relevance_score": 90})
+        assert task.hybrid_score == calculate_hybrid_score(90, task.due_date, task.priority_score)
+
+
+@pytest.mark.asyncio
+async def test_first_pass_backfills_every_active_task(session_maker, test_user):
+    """Rows written without a score are backfilled by the initial full pass."""
+    async with session_maker() as session:
+        session.add(Task(id="stale", title="Legacy row", priority_score=50, ai_relevance_score=60, user_id=test_user.id))
+        session.add(Task(id="done", title="Finished", status=TaskStatus.done, user_id=test_user.id))
+        await session.commit()
+
+    reranker = TaskReranker(session_maker)
+    assert await reranker.run_once() == 1
+
+    async with session_maker() as session:
+        stale = await session.get(Task, "stale")
+        done = await session.get(Task, "done")
+        assert stale.hybrid_score == calculate_hybrid_score(60, None, 50)
+        assert done.hybrid_score == 0
+
+
+@pytest.mark.asyncio
+async def test_first_pass_leaves_already_scored_tasks_alone(session_maker, test_user):
+    """A boot doesn't rewrite tasks that already have a score and can't have changed bucket."""
+    now = datetime.utcnow()
+    async with session_maker() as session:
+        # Scores deliberately out of date, so a rewrite would show
+        session.add(Task(id="undated", title="Undated", priority_score=50, hybrid_score=7, user_id=test_user.id))
+        session.add(Task(id="far", title="Far", due_date=now + timedelta(days=30), hybrid_score=7, user_id=test_user.id))
+        session.add(Task(id="soon", title="Soon", due_date=now + timedelta(days=1), hybrid_score=7, user_id=test_user.id))
+        await session.commit()
+
+    assert await TaskReranker(session_maker).run_once() == 1
+
+    async with session_maker() as session:
+        assert (await session.get(Task, "undated")).hybrid_score == 7
+        assert (await session.get(Task, "far")).hybrid_score == 7
+        assert (await session.get(Task, "soon")).hybrid_score != 7
+
+
+@pytest.mark.asyncio
+async def test_incremental_pass_only_touches_changed_buckets(session_maker, test_user):
+    """After the first pass, only tasks whose urgency bucket moved are refreshed."""
+    now = datetime.utcnow()
+    async with session_maker() as session:
+        await crud.create_task(session, TaskCreate(title="Soon", due_date=now + timedelta(days=2)), test_user.id)
+        await crud.create_task(session, TaskCreate(title="Far", due_date=now + timedelta(days=30)), test_user.id)
+        await crud.create_task(session, TaskCreate(title="Undated"), test_user.id)
+
+    reranker = TaskReranker(session_maker)
+    await reranker.run_once()
+
+    # Pretend the previous pass happened a day ago
+    reranker.last_run = now
+    later = now + timedelta(days=1)
+    async with session_maker() as session:
+        updated = await crud.rerank_tasks(session, reranker.last_run, later)
+    assert updated == 1
+
+    async with session_maker() as session:
+        tasks = {t.title: t for t in await crud.get_tasks(session, test_user.id)}
+        assert tasks["Soon"].urgency_bucket == calculate_urgency_score(tasks["Soon"].due_date, later)
+        assert tasks["Far"].urgency_bucket == 0
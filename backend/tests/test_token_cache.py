@@ -0,0 +1,104 @@
+"""
+Tests for the verified-token cache shared by HTTP auth and the websocket handshake.
+"""
+import time
+import pytest
+from unittest.mock import AsyncMock, patch
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+from app import auth
+from app.config import get_settings
+from app.token_cache import TokenCache, public_keys, token_cache
+
+
+@pytest.fixture
+def oidc():
+    """An RS256 signer, the matching JWKS served to auth, and OIDC settings."""
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+    jwks = {"keys": [{**jwk.construct(public_pem, "RS256").to_dict(), "kid": "k1", "use": "sig"}]}
+
+    settings = get_settings()
+    with patch.object(settings, "oidc_issuer", "https://idp.example/realms/liminal"), \
+         patch.object(settings, "oidc_audience", "liminal-app"), \
+         patch("app.auth.jwks_manager._fetch", new=AsyncMock(return_value=jwks)):
+        public_keys.clear()
+
+        def sign(**claims):
+            claims = {"sub": "idp-user", "iss": settings.oidc_issuer, "exp": int(time.time()) + 300, **claims}
+            return jwt.encode(claims, private_pem, algorithm="RS256", headers={"kid": "k1"})
+
+        yield sign
+        public_keys.clear()
+
+
+@pytest.mark.asyncio
+async def test_repeat_requests_skip_verification(authed_client):
+    with patch("app.auth.jwt.decode", wraps=jwt.decode) as decode:
+        for _ in range(3):
+            response = await authed_client.get("/me")
+            assert response.status_code == 200
+
+    assert decode.call_count == 1
+    token = authed_client.headers["Authorization"].split()[1]
+    assert token_cache.get(token).user_id == response.json()["id"]
+
+
+@pytest.mark.asyncio
+async def test_websocket_handshake_shares_the_cache(authed_client):
+    me = (await authed_client.get("/me")).json()
+    token = authed_client.headers["Authorization"].split()[1]
+
+    with patch("app.auth.jwt.decode", wraps=jwt.decode) as decode:
+        assert await auth.resolve_user_id(token) == me["id"]
+    assert decode.call_count == 0
+
+    assert await auth.resolve_user_id("not-a-token") is None
+
+
+@pytest.mark.asyncio
+async def test_oidc_tokens_verify_once_with_cached_keys(oidc):
+    token = oidc(aud="account", azp="liminal-app")
+    other = oidc(aud="liminal-app", jti="other")
+
+    with patch("app.auth.jwk.construct", wraps=jwk.construct) as construct:
+        first = await auth.verify_token(token)
+        second = await auth.verify_token(other)
+        again = await auth.verify_token(token)
+
+    assert first.claims["sub"] == "idp-user" and not first.local
+    assert second.claims["aud"] == "liminal-app"
+    assert again is first
+    # One key construction for both tokens signed by k1
+    assert construct.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_oidc_audience_is_enforced(oidc):
+    with pytest.raises(Exception):
+        await auth.verify_token(oidc(aud="someone-else", azp="someone-else"))
+    assert token_cache.get(oidc(aud="someone-else", azp="someone-else")) is None
+
+
+def test_entries_expire_with_the_token_and_are_bounded():
+    cache = TokenCache(max_entries=2)
+    now = time.time()
+
+    cache.put("expired", {"sub": "a", "exp": now - 1}, local=True)
+    assert cache.get("expired") is None
+
+    # No exp: verified but never cached
+    cache.put("forever", {"sub": "a"}, local=True)
+    assert cache.get("forever") is None
+
+    for token in ("t1", "t2", "t3"):
+        cache.put(token, {"sub": token, "exp": now + 60}, local=True)
+    assert cache.get("t1") is None
+    assert cache.get("t3").claims["sub"] == "t3"
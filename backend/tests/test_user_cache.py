@@ -0,0 +1,130 @@
+"""
+Tests for the request- and process-level user/settings cache.
+"""
+import re
+import pytest
+from contextlib import contextmanager
+from sqlalchemy import event
+
+from app.models import User
+from app.user_cache import user_cache
+from tests import conftest
+
+
+@contextmanager
+def count_selects(table):
+    """Collect SELECTs against `table` issued through the test engine."""
+    statements = []
+    pattern = re.compile(rf'^\s*SELECT\b.*\bFROM\s+"?{table}"?\b', re.IGNORECASE | re.DOTALL)
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if pattern.match(statement):
+            statements.append(statement)
+
+    event.listen(conftest.test_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(conftest.test_engine.sync_engine, "before_cursor_execute", record)
+
+
+def new_request(db_session):
+    """The test client reuses one session; drop its request scope as a new request would."""
+    db_session.info.clear()
+
+
+@pytest.mark.asyncio
+async def test_repeat_requests_skip_user_and_settings_queries(authed_client, db_session):
+    await authed_client.get("/me")
+    user_cache.reset_stats()
+
+    with count_selects("user") as users, count_selects("settings") as settings:
+        for _ in range(3):
+            new_request(db_session)
+            response = await authed_client.get("/me")
+            assert response.status_code == 200
+
+    assert users == [] and settings == []
+    stats = user_cache.stats()
+    assert stats["hits"] == 6 and stats["misses"] == 0
+    assert stats["hit_rate"] == 1.0
+    assert stats["queries_saved_per_request"] == 2.0
+    assert (await authed_client.get("/users/cache/stats")).json()["queries_saved"] >= 6
+
+
+@pytest.mark.asyncio
+async def test_settings_update_invalidates(authed_client, db_session):
+    assert (await authed_client.get("/me")).json()["settings"] is None
+
+    new_request(db_session)
+    response = await authed_client.patch("/me/settings", json={"focus_duration": 50})
+    assert response.status_code == 200
+
+    new_request(db_session)
+    assert (await authed_client.get("/me")).json()["settings"]["focus_duration"] == 50
+
+
+@pytest.mark.asyncio
+async def test_spotify_disconnect_invalidates(authed_client, db_session):
+    me = (await authed_client.get("/me")).json()
+    user = await db_session.get(User, me["id"])
+    user.spotify_access_token = "access"
+    user.spotify_display_name = "DJ"
+    await db_session.commit()
+    user_cache.invalidate(user.id)
+
+    new_request(db_session)
+    assert (await authed_client.get("/spotify/status")).json()["connected"] is True
+
+    new_request(db_session)
+    assert (await authed_client.delete("/spotify/disconnect")).status_code == 200
+
+    new_request(db_session)
+    assert (await authed_client.get("/spotify/status")).json()["connected"] is False
+
+
+@pytest.mark.asyncio
+async def test_cached_user_can_be_modified_and_committed(db_session):
+    db_session.add(User(id="u1", email="u1@example.com", name="Before"))
+    await db_session.commit()
+
+    async with conftest.test_session_maker() as first:
+        assert (await user_cache.get_user(first, "u1")).name == "Before"
+
+    async with conftest.test_session_maker() as second:
+        with count_selects("user") as selects:
+            user = await user_cache.get_user(second, "u1")
+            # A second lookup in the same session is served from its scope
+            assert await user_cache.get_user(second, "u1") is user
+        assert selects == []
+
+        user.name = "After"
+        await second.commit()
+        user_cache.invalidate(user.id, second)
+
+    async with conftest.test_session_maker() as third:
+        assert (await third.get(User, "u1")).name == "After"
+        assert (await user_cache.get_user(third, "u1")).name == "After"
+    assert user_cache.stats()["request_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_stats_require_authentication(client):
+    assert (await client.get("/users/cache/stats")).status_code == 401
+
+
+def test_invalidation_reaches_other_workers():
+    """invalidate() publishes to the other workers; their control message drops the local copy."""
+    from unittest.mock import patch
+    from app.websockets import manager
+
+    user_cache._put(("user", "u1"), {"id": "u1"})
+    with patch.object(manager.backend, "publish_control") as publish:
+        user_cache.invalidate("u1")
+    publish.assert_called_once_with("user_cache.invalidate", {"user_id": "u1"})
+    assert user_cache._get(("user", "u1")) is None
+
+    # Another worker invalidated u2: its notification arrives here as a control message
+    user_cache._put(("settings", "u2"), None)
+    manager.handle_control("user_cache.invalidate", {"user_id": "u2"})
+    assert user_cache._get(("settings", "u2")) is None
@@ -3,12 +3,13 @@
 import { useState, useEffect } from 'react'
 import { DragDropContext, Droppable, Draggable, DropResult } from '@hello-pangea/dnd'
 import { Plus, MoreHorizontal, AlertTriangle, ArrowRight, ArrowLeft, Trash2, Circle, CheckCircle2, Eye, EyeOff, Edit2, X, Sparkles, Loader2 } from 'lucide-react'
-import { getTasks, getThemes, updateTask, deleteTask, createTheme, updateTheme, deleteTheme, createTask, parseTaskWithLlm, Task, Theme } from '@/lib/api'
+import { getTasks, getCompletedTasks, getThemes, updateTask, deleteTask, createTheme, updateTheme, deleteTheme, createTask, parseTaskWithLlm, Task, Theme } from '@/lib/api'
 import TaskActionMenu from '@/components/TaskActionMenu'
 import EditTaskModal from '@/components/EditTaskModal'
 import { SwipeableTaskCard } from '@/components/SwipeableTaskCard'
 import { useAppStore } from '@/lib/store'
 import { triggerTaskComplete } from '@/lib/confetti'
+import { applyTaskEvent, type TaskEvent } from '@/lib/taskEvents'
 
 export default function BoardPage() {
   const { lastUpdate } = useAppStore()
@@ -45,10 +46,27 @@ export default function BoardPage() {
     }
   }, [lastUpdate])
 
+  useEffect(() => {
+    if (showCompleted) fetchData()
+  }, [showCompleted])
+
+  useEffect(() => {
+    const handleTaskEvent = (event: Event) => {
+      setTasks(prev => applyTaskEvent(prev, (event as CustomEvent<TaskEvent>).detail))
+    }
+    window.addEventListener('liminal:task_event', handleTaskEvent)
+    return () => window.removeEventListener('liminal:task_event', handleTaskEvent)
+  }, [])
+
   const fetchData = async () => {
     try {
-      const [t, th] = await Promise.all([getTasks(), getThemes()])
-      setTasks(t)
+      // Completed history is only loaded while it is shown
+      const [t, done, th] = await Promise.all([
+        getTasks(),
+        showCompleted ? getCompletedTasks() : Promise.resolve([] as Task[]),
+        getThemes(),
+      ])
+      setTasks([...t, ...done])
       setThemes(th.sort((a, b) => a.order - b.order))
     } catch (err) {
       console.error("Failed to load board data:", err)
@@ -14,6 +14,7 @@ import { AISuggestion } from '@/components/AISuggestion'
 import { useNotifications } from '@/lib/hooks/useNotifications'
 import { useUrgencyColor } from '@/lib/hooks/useUrgencyColor'
 import { isStaleTask } from '@/lib/urgency'
+import { applyTaskEvent, type TaskEvent } from '@/lib/taskEvents'
 import { CheckCircle, ArrowRight, CircleDashed, ListTodo, ArrowDownCircle, RotateCcw, PauseCircle } from 'lucide-react'
 import { AnimatePresence, motion } from 'framer-motion'
 import { StatsBar } from '@/components/StatsBar'
@@ -240,7 +241,8 @@ export default function Home() {
 
       setTasks(sorted)
       setDeletedTasks(fetchedDeleted)
-      setAiSuggestion(suggestion)
+      // The endpoint answers before scoring finishes; without a stored score there's no suggestion yet
+      setAiSuggestion(suggestion?.suggested_task_id ? suggestion : null)
 
       // Auto-resume paused task from previous session (MEMORY-02)
       if (!hasAutoResumedRef.current) {
@@ -275,6 +277,31 @@ export default function Home() {
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [lastUpdate, sortingMode])
 
+  // Task changes from any device arrive as events; patch instead of refetching
+  useEffect(() => {
+    const handleTaskEvent = (event: Event) => {
+      const change = (event as CustomEvent<TaskEvent>).detail
+      setTasks(prev => applyTaskEvent(prev, change))
+      if (change.type === 'task.restored') {
+        setDeletedTasks(prev => prev.filter(t => t.id !== change.task_id))
+      }
+    }
+    window.addEventListener('liminal:task_event', handleTaskEvent)
+    return () => window.removeEventListener('liminal:task_event', handleTaskEvent)
+  }, [])
+
+  // Fresh AI suggestions are pushed over the websocket when a scoring job finishes
+  useEffect(() => {
+    const handleSuggestion = (event: Event) => {
+      const message = (event as CustomEvent).detail
+      if (message?.status === 'done' && message.suggestion?.suggested_task_id) {
+        setAiSuggestion(message.suggestion)
+      }
+    }
+    window.addEventListener('liminal:ai_suggestion', handleSuggestion)
+    return () => window.removeEventListener('liminal:ai_suggestion', handleSuggestion)
+  }, [])
+
   // AI Suggestion Polling (15 minutes)
   useEffect(() => {
     const interval = setInterval(() => {
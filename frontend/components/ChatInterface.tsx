@@ -3,7 +3,7 @@
 import { useState, useRef, useEffect } from 'react'
 import { motion, AnimatePresence } from 'framer-motion'
 import { Send, Bot, User as UserIcon, Loader2, PlusCircle, RefreshCcw } from 'lucide-react'
-import { chatWithLlm, ChatMessage, createTask, TaskCreate, getChatHistory } from '@/lib/api'
+import { chatWithLlmStream, ChatMessage, createTask, TaskCreate, getChatHistory } from '@/lib/api'
 import { useAppStore } from '@/lib/store'
 
 // System prompt to guide the LLM's behavior
@@ -55,6 +55,21 @@ export default function ChatInterface({ onTaskCreated }: ChatInterfaceProps) {
     }
   }, [])
 
+  // Messages posted by background agents (e.g. the task monitor) arrive over the websocket
+  useEffect(() => {
+    const handleChatMessage = (event: Event) => {
+      const { session_id } = (event as CustomEvent<{ session_id: string }>).detail
+      if (!sessionId || session_id !== sessionId || loading) return
+      getChatHistory(sessionId)
+        .then(history => {
+          if (history && history.length > 0) setMessages(history)
+        })
+        .catch(e => console.error('Failed to reload chat history', e))
+    }
+    window.addEventListener('liminal:chat_message', handleChatMessage)
+    return () => window.removeEventListener('liminal:chat_message', handleChatMessage)
+  }, [sessionId, loading])
+
   useEffect(() => {
     if (scrollRef.current) {
       scrollRef.current.scrollTop = scrollRef.current.scrollHeight
@@ -123,7 +138,11 @@ export default function ChatInterface({ onTaskCreated }: ChatInterfaceProps) {
         userMsg
       ]
 
-      const response = await chatWithLlm(context, sessionId || undefined)
+      // Show the reply as it streams in; replaced by the final message below
+      setMessages(prev => [...prev, { role: 'assistant', content: '' }])
+      const response = await chatWithLlmStream(context, sessionId || undefined, (partial) => {
+        setMessages(prev => [...prev.slice(0, -1), { role: 'assistant', content: partial }])
+      })
       
       if (response.session_id && response.session_id !== sessionId) {
           setSessionId(response.session_id)
@@ -162,10 +181,10 @@ export default function ChatInterface({ onTaskCreated }: ChatInterfaceProps) {
       }
 
       const assistantMsg: ChatMessage = { role: 'assistant', content: displayContent }
-      setMessages(prev => [...prev, assistantMsg])
+      setMessages(prev => [...prev.slice(0, -1), assistantMsg])
     } catch (error) {
       console.error('Chat error:', error)
-      setMessages(prev => [...prev, { role: 'assistant', content: 'Sorry, I encountered an error connecting to my brain.' }])
+      setMessages(prev => [...prev.slice(0, -1), { role: 'assistant', content: 'Sorry, I encountered an error connecting to my brain.' }])
     } finally {
       setLoading(false)
     }
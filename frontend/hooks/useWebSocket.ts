@@ -1,5 +1,6 @@
 import { useEffect, useRef } from 'react'
 import { useAppStore } from '@/lib/store'
+import { isTaskEvent } from '@/lib/taskEvents'
 
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'
 
@@ -21,6 +22,9 @@ function isTokenExpired(token: string): boolean {
 export function useWebSocket() {
   const { triggerUpdate } = useAppStore()
   const wsRef = useRef<WebSocket | null>(null)
+  // Last task event version applied; resumed from on reconnect
+  const versionRef = useRef<number | null>(null)
+  const resumedFromRef = useRef<number | null>(null)
 
   useEffect(() => {
     const connect = () => {
@@ -35,15 +39,56 @@ export function useWebSocket() {
       if (wsRef.current?.readyState === WebSocket.OPEN) return
 
       // Convert http/https to ws/wss
-      const wsUrl = API_BASE_URL.replace(/^http/, 'ws') + '/ws?token=' + token
+      let wsUrl = API_BASE_URL.replace(/^http/, 'ws') + '/ws?token=' + token
+      if (versionRef.current !== null) {
+        wsUrl += '&since=' + versionRef.current
+      }
 
       const ws = new WebSocket(wsUrl)
       wsRef.current = ws
 
       ws.onmessage = (event) => {
+        if (event.data === 'ping') {
+          // Server heartbeat; silent sockets get closed
+          ws.send('pong')
+          return
+        }
         if (event.data === 'refresh') {
           console.log('WS: Refresh signal received')
           triggerUpdate()
+          return
+        }
+        if (typeof event.data === 'string' && event.data.startsWith('{')) {
+          try {
+            const message = JSON.parse(event.data)
+            if (message.type === 'ai_suggestion') {
+              window.dispatchEvent(new CustomEvent('liminal:ai_suggestion', { detail: message }))
+            } else if (message.type === 'chat.message') {
+              // A background agent posted to a chat session; the chat reloads it if open
+              window.dispatchEvent(new CustomEvent('liminal:chat_message', { detail: message }))
+            } else if (message.type === 'hello') {
+              versionRef.current = message.version
+            } else if (message.type === 'resync') {
+              // Missed events are gone: refetch everything
+              versionRef.current = message.version
+              triggerUpdate()
+            } else if (isTaskEvent(message)) {
+              const last = versionRef.current
+              if (last !== null && message.version <= last) return
+              if (last !== null && message.version > last + 1) {
+                // Missed one; the server replays everything after `last`
+                if (resumedFromRef.current !== last) {
+                  resumedFromRef.current = last
+                  ws.send(JSON.stringify({ type: 'resume', since: last }))
+                }
+                return
+              }
+              versionRef.current = message.version
+              window.dispatchEvent(new CustomEvent('liminal:task_event', { detail: message }))
+            }
+          } catch (e) {
+            console.error('WS: Invalid message', e)
+          }
         }
       }
 
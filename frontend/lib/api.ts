@@ -118,7 +118,11 @@ export async function registerUser(idToken: string): Promise<void> {
   }
 }
 
-async function request<T>(url: string, options: RequestInit = {}): Promise<T> {
+async function request<T>(
+  url: string,
+  options: RequestInit = {},
+  onResponse?: (response: Response) => void,
+): Promise<T> {
   const response = await fetchWithAuth(url, options);
   
   if (response.status === 401) {
@@ -155,6 +159,8 @@ async function request<T>(url: string, options: RequestInit = {}): Promise<T> {
     throw new Error(message);
   }
   
+  onResponse?.(response)
+
   // Handle 204 No Content
   if (response.status === 204) {
     return undefined as unknown as T;
@@ -188,8 +194,49 @@ export async function createTask(data: TaskCreate): Promise<Task> {
   });
 }
 
+const TASK_PAGE_SIZE = 100
+
+export interface TaskPage {
+  tasks: Task[]
+  nextCursor: string | null
+}
+
+export async function getTaskPage(
+  params: { view?: 'active' | 'all'; status?: Task['status']; cursor?: string | null; limit?: number } = {},
+): Promise<TaskPage> {
+  const query = new URLSearchParams({
+    view: params.view ?? 'active',
+    limit: String(params.limit ?? TASK_PAGE_SIZE),
+  })
+  if (params.status) query.set('status', params.status)
+  if (params.cursor) query.set('cursor', params.cursor)
+
+  let nextCursor: string | null = null
+  const tasks = await request<Task[]>(`${API_BASE_URL}/tasks?${query}`, {}, (response) => {
+    nextCursor = response.headers.get('X-Next-Cursor')
+  })
+  return { tasks, nextCursor }
+}
+
+async function getAllTaskPages(params: { view?: 'active' | 'all'; status?: Task['status'] }): Promise<Task[]> {
+  const tasks: Task[] = []
+  let cursor: string | null = null
+  do {
+    const page: TaskPage = await getTaskPage({ ...params, cursor })
+    tasks.push(...page.tasks)
+    cursor = page.nextCursor
+  } while (cursor)
+  return tasks
+}
+
+/** Active (not completed) tasks, ranked by the server. */
 export async function getTasks(): Promise<Task[]> {
-  return request<Task[]>(`${API_BASE_URL}/tasks`);
+  return getAllTaskPages({ view: 'active' })
+}
+
+/** Completed history; only fetched when the UI shows it. */
+export async function getCompletedTasks(): Promise<Task[]> {
+  return getAllTaskPages({ view: 'all', status: 'done' })
 }
 
 export async function updateTask(taskId: string, data: Partial<Task>): Promise<Task> {
@@ -277,6 +324,9 @@ export async function parseTaskWithLlm(inputText: string): Promise<TaskParseResp
 export interface AISuggestion {
   suggested_task_id: string;
   reasoning: string;
+  // Background scoring job; the fresh suggestion arrives over the websocket
+  job_id?: string;
+  status?: 'pending' | 'done' | 'failed';
 }
 
 export async function getAiSuggestion(): Promise<AISuggestion> {
@@ -388,8 +438,64 @@ export async function chatWithLlm(messages: ChatMessage[], sessionId?: string):
   return data;
 }
 
-export async function getChatHistory(sessionId: string): Promise<ChatMessage[]> {
-  return request<ChatMessage[]>(`${API_BASE_URL}/llm/history/${sessionId}`);
+export type ChatStreamResult = { content: string; session_id: string; pending_confirmation?: any; confirmation_options?: string[] };
+
+// Streams /llm/chat/stream (Server-Sent Events). `onDelta` receives the visible
+// reply so far; it may shrink when a later agent turn replaces an earlier one.
+export async function chatWithLlmStream(
+  messages: ChatMessage[],
+  sessionId: string | undefined,
+  onDelta: (text: string) => void,
+): Promise<ChatStreamResult> {
+  const response = await fetchWithAuth(`${API_BASE_URL}/llm/chat/stream`, {
+    method: 'POST',
+    body: JSON.stringify({ messages, session_id: sessionId }),
+  });
+  if (!response.ok || !response.body) {
+    // Fall back to the buffered endpoint (also handles 401/403 redirects)
+    return chatWithLlm(messages, sessionId);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let text = '';
+  let result: ChatStreamResult | null = null;
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const line = buffer.slice(0, boundary).trim();
+      buffer = buffer.slice(boundary + 2);
+      if (!line.startsWith('data:')) continue;
+
+      const event = JSON.parse(line.slice(5));
+      if (event.type === 'delta') {
+        text += event.content;
+        onDelta(text);
+      } else if (event.type === 'reset') {
+        text = '';
+        onDelta(text);
+      } else if (event.type === 'done') {
+        result = event;
+      } else if (event.type === 'error') {
+        throw new Error(event.detail || 'Chat stream failed');
+      }
+    }
+  }
+
+  if (!result) throw new Error('Chat stream ended unexpectedly');
+  return result;
+}
+
+// Latest `limit` messages of a session, oldest first
+export async function getChatHistory(sessionId: string, limit = 50): Promise<ChatMessage[]> {
+  const newestFirst = await request<ChatMessage[]>(`${API_BASE_URL}/llm/history/${sessionId}?limit=${limit}`);
+  return newestFirst.reverse();
 }
 
 export async function clearChatHistory(sessionId: string): Promise<void> {
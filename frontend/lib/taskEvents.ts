@@ -0,0 +1,32 @@
+/**
+ * Task change events pushed over the websocket.
+ *
+ * Each event carries a per-user `version` that goes up by one per change.
+ * useWebSocket re-emits applied events as `liminal:task_event`, and views
+ * patch their task lists with applyTaskEvent instead of refetching.
+ */
+import type { Task } from './api'
+
+export type TaskEvent =
+  | { type: 'task.created' | 'task.restored'; version: number; task_id: string; task: Task }
+  | { type: 'task.updated'; version: number; task_id: string; changes: Partial<Task> }
+  | { type: 'task.deleted'; version: number; task_id: string }
+
+export function isTaskEvent(message: { type?: string }): message is TaskEvent {
+  return typeof message.type === 'string' && message.type.startsWith('task.')
+}
+
+export function applyTaskEvent(tasks: Task[], event: TaskEvent): Task[] {
+  switch (event.type) {
+    case 'task.created':
+    case 'task.restored':
+      if (tasks.some(t => t.id === event.task_id)) {
+        return tasks.map(t => (t.id === event.task_id ? event.task : t))
+      }
+      return [...tasks, event.task]
+    case 'task.updated':
+      return tasks.map(t => (t.id === event.task_id ? { ...t, ...event.changes } : t))
+    case 'task.deleted':
+      return tasks.filter(t => t.id !== event.task_id)
+  }
+}